@@ -41,24 +41,57 @@ STRUKTURA PLIKU:
 
 # Standardowe importy Python
 from io import BytesIO
+import contextvars
+import heapq
 import io
+import json
 import locale
 import logging
 import os
 import platform
+import random
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
 import time
-from datetime import datetime
-from hashlib import md5
+import uuid
+import zipfile
+from array import array
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import datetime, time as dt_time
+from hashlib import md5, sha256
 from pathlib import Path
-from typing import Optional
+from typing import BinaryIO, Callable, Iterable, Iterator, Optional, Union
+
+# Początek bieżącego wykonania skryptu (Streamlit wykonuje go ponownie przy każdym odświeżeniu);
+# mierzony przed importem bibliotek zewnętrznych, więc zimny start obejmuje ich wczytanie
+_SCRIPT_STARTED = time.perf_counter()
 
 # Zewnętrzne biblioteki
+import httpx
 import streamlit as st
 from dotenv import dotenv_values
-from openai import OpenAI
+from openai import (
+    APIConnectionError, APITimeoutError, InternalServerError, OpenAI, RateLimitError,
+)
 from qdrant_client import QdrantClient
-from qdrant_client.models import PointStruct, Distance, VectorParams
+from qdrant_client.http.exceptions import UnexpectedResponse
+from qdrant_client.models import (
+    BinaryQuantization, BinaryQuantizationConfig, DatetimeRange, Direction, Distance, FieldCondition, Filter,
+    FilterSelector, HasIdCondition, IsEmptyCondition, MatchAny, MatchValue, OrderBy, PayloadField, PayloadSchemaType,
+    PointIdsList, PointStruct, PointVectors, QuantizationSearchParams, QueryRequest, Range, ScalarQuantization,
+    ScalarQuantizationConfig, ScalarType, SearchParams, SetPayload, SetPayloadOperation,
+    VectorParams, WithLookup,
+)
 from docx import Document
+from pydub import AudioSegment
+from pydub.exceptions import CouldntDecodeError
+from pydub.utils import mediainfo
+from pydub.silence import detect_silence
 
 # Importy opcjonalne - tylko flagi, bez komunikatów Streamlit
 AUDIORECORDER_AVAILABLE = True
@@ -100,14 +133,17 @@ except ImportError:
 # =============================================================================
 # SPRAWDZENIE ZALEŻNOŚCI SYSTEMOWYCH
 # (tylko flagi, bez komunikatów Streamlit)
-MISSING_DEPS = []
+
+@st.cache_resource
 def check_system_dependencies():
-    missing = []
-    if os.system("ffmpeg -version > /dev/null 2>&1") != 0:
-        missing.append("ffmpeg")
-    if os.system("git --version > /dev/null 2>&1") != 0:
-        missing.append("git")
-    return missing
+    """
+    Sprawdza obecność narzędzi systemowych raz na proces.
+    
+    Wyszukiwanie w PATH (``shutil.which``) nie uruchamia podprocesów, więc nie
+    spowalnia startu aplikacji.
+    """
+    return [tool for tool in ("ffmpeg", "git") if shutil.which(tool) is None]
+
 MISSING_DEPS = check_system_dependencies()
 SYSTEM = platform.system()
 
@@ -138,6 +174,39 @@ def log_error(e: Exception, context: Optional[str] = None):
         error_msg = f"{context}: {error_msg}"
     logger.error(error_msg, exc_info=True)
     st.error(error_msg)
+    if isinstance(e, UnexpectedResponse) and e.status_code == 404:
+        # Kolekcja usunięta poza aplikacją - kolejne odświeżenie utworzy ją ponownie
+        reset_collection_cache()
+
+@st.cache_resource
+def _get_metrics_store() -> tuple[dict[str, dict[str, float]], threading.Lock]:
+    """Zwraca rejestr metryk współdzielony przez wszystkie sesje i odświeżenia w procesie."""
+    return {}, threading.Lock()
+
+def record_metric(name: str, value: float):
+    """
+    Rejestruje pomiar (np. czas w sekundach) pod podaną nazwą metryki.
+    
+    Args:
+        name (str): Nazwa metryki, np. "transcription.segment_latency"
+        value (float): Zmierzona wartość
+    """
+    metrics, lock = _get_metrics_store()
+    with lock:
+        metric = metrics.setdefault(name, {"count": 0, "total": 0.0, "last": 0.0, "max": 0.0})
+        metric["count"] += 1
+        metric["total"] += value
+        metric["last"] = value
+        metric["max"] = max(metric["max"], value)
+
+def get_metrics_snapshot() -> dict[str, dict[str, float]]:
+    """Zwraca kopię zebranych metryk wraz z wyliczoną średnią."""
+    metrics, lock = _get_metrics_store()
+    with lock:
+        return {
+            name: {**metric, "avg": metric["total"] / metric["count"] if metric["count"] else 0.0}
+            for name, metric in metrics.items()
+        }
 
 # =============================================================================
 # KONFIGURACJA LOKALIZACJI I ZMIENNYCH ŚRODOWISKOWYCH
@@ -167,10 +236,23 @@ def get_config_value(key):
     try:
         if hasattr(st, 'secrets') and key in st.secrets:
             return st.secrets[key]
-    except (KeyError, AttributeError):
+    except (KeyError, AttributeError, FileNotFoundError):
+        # FileNotFoundError: brak pliku secrets.toml (np. uruchomienie lokalne lub z CLI)
         pass
     return None
 
+# Backend przechowywania notatek:
+# - "qdrant": zdalny serwer Qdrant (QDRANT_URL/QDRANT_API_KEY) - domyślny
+# - "local":  wbudowany Qdrant zapisujący dane w ./db (jeden proces, bez sieci)
+# - "memory": wbudowany Qdrant w pamięci (testy, dane znikają po restarcie)
+STORAGE_BACKENDS = ("qdrant", "local", "memory")
+STORAGE_BACKEND = get_config_value("STORAGE_BACKEND") or "qdrant"
+if STORAGE_BACKEND not in STORAGE_BACKENDS:
+    st.error(f"Nieznany backend STORAGE_BACKEND: {STORAGE_BACKEND}. Dostępne: {', '.join(STORAGE_BACKENDS)}")
+    st.stop()
+if STORAGE_BACKEND != "qdrant":
+    required_env_vars = []  # Wbudowany backend nie potrzebuje serwera Qdrant
+
 missing_vars = []
 for var in required_env_vars:
     if not get_config_value(var):
@@ -188,305 +270,3484 @@ QDRANT_API_KEY = "your-qdrant-api-key"
     st.info("ℹ️ **Klucz OpenAI API** będzie wymagany w sidebarze aplikacji")
     st.stop()
 
-# =============================================================================
-# STAŁE KONFIGURACYJNE
-# =============================================================================
+# =============================================================================
+# STAŁE KONFIGURACYJNE
+# =============================================================================
+
+# Weryfikacja klucza OpenAI i budżety czasu renderowania (sekundy)
+OPENAI_KEY_VERIFY_TTL_S = 15 * 60            # Jak długo wynik weryfikacji klucza jest ważny
+OPENAI_KEY_POLL_INTERVAL_S = 1.0             # Co ile sprawdzać wynik trwającej weryfikacji klucza
+COLD_START_BUDGET_S = 3.0                    # Budżet pierwszego wykonania skryptu w procesie
+RERUN_BUDGET_S = 0.5                         # Budżet każdego kolejnego odświeżenia
+
+# Pula połączeń HTTP klienta OpenAI (współdzielona per klucz API)
+OPENAI_MAX_CONNECTIONS = 20                  # Maksymalna liczba jednoczesnych połączeń
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = 10        # Liczba połączeń utrzymywanych w puli (keep-alive)
+OPENAI_KEEPALIVE_EXPIRY_S = 60.0             # Czas życia bezczynnego połączenia w puli
+OPENAI_TIMEOUT_S = 120.0                     # Limit czasu zapytania (transkrypcja długich segmentów)
+OPENAI_CONNECT_TIMEOUT_S = 10.0              # Limit czasu nawiązania połączenia
+
+# Konfiguracja modeli OpenAI
+EMBEDDING_MODEL = "text-embedding-3-large"  # Model do generowania embeddingów tekstu
+TITLE_MODEL = "gpt-3.5-turbo"                # Model do generowania tytułów notatek
+
+# Harmonogram zapytań OpenAI: limity na minutę per model (rpm - zapytania, tpm - tokeny; None = brak limitu)
+OPENAI_RATE_LIMITS = {
+    "whisper-1": {"rpm": 500, "tpm": None},
+    "text-embedding-3-large": {"rpm": 3000, "tpm": 1_000_000},
+    "gpt-3.5-turbo": {"rpm": 3500, "tpm": 200_000},
+}
+OPENAI_MAX_CONCURRENCY = 8                   # Maksymalna liczba zapytań OpenAI wykonywanych jednocześnie
+OPENAI_MAX_RETRIES = 5                       # Liczba ponowień po 429, przekroczeniu czasu lub błędzie 5xx
+OPENAI_BACKOFF_BASE_S = 1.0                  # Podstawa wykładniczego opóźnienia ponowień
+OPENAI_BACKOFF_MAX_S = 30.0                  # Maksymalne opóźnienie jednego ponowienia
+
+# Klasy priorytetu zapytań (mniejsza wartość = obsługiwane wcześniej)
+PRIORITY_INTERACTIVE = 0                     # Działania użytkownika w interfejsie (wyszukiwanie, zapis)
+PRIORITY_BACKGROUND = 1                      # Przetwarzanie w tle (masowy import, zadania w kolejce)
+
+# Profile przechowywania wektorów w Qdrant (wybór: zmienna STORAGE_PROFILE)
+# - full:    3072 wymiary float32 w RAM (~12 KB/notatkę) - domyślny, najwyższa jakość
+# - compact: 1024 wymiary (Matryoshka) + kwantyzacja int8 z rescoringiem (~1 KB/notatkę w RAM)
+# - binary:  3072 wymiary + kwantyzacja binarna z oversamplingiem i rescoringiem (~0.4 KB/notatkę w RAM)
+# - disk:    3072 wymiary na dysku, w RAM tylko kwantyzacja int8 (~3 KB/notatkę w RAM)
+STORAGE_PROFILES = {
+    "full": {"dim": 3072, "quantization": None, "on_disk": False},
+    "compact": {"dim": 1024, "quantization": "scalar", "on_disk": False},
+    "binary": {"dim": 3072, "quantization": "binary", "on_disk": False},
+    "disk": {"dim": 3072, "quantization": "scalar", "on_disk": True},
+}
+STORAGE_PROFILE = get_config_value("STORAGE_PROFILE") or "full"
+if STORAGE_PROFILE not in STORAGE_PROFILES:
+    st.error(f"Nieznany profil STORAGE_PROFILE: {STORAGE_PROFILE}. Dostępne: {', '.join(STORAGE_PROFILES)}")
+    st.stop()
+EMBEDDING_DIM = STORAGE_PROFILES[STORAGE_PROFILE]["dim"]  # Wymiarowość wektorów embeddingów
+AUDIO_TRANSCRIBE_MODEL = "whisper-1"         # Model do transkrypcji audio
+
+# Konfiguracja segmentacji długich nagrań (wartości w milisekundach)
+TRANSCRIBE_SEGMENT_MS = 5 * 60 * 1000        # Docelowa długość segmentu (~5 MB MP3, poniżej limitu Whisper)
+TRANSCRIBE_OVERLAP_MS = 2000                 # Zakładka między sąsiednimi segmentami
+TRANSCRIBE_MIN_SILENCE_MS = 700              # Minimalna długość ciszy uznawana za miejsce cięcia
+TRANSCRIBE_SILENCE_THRESH_DB = 16            # Próg ciszy względem średniej głośności nagrania (dB)
+TRANSCRIBE_MAX_WORKERS = 4                   # Maksymalna liczba równoległych zapytań do Whisper
+
+# Przygotowanie nagrań przed wysłaniem do Whisper (mono, 16 kHz, niski bitrate)
+AUDIO_PREPROCESS = (get_config_value("AUDIO_PREPROCESS") or "true").lower() != "false"
+AUDIO_PREPROCESS_SAMPLE_RATE = 16000         # Częstotliwość próbkowania, z którą i tak pracuje Whisper
+AUDIO_PREPROCESS_BITRATE = "32k"             # Bitrate MP3 wystarczający dla mowy (mono)
+AUDIO_TRIM_SILENCE = (get_config_value("AUDIO_TRIM_SILENCE") or "false").lower() == "true"
+AUDIO_TRIM_MAX_SILENCE_MS = 1000             # Dłuższe pauzy skracane są do tej długości
+
+# Limity czasu kroków wzbogacania notatki przy zapisie (sekundy)
+ENRICHMENT_TIMEOUTS = {"title": 20.0, "vector": 30.0}
+ENRICHMENT_MAX_WORKERS = 8                   # Wspólna pula wątków dla kroków wzbogacania
+
+# Konfiguracja bazy danych Qdrant
+QDRANT_COLLECTION_NAME = get_config_value("QDRANT_COLLECTION_NAME") or "notes"  # Nazwa kolekcji w bazie wektorowej
+
+# Metadane notatki (pole -> typ indeksu) - filtrowane po stronie Qdrant i kopiowane do fragmentów notatki
+NOTE_METADATA_INDEXES = {
+    "created_ts": PayloadSchemaType.FLOAT,   # Data utworzenia jako znacznik czasu (sekundy)
+    "duration_s": PayloadSchemaType.FLOAT,   # Długość nagrania w sekundach
+    "word_count": PayloadSchemaType.INTEGER,
+    "language": PayloadSchemaType.KEYWORD,
+    "tags": PayloadSchemaType.KEYWORD,
+}
+
+# Indeksy payloadu tworzone przy inicjalizacji kolekcji (pole -> typ)
+PAYLOAD_INDEXES = {
+    "created_at": PayloadSchemaType.DATETIME,
+    "content_hash": PayloadSchemaType.KEYWORD,
+    "audio_md5": PayloadSchemaType.KEYWORD,
+    **NOTE_METADATA_INDEXES,
+}
+
+# Wykrywanie języka notatki po najczęstszych słowach (bez wywołań API)
+NOTE_LANGUAGES = {"pl": "polski", "en": "angielski", "de": "niemiecki", "fr": "francuski", "es": "hiszpański"}
+LANGUAGE_STOPWORDS = {
+    "pl": {"i", "w", "nie", "na", "się", "z", "jest", "to", "że", "do", "jak", "ale", "czy", "o", "po", "jestem", "mam"},
+    "en": {"the", "and", "is", "to", "of", "in", "it", "that", "for", "on", "with", "this", "are", "was", "have", "you"},
+    "de": {"der", "die", "und", "ist", "nicht", "das", "ein", "eine", "zu", "mit", "sich", "auf", "ich", "den", "wir"},
+    "fr": {"le", "la", "les", "et", "est", "un", "une", "des", "pour", "que", "dans", "pas", "ce", "sur", "nous", "je"},
+    "es": {"el", "los", "las", "y", "es", "que", "un", "una", "para", "por", "con", "del", "se", "no", "muy", "yo"},
+}
+LANGUAGE_DETECT_MAX_WORDS = 500              # Liczba pierwszych słów analizowanych przy wykrywaniu języka
+
+# Fragmenty długich notatek - osobne wektory w kolekcji "<kolekcja>_chunks", powiązane z notatką przez parent_id
+CHUNK_COLLECTION_NAME = f"{QDRANT_COLLECTION_NAME}_chunks"
+CHUNK_PAYLOAD_INDEXES = {"parent_id": PayloadSchemaType.KEYWORD, **NOTE_METADATA_INDEXES}
+CHUNK_MIN_CHARS = 2000                       # Krótsze notatki nie są dzielone (wystarcza wektor całej notatki)
+CHUNK_SIZE_CHARS = 1200                      # Docelowa długość fragmentu
+CHUNK_OVERLAP_CHARS = 200                    # Zakładka między sąsiednimi fragmentami
+CHUNK_EMBED_BATCH_SIZE = 64                  # Liczba fragmentów w jednej paczce embeddingów
+CHUNK_EMBED_MAX_WORKERS = 4                  # Liczba paczek embeddingów wysyłanych równolegle
+SEARCH_SNIPPET_MAX_CHARS = 300               # Maksymalna długość pasującego fragmentu w wynikach
+EMBEDDING_INPUT_MAX_CHARS = 16000            # Tekst całej notatki przycinany poniżej limitu modelu (8191 tokenów)
+
+# Konfiguracja listy notatek
+LIST_PAGE_SIZES = (10, 20, 50, 100)          # Dostępne rozmiary strony w zakładce "Lista notatek"
+LIST_PAYLOAD_FIELDS = ["title", "text", "created_at", *NOTE_METADATA_INDEXES]  # Pola payloadu w widoku listy
+LIST_CACHE_TTL_S = 60                        # Czas życia strony listy w cache (zapisy z innych procesów)
+LIST_CACHE_MAX_ENTRIES = 256                 # Maksymalna liczba stron listy w cache
+
+# Wykrywanie duplikatów notatek
+DEDUP_SIMILARITY_THRESHOLD = float(get_config_value("DEDUP_SIMILARITY_THRESHOLD") or 0.95)  # Próg podobieństwa (cosinus)
+DEDUP_MAX_MATCHES = 3                        # Liczba podobnych notatek pokazywanych przy zapisie
+DEDUP_SCAN_NEIGHBORS = 10                    # Najbliżsi sąsiedzi sprawdzani dla każdej notatki przy skanowaniu
+DEDUP_SCAN_PAGE_SIZE = 128                   # Liczba notatek (zapytań query_batch_points) na stronę skanowania
+DEDUP_REASON_LABELS = {                      # Powód dopasowania duplikatu -> etykieta w interfejsie
+    "audio": "to samo nagranie",
+    "text": "identyczna treść",
+    "similar": "podobna treść",
+}
+
+# Operacje zbiorcze (usuwanie, ponowne tytuły i wektory)
+BULK_OPERATION_BATCH_SIZE = 256              # Liczba notatek w jednym zapytaniu do Qdrant
+BULK_RETITLE_MAX_WORKERS = 8                 # Liczba tytułów generowanych równolegle
+
+# Konfiguracja eksportu dokumentów
+EXPORT_CACHE_MAX_ENTRIES = 256               # Maksymalna liczba wygenerowanych plików PDF/DOCX w cache
+BULK_EXPORT_PAGE_SIZE = 100                  # Liczba notatek pobieranych z Qdrant na stronę przy eksporcie zbiorczym
+BULK_EXPORT_FORMATS = {                      # Format eksportu zbiorczego -> etykieta w interfejsie
+    "zip-txt": "ZIP (pliki TXT)",
+    "zip-docx": "ZIP (pliki DOCX)",
+    "zip-pdf": "ZIP (pliki PDF)",
+    "docx": "Jeden dokument DOCX",
+    "pdf": "Jeden dokument PDF",
+}
+
+# Lokalne pliki pamięci podręcznej (katalog montowany jako wolumen ./db w Dockerze)
+DB_DIR = Path("db")
+QDRANT_LOCAL_PATH = DB_DIR / "qdrant_local"         # Dane wbudowanego Qdrant (STORAGE_BACKEND=local)
+CACHE_DB_PATH = DB_DIR / "cache.sqlite3"
+TRANSCRIPTION_CACHE_MAX_BYTES = 200 * 1024 * 1024   # Limit rozmiaru cache transkrypcji
+EMBEDDING_CACHE_MAX_BYTES = 500 * 1024 * 1024       # Limit rozmiaru cache embeddingów
+KEYWORD_INDEX_PATH = DB_DIR / "keyword_index.sqlite3"  # Lokalny indeks pełnotekstowy (BM25)
+
+# Nagrania wgrane przez użytkowników (zapisywane na dysk porcjami zamiast trzymania w pamięci sesji)
+UPLOAD_SPOOL_DIR = DB_DIR / "uploads"        # Pliki nagrań nazwane skrótem MD5 treści
+UPLOAD_SPOOL_RETENTION_S = 24 * 3600         # Po jakim czasie nieużywane nagrania są usuwane
+SPOOL_CHUNK_BYTES = 1024 * 1024              # Rozmiar porcji przy kopiowaniu i haszowaniu
+
+# Kolejka zadań w tle (transkrypcja i zapis notatek poza cyklem odświeżania interfejsu)
+JOBS_DB_PATH = DB_DIR / "jobs.sqlite3"       # Trwała kolejka zadań
+JOB_FILES_DIR = DB_DIR / "job_files"         # Pliki wejściowe zadań (nagrania do transkrypcji)
+JOB_WORKERS = 4                              # Liczba wątków przetwarzających zadania
+JOB_POLL_INTERVAL_S = 1.0                    # Co ile sekund interfejs i wątki sprawdzają kolejkę
+JOB_RETENTION_S = 7 * 24 * 3600              # Jak długo przechowywane są zakończone zadania
+JOB_HEARTBEAT_INTERVAL_S = 10.0              # Co ile sekund proces potwierdza wykonywanie swoich zadań
+JOB_STALE_AFTER_S = 60.0                     # Po jakim czasie bez potwierdzenia zadanie uznawane jest za przerwane
+JOB_MAX_ATTEMPTS = 3                         # Ile razy zadanie przerwane awarią procesu jest wznawiane
+JOB_STATUS_LABELS = {                        # Status zadania -> etykieta w interfejsie
+    "queued": "w kolejce",
+    "running": "w trakcie",
+    "done": "zakończone",
+    "failed": "błąd",
+}
+
+# Konfiguracja wyszukiwania
+SEARCH_RESULT_LIMIT = 20                     # Liczba zwracanych wyników wyszukiwania
+SEARCH_RRF_K = 60                            # Stała k w reciprocal rank fusion
+KEYWORD_FILTER_OVERFETCH = 5                 # Ile razy więcej wyników BM25 pobierać przed filtrowaniem w Qdrant
+SEARCH_MODES = {                             # Tryb wyszukiwania -> etykieta w interfejsie
+    "hybrid": "Hybrydowe (słowa kluczowe + semantyczne)",
+    "semantic": "Semantyczne",
+    "keyword": "Słowa kluczowe (bez wywołania API)",
+}
+
+# Pamięć podręczna wyników wyszukiwania (wspólna dla sesji w procesie)
+SEARCH_CACHE_TTL_S = 5 * 60                  # Czas życia wyniku w cache
+SEARCH_CACHE_MAX_ENTRIES = 512               # Maksymalna liczba zapamiętanych wyszukiwań (LRU)
+QUERY_EMBEDDING_CACHE_MAX_ENTRIES = 1024     # Maksymalna liczba embeddingów zapytań w pamięci
+# Unieważnianie po zapisach: "version" - każdy zapis unieważnia cały cache (numer wersji kolekcji),
+# "precise" - usunięcie unieważnia tylko wyniki zawierające usunięte notatki (dodanie i edycja - cały cache)
+SEARCH_CACHE_INVALIDATION = get_config_value("SEARCH_CACHE_INVALIDATION") or "version"
+
+# Limity pojedynczego zapytania do API embeddingów
+EMBEDDING_BATCH_MAX_ITEMS = 2048             # Maksymalna liczba tekstów w jednym zapytaniu
+EMBEDDING_BATCH_MAX_TOKENS = 250_000         # Bezpieczny limit tokenów na zapytanie (API: 300k)
+
+# =============================================================================
+# FUNKCJE OBSŁUGI API I KLIENTÓW
+# =============================================================================
+
+def _openai_http_settings() -> dict:
+    """Zwraca wspólne ustawienia puli połączeń i limitów czasu dla klientów httpx."""
+    return {
+        "limits": httpx.Limits(
+            max_connections=OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY_S,
+        ),
+        "timeout": httpx.Timeout(OPENAI_TIMEOUT_S, connect=OPENAI_CONNECT_TIMEOUT_S),
+    }
+
+def _track_request_start(request: httpx.Request):
+    """
+    Hook httpx: zapamiętuje czas startu zapytania i śledzi nawiązanie nowego połączenia.
+    
+    Zdarzenia ``trace`` z httpcore informują, czy zapytanie otworzyło nowe połączenie TCP,
+    czy użyło połączenia z puli keep-alive.
+    """
+    request.extensions["audio_notes_started"] = time.perf_counter()
+    request.extensions["audio_notes_new_connection"] = False
+
+    def trace(event_name, _info):
+        if event_name == "connection.connect_tcp.complete":
+            request.extensions["audio_notes_new_connection"] = True
+
+    request.extensions["trace"] = trace
+
+def _track_response(response: httpx.Response):
+    """Hook httpx: zapisuje opóźnienie (do nagłówków odpowiedzi) i ponowne użycie połączenia."""
+    extensions = response.request.extensions
+    record_metric("openai.request_latency", time.perf_counter() - extensions.get("audio_notes_started", 0.0))
+    record_metric("openai.connection_reused", 0.0 if extensions.get("audio_notes_new_connection") else 1.0)
+
+@st.cache_resource(max_entries=16)
+def _get_pooled_openai_client(api_key: str) -> OpenAI:
+    """
+    Zwraca klienta OpenAI z trwałą pulą połączeń keep-alive (jeden na klucz API i proces).
+    
+    Kolejne wywołania (transkrypcja, embeddingi, tytuły) używają tych samych połączeń,
+    zamiast za każdym razem otwierać nowe połączenie i negocjować TLS.
+    
+    Równoległe zapytania (segmenty transkrypcji, paczki embeddingów) wysyłane są z puli
+    wątków przez ten sam klient - httpx.Client jest bezpieczny wątkowo, a limity pilnuje
+    ``OpenAIScheduler`` oparty na ``threading``. Wariant asynchroniczny nie jest używany:
+    Streamlit nie utrzymuje pętli zdarzeń między przebiegami skryptu, a zapamiętany
+    ``AsyncOpenAI`` byłby związany z pętlą, która go pierwsza użyła.
+    """
+    http_client = httpx.Client(
+        **_openai_http_settings(),
+        event_hooks={"request": [_track_request_start], "response": [_track_response]},
+    )
+    # Ponowienia obsługuje harmonogram zapytań (``OpenAIScheduler``), nie klient
+    return OpenAI(api_key=api_key, http_client=http_client, max_retries=0)
+
+_openai_api_key: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("openai_api_key", default=None)
+
+@contextmanager
+def openai_api_key(api_key: Optional[str]):
+    """
+    Ustawia klucz OpenAI używany w bieżącym kontekście (sesja, zadanie w tle).
+    
+    Klucz podany przez użytkownika nie trafia do wspólnej konfiguracji procesu, więc
+    sesje i zadania innych użytkowników go nie widzą. Bez klucza (None) używany jest
+    klucz z konfiguracji.
+    
+    Args:
+        api_key (str | None): Klucz OpenAI
+    """
+    token = _openai_api_key.set(api_key)
+    try:
+        yield
+    finally:
+        _openai_api_key.reset(token)
+
+def _require_openai_key() -> str:
+    """Zwraca klucz OpenAI bieżącego kontekstu lub z konfiguracji; zgłasza błąd, gdy go brakuje."""
+    api_key = _openai_api_key.get() or get_config_value("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError("Brak klucza OpenAI API. Sprawdź konfigurację w .env lub Streamlit secrets.")
+    return api_key
+
+def get_openai_client():
+    """Zwraca współdzielonego klienta OpenAI (z pulą połączeń) dla klucza API bieżącego kontekstu."""
+    return _get_pooled_openai_client(_require_openai_key())
+
+_request_priority: contextvars.ContextVar[int] = contextvars.ContextVar(
+    "request_priority", default=PRIORITY_INTERACTIVE,
+)
+
+@contextmanager
+def request_priority(priority: int):
+    """
+    Ustawia klasę priorytetu zapytań OpenAI wykonywanych w bieżącym kontekście.
+    
+    Pule wątków nie dziedziczą kontekstu automatycznie - zadania zlecane z tego bloku
+    należy uruchamiać przez ``contextvars.copy_context().run``.
+    
+    Args:
+        priority (int): ``PRIORITY_INTERACTIVE`` lub ``PRIORITY_BACKGROUND``
+    """
+    token = _request_priority.set(priority)
+    try:
+        yield
+    finally:
+        _request_priority.reset(token)
+
+class TokenBucket:
+    """Kubełek tokenów uzupełniany w sposób ciągły do pojemności ``per_minute``."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.available = self.capacity
+        self.updated = time.monotonic()
+
+    def wait_time(self, amount: float) -> float:
+        """Zwraca czas oczekiwania (s) na ``amount`` tokenów; 0 oznacza, że są dostępne."""
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+        missing = min(amount, self.capacity) - self.available
+        return max(0.0, missing / self.rate)
+
+    def consume(self, amount: float):
+        """Pobiera tokeny (po sprawdzeniu ``wait_time``)."""
+        self.available -= min(amount, self.capacity)
+
+class OpenAIScheduler:
+    """
+    Centralny harmonogram zapytań OpenAI współdzielony przez cały proces.
+    
+    Przed wysłaniem zapytania czeka na miejsce w limicie współbieżności oraz w kubełkach
+    zapytań/min i tokenów/min danego modelu. Każdy model ma własną kolejkę oczekujących,
+    obsługiwaną według klasy priorytetu, a w jej obrębie w kolejności zgłoszenia - zapytanie
+    wstrzymane limitem jednego modelu nie blokuje innych modeli, a interaktywne wyszukiwanie
+    wyprzedza masowe operacje. Priorytety obowiązują w obrębie procesu: osobne procesy
+    (np. ``bulk_import.py``) dzielą z aplikacją jedynie limity po stronie OpenAI.
+    Błędy przejściowe (429, przekroczenie czasu, 5xx) są ponawiane z wykładniczym
+    opóźnieniem z losowym rozrzutem.
+    """
+
+    RETRYABLE_ERRORS = (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+
+    def __init__(self, rate_limits: dict[str, dict], max_concurrency: int = OPENAI_MAX_CONCURRENCY,
+                 max_retries: int = OPENAI_MAX_RETRIES):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self._buckets = {
+            model: {kind: TokenBucket(limit) for kind, limit in limits.items() if limit}
+            for model, limits in rate_limits.items()
+        }
+        self._condition = threading.Condition()
+        self._waiting: dict[str, list[tuple[int, int, int]]] = {}
+        self._sequence = 0
+        self._active = 0
+
+    def _bucket_wait(self, model: str, tokens: int) -> float:
+        """Zwraca czas oczekiwania na miejsce w kubełkach modelu (0 = można wysłać)."""
+        buckets = self._buckets.get(model, {})
+        return max(
+            [0.0]
+            + ([buckets["rpm"].wait_time(1)] if "rpm" in buckets else [])
+            + ([buckets["tpm"].wait_time(tokens)] if "tpm" in buckets else [])
+        )
+
+    def _acquire(self, model: str, tokens: int, priority: int):
+        """Blokuje do chwili, gdy zapytanie może zostać wysłane, i rezerwuje limity."""
+        buckets = self._buckets.get(model, {})
+        started = time.perf_counter()
+        with self._condition:
+            self._sequence += 1
+            ticket = (priority, self._sequence, tokens)
+            waiting = self._waiting.setdefault(model, [])
+            heapq.heappush(waiting, ticket)
+            while True:
+                wait = None
+                if waiting[0] == ticket and self._active < self.max_concurrency:
+                    wait = self._bucket_wait(model, tokens)
+                    # Wolne miejsce we współbieżności należy się najpierw gotowym do wysłania
+                    # zapytaniom innych modeli o wyższym priorytecie (lub wcześniej zgłoszonym)
+                    if wait == 0.0 and not any(
+                        queue[0] < ticket and self._bucket_wait(other, queue[0][2]) == 0.0
+                        for other, queue in self._waiting.items() if other != model and queue
+                    ):
+                        break
+                    if wait == 0.0:
+                        wait = None
+                self._condition.wait(timeout=wait)
+            heapq.heappop(waiting)
+            for kind, amount in (("rpm", 1), ("tpm", tokens)):
+                if kind in buckets:
+                    buckets[kind].consume(amount)
+            self._active += 1
+            self._condition.notify_all()
+        record_metric("openai.queue_wait", time.perf_counter() - started)
+
+    def _release(self):
+        with self._condition:
+            self._active -= 1
+            self._condition.notify_all()
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        """Opóźnienie przed ponowieniem: nagłówek retry-after lub wykładnicze z rozrzutem."""
+        delay = random.uniform(0, min(OPENAI_BACKOFF_MAX_S, OPENAI_BACKOFF_BASE_S * 2 ** attempt))
+        response = getattr(error, "response", None)
+        try:
+            retry_after = float(response.headers.get("retry-after")) if response is not None else 0.0
+        except (TypeError, ValueError):
+            retry_after = 0.0
+        return min(OPENAI_BACKOFF_MAX_S, max(delay, retry_after))
+
+    def call(self, model: str, request: Callable[[], object], tokens: int = 0):
+        """
+        Wykonuje zapytanie z poszanowaniem limitów i ponawia błędy przejściowe.
+        
+        Args:
+            model (str): Nazwa modelu (klucz ``OPENAI_RATE_LIMITS``)
+            request (Callable): Funkcja bez argumentów wykonująca zapytanie
+            tokens (int): Szacowana liczba tokenów zapytania (limit tokenów/min)
+            
+        Returns:
+            Wynik ``request()``
+            
+        Raises:
+            OpenAIError: Gdy zapytanie nie powiedzie się po wyczerpaniu ponowień
+        """
+        priority = _request_priority.get()
+        for attempt in range(self.max_retries + 1):
+            self._acquire(model, tokens, priority)
+            try:
+                return request()
+            except self.RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                if isinstance(e, RateLimitError):
+                    record_metric("openai.rate_limited", 1)
+                delay = self._backoff(attempt, e)
+                record_metric("openai.retry", 1)
+                logger.warning("Zapytanie OpenAI (%s) nieudane: %s - ponowienie za %.1fs", model, e, delay)
+            finally:
+                self._release()
+            time.sleep(delay)
+
+@st.cache_resource
+def get_openai_scheduler() -> OpenAIScheduler:
+    """Zwraca harmonogram zapytań OpenAI współdzielony przez wszystkie sesje w procesie."""
+    return OpenAIScheduler(OPENAI_RATE_LIMITS)
+
+@st.cache_resource
+def get_qdrant_client():
+    """
+    Tworzy i zwraca klienta bazy danych Qdrant z cache'owaniem i wake-up.
+    
+    Zależnie od ``STORAGE_BACKEND`` jest to klient zdalnego serwera albo wbudowany
+    Qdrant (tryb lokalny) o tym samym API - reszta aplikacji nie rozróżnia backendów.
+    Tryb lokalny nie wykonuje zapytań sieciowych ani budzenia serwera.
+    
+    Returns:
+        QdrantClient: Skonfigurowany klient bazy danych Qdrant
+    """
+    if STORAGE_BACKEND == "memory":
+        logger.info("Używany wbudowany Qdrant w pamięci")
+        return QdrantClient(location=":memory:")
+    if STORAGE_BACKEND == "local":
+        QDRANT_LOCAL_PATH.mkdir(parents=True, exist_ok=True)
+        logger.info("Używany wbudowany Qdrant: %s", QDRANT_LOCAL_PATH)
+        return QdrantClient(path=str(QDRANT_LOCAL_PATH))
+    try:
+        # Pobierz konfigurację z .env lub Streamlit secrets
+        qdrant_url = get_config_value("QDRANT_URL")
+        qdrant_key = get_config_value("QDRANT_API_KEY")
+        
+        if not qdrant_url or not qdrant_key:
+            st.error("Brak konfiguracji Qdrant. Sprawdź .env lub Streamlit secrets.")
+            st.stop()
+        
+        client = QdrantClient(
+            url=qdrant_url,
+            api_key=qdrant_key,
+            timeout=60  # Zwiększony timeout dla uśpionych serwerów
+        )
+        
+        # Wake up serwer - próba prostego zapytania
+        with st.spinner("🔄 Budzenie serwera Qdrant..."):
+            try:
+                collections = client.get_collections()
+                logger.info("Qdrant aktywny, kolekcje: %d", len(collections.collections))
+            except (ConnectionError, TimeoutError, OSError) as wake_error:
+                logger.warning("Pierwszy ping nieudany (serwer się budzi): %s", wake_error)
+                time.sleep(3)  # Czekaj na przebudzenie
+                collections = client.get_collections()  # Drugi ping
+                
+        logger.info("Pomyślnie połączono z Qdrant")
+        return client
+    except (ConnectionError, ValueError, KeyError) as e:
+        log_error(e, "Nie można połączyć się z bazą danych Qdrant")
+        st.stop()
+
+@st.cache_resource
+def initialize_collection():
+    """
+    Inicjalizuje kolekcję w bazie Qdrant z odpowiednią konfiguracją wektorów.
+    
+    Wynik jest cache'owany, więc sprawdzenie kolekcji nie obciąża każdego odświeżenia.
+    
+    Returns:
+        QdrantClient: Klient z zainicjalizowaną kolekcją
+    """
+    try:
+        client = get_qdrant_client()
+        collections = client.get_collections().collections
+        existing = {collection.name for collection in collections}
+        if QDRANT_COLLECTION_NAME not in existing:
+            create_collection_for_profile(client, QDRANT_COLLECTION_NAME, STORAGE_PROFILE)
+        if CHUNK_COLLECTION_NAME not in existing:
+            create_collection_for_profile(
+                client, CHUNK_COLLECTION_NAME, STORAGE_PROFILE, payload_indexes=CHUNK_PAYLOAD_INDEXES,
+            )
+        ensure_payload_indexes()
+        check_collection_profile()
+        return client
+    except (ValueError, KeyError, ConnectionError) as e:
+        log_error(e, "Błąd podczas inicjalizacji kolekcji Qdrant")
+        st.stop()
+
+def reset_collection_cache():
+    """
+    Czyści zapamiętaną inicjalizację kolekcji (np. po błędzie 404 z Qdrant).
+    
+    Kolejne odświeżenie ponownie sprawdzi kolekcje, utworzy brakujące i przebuduje
+    lokalny indeks słów kluczowych, jeśli nie zgadza się z kolekcją.
+    """
+    initialize_collection.clear()
+    ensure_payload_indexes.clear()
+    check_collection_profile.clear()
+    get_keyword_index.clear()
+    logger.warning("Wyczyszczono cache inicjalizacji kolekcji %s", QDRANT_COLLECTION_NAME)
+
+def create_collection_for_profile(client: QdrantClient, collection_name: str, profile: str,
+                                 payload_indexes: Optional[dict] = None):
+    """
+    Tworzy kolekcję notatek skonfigurowaną zgodnie z profilem przechowywania.
+    
+    Args:
+        client (QdrantClient): Klient Qdrant
+        collection_name (str): Nazwa nowej kolekcji
+        profile (str): Klucz ``STORAGE_PROFILES``
+        payload_indexes (dict, optional): Indeksy payloadu (domyślnie ``PAYLOAD_INDEXES``)
+    """
+    settings = STORAGE_PROFILES[profile]
+    quantization_config = None
+    if settings["quantization"] == "scalar":
+        quantization_config = ScalarQuantization(
+            scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True)
+        )
+    elif settings["quantization"] == "binary":
+        quantization_config = BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+    client.create_collection(
+        collection_name=collection_name,
+        vectors_config=VectorParams(size=settings["dim"], distance=Distance.COSINE, on_disk=settings["on_disk"]),
+        quantization_config=quantization_config,
+    )
+    create_payload_indexes(client, collection_name, payload_indexes)
+    logger.info("Utworzono nową kolekcję: %s (profil %s)", collection_name, profile)
+
+def search_params_for_profile(profile: str = STORAGE_PROFILE) -> Optional[SearchParams]:
+    """
+    Zwraca parametry wyszukiwania dla profilu: przy kwantyzacji wyniki są przeliczane
+    (rescoring) na pełnych wektorach, a dla kwantyzacji binarnej pobierany jest nadmiar kandydatów.
+    """
+    quantization = STORAGE_PROFILES[profile]["quantization"]
+    if quantization is None:
+        return None
+    return SearchParams(
+        quantization=QuantizationSearchParams(rescore=True, oversampling=3.0 if quantization == "binary" else 1.5)
+    )
+
+def create_payload_indexes(client: QdrantClient, collection_name: str, indexes: Optional[dict] = None):
+    """Tworzy brakujące indeksy payloadu (domyślnie ``PAYLOAD_INDEXES``) w podanej kolekcji."""
+    existing = client.get_collection(collection_name).payload_schema or {}
+    for field, schema in (indexes or PAYLOAD_INDEXES).items():
+        if field not in existing:
+            client.create_payload_index(
+                collection_name=collection_name,
+                field_name=field,
+                field_schema=schema,
+            )
+            logger.info("Utworzono indeks payloadu: %s.%s (%s)", collection_name, field, schema)
+
+@st.cache_resource
+def check_collection_profile() -> Optional[int]:
+    """
+    Sprawdza (raz na proces), czy wymiar wektorów kolekcji zgadza się z profilem.
+    
+    Returns:
+        int | None: Wymiar wektorów kolekcji, gdy różni się od profilu; None, gdy pasuje
+    """
+    params = get_qdrant_client().get_collection(QDRANT_COLLECTION_NAME).config.params
+    size = getattr(params.vectors, "size", None)
+    if size is None or size == EMBEDDING_DIM:
+        return None
+    logger.error(
+        "Kolekcja %s ma wektory %d-wymiarowe, a profil %s wymaga %d. Uruchom: python reindex.py migrate",
+        QDRANT_COLLECTION_NAME, size, STORAGE_PROFILE, EMBEDDING_DIM,
+    )
+    return size
+
+@st.cache_resource
+def ensure_payload_indexes():
+    """
+    Tworzy brakujące indeksy payloadu (raz na proces, nie przy każdym odświeżeniu).
+    
+    Indeks na ``created_at`` pozwala sortować listę notatek po stronie serwera, indeksy
+    ``content_hash`` i ``audio_md5`` - szybko wykrywać duplikaty, a indeks na ``parent_id``
+    - grupować i usuwać fragmenty notatek.
+    """
+    create_payload_indexes(get_qdrant_client(), QDRANT_COLLECTION_NAME)
+    create_payload_indexes(get_qdrant_client(), CHUNK_COLLECTION_NAME, CHUNK_PAYLOAD_INDEXES)
+
+@st.cache_resource
+def _get_key_verification_state() -> dict:
+    """Zwraca współdzielony stan weryfikacji kluczy OpenAI (wyniki, blokada, pula wątków)."""
+    return {
+        "results": {},
+        "lock": threading.Lock(),
+        "executor": ThreadPoolExecutor(max_workers=2, thread_name_prefix="key-verify"),
+    }
+
+def get_openai_key_status(api_key: str) -> str:
+    """
+    Zwraca status klucza OpenAI bez blokowania renderowania interfejsu.
+    
+    Weryfikacja (``verify_openai_key``) wykonywana jest w tle, a jej wynik jest
+    pamiętany przez ``OPENAI_KEY_VERIFY_TTL_S``. Po wygaśnięciu zwracany jest
+    poprzedni wynik, a w tle uruchamiana jest ponowna weryfikacja.
+    
+    Args:
+        api_key (str): Klucz OpenAI
+        
+    Returns:
+        str: "valid", "invalid" lub "pending" (weryfikacja w toku, brak wcześniejszego wyniku)
+    """
+    state = _get_key_verification_state()
+    key_hash = sha256(api_key.encode("utf-8")).hexdigest()
+    results = state["results"]
+
+    def verify():
+        status = "valid" if verify_openai_key(api_key) else "invalid"
+        with state["lock"]:
+            results[key_hash] = {"status": status, "checked_at": time.time(), "refreshing": False}
+        logger.info("Weryfikacja klucza OpenAI zakończona: %s", status)
+
+    with state["lock"]:
+        entry = results.get(key_hash)
+        expired = entry is None or time.time() - entry.get("checked_at", 0) > OPENAI_KEY_VERIFY_TTL_S
+        if expired and not (entry or {}).get("refreshing"):
+            results[key_hash] = {**(entry or {"status": "pending", "checked_at": 0}), "refreshing": True}
+            state["executor"].submit(verify)
+        return results[key_hash]["status"]
+
+@st.fragment(run_every=OPENAI_KEY_POLL_INTERVAL_S)
+def wait_for_openai_key(api_key: str):
+    """
+    Czeka w tle na zakończenie weryfikacji klucza OpenAI.
+    
+    Fragment odpytuje wynik weryfikacji co ``OPENAI_KEY_POLL_INTERVAL_S``, nie
+    blokując serwera ani reszty interfejsu, a po jej rozstrzygnięciu odświeża
+    całą aplikację (włączając akcje wymagające klucza).
+    """
+    if get_openai_key_status(api_key) != "pending":
+        st.rerun()
+    st.info("⏳ Trwa weryfikacja klucza OpenAI...")
+
+@st.cache_resource
+def _get_startup_state() -> dict:
+    """Zwraca stan procesu potrzebny do odróżnienia zimnego startu od odświeżeń."""
+    return {"first_run_done": False, "lock": threading.Lock()}
+
+def record_script_run_time():
+    """
+    Mierzy czas wykonania skryptu i porównuje go z budżetem.
+    
+    Pierwsze wykonanie w procesie liczone jest jako zimny start, kolejne jako odświeżenia.
+    """
+    elapsed = time.perf_counter() - _SCRIPT_STARTED
+    state = _get_startup_state()
+    with state["lock"]:
+        cold = not state["first_run_done"]
+        state["first_run_done"] = True
+    name, budget = ("startup.cold_start", COLD_START_BUDGET_S) if cold else ("startup.rerun", RERUN_BUDGET_S)
+    record_metric(name, elapsed)
+    if elapsed > budget:
+        logger.warning("%s: %.2fs przekracza budżet %.2fs", name, elapsed, budget)
+
+def verify_openai_key(api_key: str) -> bool:
+    """Weryfikuje poprawność klucza OpenAI przez próbę pobrania własnych usage lub modelu."""
+    try:
+        client = _get_pooled_openai_client(api_key)
+        client.models.list()
+        return True
+    except (OpenAIError, ValueError, KeyError, ConnectionError):
+        return False
+
+# =============================================================================
+# TRWAŁA PAMIĘĆ PODRĘCZNA (SQLITE)
+# =============================================================================
+
+class SQLiteLRUCache:
+    """
+    Trwały cache klucz-wartość w SQLite z ograniczeniem rozmiaru i wypieraniem LRU.
+    
+    Wartości przechowywane są jako bajty; kodowanie (tekst, wektory) należy do wywołującego.
+    Jedna instancja może być bezpiecznie współdzielona przez wiele wątków.
+    """
+
+    def __init__(self, path: Path, table: str, max_bytes: int):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.table = table
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_last_access ON {table}(last_access)")
+        # Łączny rozmiar wpisów trzymany w jednowierszowej tabeli - aktualizowany w tej samej
+        # transakcji co wpisy, więc pozostaje spójny także przy wielu procesach
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table}_meta (id INTEGER PRIMARY KEY CHECK (id = 0), total INTEGER NOT NULL)"
+        )
+        self._conn.execute(
+            f"INSERT OR IGNORE INTO {table}_meta (id, total) SELECT 0, COALESCE(SUM(size), 0) FROM {table}"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Zwraca wartość dla klucza (aktualizując czas dostępu) lub None."""
+        with self._lock:
+            row = self._conn.execute(f"SELECT value FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                record_metric(f"cache.{self.table}.miss", 1)
+                return None
+            self._conn.execute(f"UPDATE {self.table} SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+            record_metric(f"cache.{self.table}.hit", 1)
+            return row[0]
+
+    def put(self, key: str, value: bytes):
+        """Zapisuje wartość i usuwa najdawniej używane wpisy ponad limit rozmiaru."""
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE {self.table}_meta SET total = total + ? - "
+                f"COALESCE((SELECT size FROM {self.table} WHERE key = ?), 0) WHERE id = 0",
+                (len(value), key),
+            )
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, len(value), time.time()),
+            )
+            total = self._conn.execute(f"SELECT total FROM {self.table}_meta WHERE id = 0").fetchone()[0]
+            if total > self.max_bytes:
+                excess = total - self.max_bytes
+                evicted = []
+                for old_key, size in self._conn.execute(
+                    f"SELECT key, size FROM {self.table} ORDER BY last_access ASC"
+                ):
+                    if excess <= 0:
+                        break
+                    evicted.append((old_key,))
+                    excess -= size
+                self._conn.executemany(f"DELETE FROM {self.table} WHERE key = ?", evicted)
+                self._conn.execute(
+                    f"UPDATE {self.table}_meta SET total = ? WHERE id = 0", (self.max_bytes + excess,)
+                )
+                logger.info("Cache %s: usunięto %d najstarszych wpisów", self.table, len(evicted))
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        """Zwraca liczniki trafień/chybień oraz liczbę i łączny rozmiar wpisów."""
+        with self._lock:
+            entries = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+            size = self._conn.execute(f"SELECT total FROM {self.table}_meta WHERE id = 0").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
+
+@st.cache_resource
+def get_transcription_cache() -> SQLiteLRUCache:
+    """Zwraca współdzielony cache transkrypcji (klucz: model, ustawienia przygotowania audio, MD5 nagrania)."""
+    return SQLiteLRUCache(CACHE_DB_PATH, "transcriptions", TRANSCRIPTION_CACHE_MAX_BYTES)
+
+@st.cache_resource
+def get_embedding_cache() -> SQLiteLRUCache:
+    """Zwraca współdzielony cache embeddingów (klucz: model, wymiar, hash tekstu)."""
+    return SQLiteLRUCache(CACHE_DB_PATH, "embeddings", EMBEDDING_CACHE_MAX_BYTES)
+
+# =============================================================================
+# LOKALNY INDEKS SŁÓW KLUCZOWYCH (BM25)
+# =============================================================================
+
+def _parse_note_id(value: str):
+    """Przywraca typ ID notatki zapisanego jako tekst (liczba dla dawnych ID, inaczej UUID)."""
+    return int(value) if value.isdigit() else value
+
+class KeywordIndex:
+    """
+    Lokalny odwrócony indeks tytułów i treści notatek (SQLite FTS5, ranking BM25).
+    
+    Notatki przechowywane są w zwykłej tabeli ``notes`` (klucz: ID notatki), a tabela
+    FTS5 ``notes_search`` indeksuje jej treść (external content) i jest aktualizowana
+    wyzwalaczami po ``rowid`` - edycja i usuwanie nie przeszukują całego indeksu.
+    
+    Indeks jest synchronizowany przy dodawaniu, edycji i usuwaniu notatek. Każda
+    replika aplikacji ma własny indeks - przy starcie procesu indeks o innej liczbie
+    notatek niż kolekcja jest przebudowywany, a po edycjach wykonanych przez inne
+    repliki należy go przebudować ręcznie (``python reindex.py keywords``).
+    """
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Dawny schemat (ID notatki jako kolumna UNINDEXED w FTS5) - indeks zostanie zbudowany od nowa
+        self._conn.execute("DROP TABLE IF EXISTS notes_fts")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS notes (
+                note_id TEXT PRIMARY KEY, created_at TEXT NOT NULL, title TEXT NOT NULL, text TEXT NOT NULL
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS notes_search USING fts5(
+                title, text, content = 'notes', content_rowid = 'rowid',
+                tokenize = 'unicode61 remove_diacritics 2'
+            );
+            CREATE TRIGGER IF NOT EXISTS notes_after_insert AFTER INSERT ON notes BEGIN
+                INSERT INTO notes_search (rowid, title, text) VALUES (new.rowid, new.title, new.text);
+            END;
+            CREATE TRIGGER IF NOT EXISTS notes_after_delete AFTER DELETE ON notes BEGIN
+                INSERT INTO notes_search (notes_search, rowid, title, text)
+                VALUES ('delete', old.rowid, old.title, old.text);
+            END;
+            CREATE TRIGGER IF NOT EXISTS notes_after_update AFTER UPDATE ON notes BEGIN
+                INSERT INTO notes_search (notes_search, rowid, title, text)
+                VALUES ('delete', old.rowid, old.title, old.text);
+                INSERT INTO notes_search (rowid, title, text) VALUES (new.rowid, new.title, new.text);
+            END;
+            """
+        )
+        self._conn.commit()
+
+    def upsert(self, notes: Iterable[dict]):
+        """Dodaje lub zastępuje notatki w indeksie (słowniki z id, title, text, created_at)."""
+        rows = [
+            (str(note["id"]), note.get("created_at") or "brak daty", note.get("title") or "", note["text"])
+            for note in notes
+        ]
+        with self._lock:
+            # UPSERT zachowuje rowid wiersza, więc wyzwalacz podmienia tylko jego wpis w FTS5
+            self._conn.executemany(
+                "INSERT INTO notes (note_id, created_at, title, text) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(note_id) DO UPDATE SET "
+                "created_at = excluded.created_at, title = excluded.title, text = excluded.text",
+                rows,
+            )
+            self._conn.commit()
+
+    def delete(self, note_ids: Iterable):
+        """Usuwa notatki o podanych ID z indeksu."""
+        with self._lock:
+            self._conn.executemany("DELETE FROM notes WHERE note_id = ?", [(str(i),) for i in note_ids])
+            self._conn.commit()
+
+    def search(self, query: str, limit: int = SEARCH_RESULT_LIMIT) -> list[dict]:
+        """
+        Wyszukuje notatki zawierające dowolne ze słów zapytania, od najlepszego wyniku BM25.
+        
+        Returns:
+            list[dict]: Notatki w formacie interfejsu; ``score`` to wynik BM25 (większy = lepszy)
+        """
+        terms = re.findall(r"\w+", query)
+        if not terms:
+            return []
+        # Każde słowo w cudzysłowie - znaki specjalne FTS5 w zapytaniu nie są interpretowane
+        match = " OR ".join(f'"{term}"' for term in terms)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT notes.note_id, notes.created_at, notes.title, notes.text, "
+                "bm25(notes_search, 2.0, 1.0) AS rank "
+                "FROM notes_search JOIN notes ON notes.rowid = notes_search.rowid "
+                "WHERE notes_search MATCH ? ORDER BY rank LIMIT ?",
+                (match, limit),
+            ).fetchall()
+        return [
+            {
+                "id": _parse_note_id(note_id),
+                "title": title or "Brak tytułu",
+                "text": text,
+                "created_at": created_at,
+                "score": round(-rank, 3),
+            }
+            for note_id, created_at, title, text, rank in rows
+        ]
+
+    def count(self) -> int:
+        """Zwraca liczbę notatek w indeksie."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM notes").fetchone()[0]
+
+    def rebuild(self, notes: Iterable[dict]) -> int:
+        """Czyści indeks i buduje go od nowa z podanych notatek; zwraca ich liczbę."""
+        with self._lock:
+            self._conn.execute("DELETE FROM notes")
+            self._conn.execute("INSERT INTO notes_search (notes_search) VALUES ('rebuild')")
+            self._conn.commit()
+        count = 0
+        batch = []
+        for note in notes:
+            batch.append(note)
+            if len(batch) >= 500:
+                self.upsert(batch)
+                count += len(batch)
+                batch = []
+        self.upsert(batch)
+        return count + len(batch)
+
+@st.cache_resource
+def get_keyword_index() -> KeywordIndex:
+    """
+    Zwraca współdzielony indeks słów kluczowych.
+    
+    Przy pierwszym użyciu w procesie indeks jest budowany z notatek w Qdrant, jeśli
+    jest pusty lub liczba notatek różni się od kolekcji (zmiany z innych replik).
+    """
+    index = KeywordIndex(KEYWORD_INDEX_PATH)
+    stored = get_qdrant_client().count(collection_name=QDRANT_COLLECTION_NAME, exact=True).count
+    if index.count() != stored:
+        indexed = index.rebuild(iter_notes())
+        logger.info("Zbudowano indeks słów kluczowych: %d notatek", indexed)
+    return index
+
+def reciprocal_rank_fusion(result_lists: list[list[dict]], k: int = SEARCH_RRF_K) -> list[dict]:
+    """
+    Łączy kilka rankingów notatek metodą reciprocal rank fusion (RRF).
+    
+    Args:
+        result_lists (list[list[dict]]): Rankingi notatek (od najlepszej)
+        k (int): Stała wygładzająca RRF
+        
+    Returns:
+        list[dict]: Połączony ranking; ``score`` zawiera wynik RRF
+    """
+    fused: dict[str, dict] = {}
+    scores: dict[str, float] = {}
+    for results in result_lists:
+        for rank, note in enumerate(results, start=1):
+            key = str(note["id"])
+            # Pola z kolejnych rankingów uzupełniają notatkę (np. ``snippet`` z wyszukiwania wektorowego)
+            fused[key] = {**note, **fused[key]} if key in fused else note
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    ranked = sorted(fused, key=scores.__getitem__, reverse=True)
+    return [{**fused[key], "score": round(scores[key], 4)} for key in ranked]
+
+# =============================================================================
+# PAMIĘĆ PODRĘCZNA WYNIKÓW WYSZUKIWANIA
+# =============================================================================
+
+class SearchResultCache:
+    """
+    Cache wyników wyszukiwania w pamięci procesu, ograniczony czasem życia (TTL) i liczbą wpisów (LRU).
+    
+    Klucz zawiera zapytanie w oryginalnej postaci (taką otrzymuje model embeddingów, więc
+    zapytania różniące się wielkością liter nie dzielą wyników), tryb, filtry i numer
+    wersji kolekcji. Zapis notatki podbija wersję, więc wcześniejsze wyniki przestają być
+    używane bez skanowania cache. W trybie ``precise`` usunięcie notatek unieważnia tylko wpisy, których wyniki
+    je zawierają; dodanie i edycja zawsze podbijają wersję, bo nowa lub zmieniona notatka
+    może zacząć pasować do zapytań, w których wynikach jej nie było.
+    """
+
+    def __init__(self, max_entries: int = SEARCH_CACHE_MAX_ENTRIES, ttl_s: float = SEARCH_CACHE_TTL_S,
+                 invalidation: str = SEARCH_CACHE_INVALIDATION):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.invalidation = invalidation
+        self.version = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, query: str, mode: str, filters: Optional[dict] = None) -> tuple:
+        """Buduje klucz wpisu dla bieżącej wersji kolekcji."""
+        frozen_filters = tuple(sorted((filters or {}).items()))
+        return query, mode, repr(frozen_filters), self.version
+
+    def get(self, key: tuple) -> Optional[list[dict]]:
+        """Zwraca kopię zapamiętanych wyników lub None (brak, wygasły albo nieaktualny wpis)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(key, None)
+                record_metric("cache.search.miss", 1)
+                return None
+            self._entries.move_to_end(key)
+        record_metric("cache.search.hit", 1)
+        return [dict(note) for note in entry[1]]
+
+    def put(self, key: tuple, results: list[dict]):
+        """Zapamiętuje wyniki (kopię) i usuwa najdawniej używane wpisy ponad limit."""
+        note_ids = {str(note["id"]) for note in results}
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_s, [dict(note) for note in results], note_ids)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, note_ids: Optional[Iterable] = None, deleted: bool = False):
+        """
+        Unieważnia wyniki po zapisie notatek.
+        
+        Args:
+            note_ids (Iterable, optional): ID dodanych, zmienionych lub usuniętych notatek
+            deleted (bool): Czy notatki zostały usunięte (tylko wtedy możliwe jest unieważnienie ``precise``)
+        """
+        with self._lock:
+            if not deleted or note_ids is None or self.invalidation != "precise":
+                self.version += 1
+                # Wpisy starszych wersji nie będą już odczytane - zwalniamy pamięć od razu
+                self._entries.clear()
+                return
+            changed = {str(note_id) for note_id in note_ids}
+            for key in [key for key, entry in self._entries.items() if entry[2] & changed]:
+                del self._entries[key]
+
+@st.cache_resource
+def get_search_cache() -> SearchResultCache:
+    """Zwraca cache wyników wyszukiwania współdzielony przez wszystkie sesje w procesie."""
+    return SearchResultCache()
+
+class CollectionVersion:
+    """Licznik wersji kolekcji notatek, podbijany przy każdym zapisie (klucz cache widoku listy)."""
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def bump(self) -> int:
+        """Podbija i zwraca numer wersji."""
+        with self._lock:
+            self.value += 1
+            return self.value
+
+@st.cache_resource
+def get_collection_version() -> CollectionVersion:
+    """Zwraca licznik wersji kolekcji współdzielony przez wszystkie sesje w procesie."""
+    return CollectionVersion()
+
+def notify_notes_changed(note_ids: Optional[Iterable] = None, deleted: bool = False):
+    """Informuje pamięci podręczne (wyszukiwanie, lista) o zapisie, edycji lub usunięciu notatek."""
+    get_collection_version().bump()
+    get_search_cache().invalidate(note_ids, deleted=deleted)
+
+@st.cache_resource(max_entries=QUERY_EMBEDDING_CACHE_MAX_ENTRIES, show_spinner=False)
+def get_query_embedding(query: str) -> tuple[float, ...]:
+    """
+    Zwraca embedding zapytania (w oryginalnej postaci), zapamiętany w pamięci procesu.
+    
+    Ponowione zapytanie nie odczytuje nawet trwałego cache embeddingów. Błędy nie są
+    zapamiętywane - kolejne wyszukiwanie ponowi zapytanie do API.
+    """
+    return tuple(get_embeddings_many([query])[0])
+
+# =============================================================================
+# FUNKCJE TRANSKRYPCJI AUDIO (SEGMENTACJA I RÓWNOLEGŁE PRZETWARZANIE)
+# =============================================================================
+
+# Nagranie w pamięci (bytes) lub plik na dysku (Path) - funkcje transkrypcji przyjmują oba
+AudioSource = Union[bytes, Path]
+
+@st.cache_resource
+def get_upload_spool_dir() -> Path:
+    """Zwraca katalog nagrań, usuwając raz na proces pliki starsze niż ``UPLOAD_SPOOL_RETENTION_S``."""
+    UPLOAD_SPOOL_DIR.mkdir(parents=True, exist_ok=True)
+    expired_before = time.time() - UPLOAD_SPOOL_RETENTION_S
+    for path in UPLOAD_SPOOL_DIR.iterdir():
+        if path.is_file() and path.stat().st_mtime < expired_before:
+            path.unlink(missing_ok=True)
+    return UPLOAD_SPOOL_DIR
+
+def audio_md5(audio: AudioSource) -> str:
+    """Liczy MD5 nagrania; plik czytany jest porcjami, bez wczytywania całości do pamięci."""
+    if isinstance(audio, (bytes, bytearray)):
+        return md5(audio).hexdigest()
+    digest = md5()
+    with open(audio, "rb") as source:
+        for chunk in iter(lambda: source.read(SPOOL_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def audio_size(audio: AudioSource) -> int:
+    """Zwraca rozmiar nagrania w bajtach."""
+    return len(audio) if isinstance(audio, (bytes, bytearray)) else Path(audio).stat().st_size
+
+def open_audio(audio: AudioSource) -> BinaryIO:
+    """Zwraca obiekt plikowy nagrania z atrybutem ``name`` (rozszerzenie określa format dla Whisper)."""
+    if isinstance(audio, (bytes, bytearray)):
+        audio_file = BytesIO(audio)
+        audio_file.name = "audio.mp3"
+        return audio_file
+    return open(audio, "rb")
+
+def _store_spooled_file(part_path: Path, digest: str, suffix: str) -> Path:
+    """Nadaje zapisanemu plikowi nazwę od skrótu treści (to samo nagranie zapisywane jest raz)."""
+    path = part_path.parent / f"{digest}{suffix}"
+    part_path.replace(path)
+    return path
+
+def spool_audio(source: BinaryIO, suffix: str) -> tuple[Path, str]:
+    """
+    Zapisuje strumień nagrania na dysk porcjami, licząc MD5 w trakcie odczytu.
+    
+    Args:
+        source (BinaryIO): Strumień nagrania, np. plik wgrany przez ``st.file_uploader``
+        suffix (str): Rozszerzenie pliku z kropką, np. ".wav"
+        
+    Returns:
+        tuple[Path, str]: Ścieżka zapisanego nagrania i jego MD5
+    """
+    digest = md5()
+    with tempfile.NamedTemporaryFile(dir=get_upload_spool_dir(), suffix=".part", delete=False) as spool:
+        for chunk in iter(lambda: source.read(SPOOL_CHUNK_BYTES), b""):
+            digest.update(chunk)
+            spool.write(chunk)
+    return _store_spooled_file(Path(spool.name), digest.hexdigest(), suffix), digest.hexdigest()
+
+def spool_audio_segment(segment: AudioSegment, export_format: str = "mp3") -> tuple[Path, str]:
+    """Eksportuje nagranie z rejestratora bezpośrednio do pliku; zwraca ścieżkę i MD5."""
+    with tempfile.NamedTemporaryFile(dir=get_upload_spool_dir(), suffix=".part", delete=False) as spool:
+        segment.export(spool, format=export_format)
+    part_path = Path(spool.name)
+    digest = audio_md5(part_path)
+    return _store_spooled_file(part_path, digest, f".{export_format}"), digest
+
+def whisper_transcribe_segment(audio_file) -> str:
+    """
+    Domyślny backend transkrypcji - wysyła jeden plik audio do OpenAI Whisper.
+    
+    Args:
+        audio_file: Obiekt plikowy z atrybutem ``name`` (rozszerzenie określa format)
+        
+    Returns:
+        str: Tekst transkrypcji
+    """
+    openai_client = get_openai_client()
+
+    def request():
+        audio_file.seek(0)
+        return openai_client.audio.transcriptions.create(
+            file=audio_file,
+            model=AUDIO_TRANSCRIBE_MODEL,
+            response_format="text",
+        )
+
+    transcript = get_openai_scheduler().call(AUDIO_TRANSCRIBE_MODEL, request)
+    return str(transcript).strip()
+
+def audio_preprocess_signature() -> str:
+    """Zwraca opis ustawień przygotowania audio - część klucza cache transkrypcji."""
+    if not AUDIO_PREPROCESS:
+        return "raw"
+    signature = f"{AUDIO_PREPROCESS_SAMPLE_RATE}hz-mono-{AUDIO_PREPROCESS_BITRATE}"
+    if AUDIO_TRIM_SILENCE:
+        signature += f"-trim{AUDIO_TRIM_MAX_SILENCE_MS}"
+    return signature
+
+def shorten_silences(audio: AudioSegment, max_silence_ms: int = AUDIO_TRIM_MAX_SILENCE_MS) -> AudioSegment:
+    """
+    Skraca pauzy dłuższe niż ``max_silence_ms`` (także na początku i końcu nagrania).
+    
+    Args:
+        audio (AudioSegment): Zdekodowane nagranie
+        max_silence_ms (int): Maksymalna długość pauzy po skróceniu
+        
+    Returns:
+        AudioSegment: Nagranie ze skróconymi pauzami
+    """
+    if audio.dBFS == float("-inf"):
+        return audio
+    silences = detect_silence(
+        audio,
+        min_silence_len=max_silence_ms,
+        silence_thresh=audio.dBFS - TRANSCRIBE_SILENCE_THRESH_DB,
+        seek_step=10,
+    )
+    if not silences:
+        return audio
+    keep = max_silence_ms // 2
+    parts, position = [], 0
+    for silence_start, silence_end in silences:
+        parts.append(audio[position:silence_start + keep])
+        position = silence_end - keep
+    parts.append(audio[position:])
+    return sum(parts[1:], parts[0])
+
+def preprocess_audio(audio: AudioSegment, trim_silence: bool = AUDIO_TRIM_SILENCE) -> AudioSegment:
+    """
+    Przygotowuje nagranie do transkrypcji: mono, ``AUDIO_PREPROCESS_SAMPLE_RATE`` Hz, opcjonalnie bez długich pauz.
+    
+    Kodowanie do MP3 o niskim bitrate odbywa się później, osobno dla każdego segmentu
+    w puli wątków transkrypcji.
+    
+    Args:
+        audio (AudioSegment): Zdekodowane nagranie
+        trim_silence (bool): Czy skracać długie pauzy
+        
+    Returns:
+        AudioSegment: Nagranie gotowe do podziału na segmenty
+    """
+    audio = audio.set_channels(1).set_frame_rate(AUDIO_PREPROCESS_SAMPLE_RATE)
+    if trim_silence:
+        audio = shorten_silences(audio)
+    return audio
+
+def split_audio_on_silence(audio: AudioSegment,
+                           segment_ms: int = TRANSCRIBE_SEGMENT_MS,
+                           overlap_ms: int = TRANSCRIBE_OVERLAP_MS) -> list[tuple[int, int]]:
+    """
+    Dzieli nagranie na zachodzące na siebie segmenty, tnąc w miejscach ciszy.
+    
+    Cisza wyszukiwana jest tylko w drugiej połowie każdego docelowego segmentu,
+    dzięki czemu koszt analizy nie rośnie z kwadratem długości nagrania. Gdy w oknie
+    nie ma ciszy, segment jest cięty "na twardo" - zakładka chroni wtedy słowa na granicy.
+    
+    Args:
+        audio (AudioSegment): Zdekodowane nagranie
+        segment_ms (int): Docelowa maksymalna długość segmentu
+        overlap_ms (int): Długość zakładki dodawanej po obu stronach cięcia
+        
+    Returns:
+        list[tuple[int, int]]: Lista par (początek, koniec) w milisekundach
+    """
+    total_ms = len(audio)
+    if total_ms <= segment_ms:
+        return [(0, total_ms)]
+
+    silence_thresh = audio.dBFS - TRANSCRIBE_SILENCE_THRESH_DB
+    cuts = []
+    position = 0
+    while total_ms - position > segment_ms:
+        window_start = position + segment_ms // 2
+        window_end = position + segment_ms
+        silences = detect_silence(
+            audio[window_start:window_end],
+            min_silence_len=TRANSCRIBE_MIN_SILENCE_MS,
+            silence_thresh=silence_thresh,
+            seek_step=10,
+        )
+        if silences:
+            # Tniemy w środku najpóźniejszej ciszy w oknie
+            silence_start, silence_end = silences[-1]
+            cut = window_start + (silence_start + silence_end) // 2
+        else:
+            cut = window_end
+        cuts.append(cut)
+        position = cut
+
+    boundaries = [0] + cuts + [total_ms]
+    return [
+        (max(0, boundaries[i] - overlap_ms), min(total_ms, boundaries[i + 1] + overlap_ms))
+        for i in range(len(boundaries) - 1)
+    ]
+
+def _normalize_words(text: str) -> list[str]:
+    """Zamienia tekst na listę słów bez interpunkcji i wielkich liter (do porównań)."""
+    return [re.sub(r"[^\w]", "", word.lower()) for word in text.split()]
+
+def stitch_transcripts(parts: list[str], max_overlap_words: int = 30, max_skew_words: int = 5) -> str:
+    """
+    Skleja transkrypcje kolejnych segmentów, usuwając tekst zdublowany przez zakładki.
+    
+    Dla każdej pary sąsiednich fragmentów szukany jest najdłuższy ciąg słów kończący
+    poprzedni fragment, który występuje na (prawie) samym początku następnego.
+    
+    Args:
+        parts (list[str]): Transkrypcje segmentów w kolejności nagrania
+        max_overlap_words (int): Maksymalna długość porównywanej zakładki w słowach
+        max_skew_words (int): O ile słów dopasowanie może być przesunięte od początku
+        
+    Returns:
+        str: Połączony tekst transkrypcji
+    """
+    result_words: list[str] = []
+    for part in parts:
+        words = part.split()
+        if not words:
+            continue
+        if result_words:
+            tail = _normalize_words(" ".join(result_words[-max_overlap_words:]))
+            head = _normalize_words(" ".join(words[:max_overlap_words + max_skew_words]))
+            drop = 0
+            for length in range(min(len(tail), len(head)), 0, -1):
+                # Pojedyncze słowo to zbyt słaby sygnał, by dopuścić przesunięcie
+                max_skew = max_skew_words if length > 1 else 0
+                for skew in range(0, min(max_skew, len(head) - length) + 1):
+                    if tail[-length:] == head[skew:skew + length]:
+                        drop = skew + length
+                        break
+                if drop:
+                    break
+            words = words[drop:]
+        result_words.extend(words)
+    return " ".join(result_words)
+
+def transcribe_audio_segments(audio_source: AudioSource,
+                              transcribe_fn: Optional[Callable] = None,
+                              max_workers: int = TRANSCRIBE_MAX_WORKERS,
+                              preprocess: bool = AUDIO_PREPROCESS) -> tuple[str, dict]:
+    """
+    Transkrybuje nagranie podzielone na segmenty przy użyciu ograniczonej puli wątków.
+    
+    Z włączonym przygotowaniem audio nagranie jest sprowadzane do mono 16 kHz, a segmenty
+    kodowane w puli wątków do MP3 o niskim bitrate (zwykle kilka razy mniej danych do wysłania).
+    Nagrania, których nie da się zdekodować, wysyłane są w całości, tak jak wcześniej.
+    Backend transkrypcji można podmienić, np. na lokalną atrapę w testach.
+    
+    Args:
+        audio_source (bytes | Path): Surowe dane audio lub ścieżka do pliku nagrania
+        transcribe_fn (Callable, optional): Funkcja przyjmująca obiekt plikowy i zwracająca tekst
+        max_workers (int): Maksymalna liczba równoległych transkrypcji
+        preprocess (bool): Czy przygotować nagranie przed wysłaniem (patrz ``preprocess_audio``)
+        
+    Returns:
+        tuple[str, dict]: Tekst transkrypcji oraz statystyki (opóźnienia segmentów, przyspieszenie,
+        liczba wysłanych bajtów)
+    """
+    transcribe_fn = transcribe_fn or whisper_transcribe_segment
+    started = time.perf_counter()
+    source_size = audio_size(audio_source)
+
+    try:
+        # Plik dekodowany jest bezpośrednio z dysku, bez kopii w pamięci
+        decode_input = BytesIO(audio_source) if isinstance(audio_source, (bytes, bytearray)) else str(audio_source)
+        audio = AudioSegment.from_file(decode_input)
+        if preprocess:
+            preprocess_started = time.perf_counter()
+            audio = preprocess_audio(audio)
+            record_metric("audio.preprocess_latency", time.perf_counter() - preprocess_started)
+        ranges = split_audio_on_silence(audio)
+    except (CouldntDecodeError, OSError, IndexError) as e:
+        logger.warning("Nie udało się zdekodować audio, transkrypcja w jednym zapytaniu: %s", e)
+        audio, ranges = None, [(0, 0)]
+
+    if "ffmpeg" in MISSING_DEPS:
+        export_options = {"format": "wav"}
+    elif preprocess:
+        export_options = {"format": "mp3", "bitrate": AUDIO_PREPROCESS_BITRATE}
+    else:
+        export_options = {"format": "mp3"}
+
+    def run_segment(index: int, segment_range: tuple[int, int]) -> tuple[str, float, int]:
+        segment_file = None
+        if audio is not None and (preprocess or len(ranges) > 1):
+            segment_file = BytesIO()
+            audio[segment_range[0]:segment_range[1]].export(segment_file, **export_options)
+            segment_file.name = f"segment_{index}.{export_options['format']}"
+            # Już skompresowane krótkie nagranie może być mniejsze niż wynik ponownego kodowania
+            if len(ranges) == 1 and segment_file.getbuffer().nbytes >= source_size:
+                segment_file = None
+        if segment_file is None:
+            segment_file = open_audio(audio_source)
+        with segment_file:
+            segment_bytes = segment_file.seek(0, io.SEEK_END)
+            segment_file.seek(0)
+            segment_started = time.perf_counter()
+            text = transcribe_fn(segment_file)
+        return text, time.perf_counter() - segment_started, segment_bytes
+
+    parallel_started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(ranges)))) as executor:
+        futures = [
+            executor.submit(contextvars.copy_context().run, run_segment, index, segment_range)
+            for index, segment_range in enumerate(ranges)
+        ]
+        results = [future.result() for future in futures]
+    parallel_time = time.perf_counter() - parallel_started
+
+    texts = [text for text, _, _ in results]
+    latencies = [latency for _, latency, _ in results]
+    bytes_sent = sum(segment_bytes for _, _, segment_bytes in results)
+    wall_time = time.perf_counter() - started
+    stats = {
+        "segments": len(ranges),
+        "segment_latencies": latencies,
+        "wall_time": wall_time,
+        # Przyspieszenie względem sekwencyjnego wysyłania tych samych segmentów
+        "speedup": sum(latencies) / parallel_time if parallel_time > 0 else 1.0,
+        "bytes_in": source_size,
+        "bytes_sent": bytes_sent,
+    }
+    for latency in latencies:
+        record_metric("transcription.segment_latency", latency)
+    record_metric("transcription.wall_time", wall_time)
+    record_metric("transcription.speedup", stats["speedup"])
+    # Osobne metryki z i bez przygotowania audio pozwalają porównać oba warianty
+    variant = "preprocessed" if preprocess and audio is not None else "original"
+    record_metric(f"transcription.wall_time.{variant}", wall_time)
+    record_metric(f"audio.bytes_sent.{variant}", bytes_sent)
+    record_metric("audio.byte_reduction", 1.0 - bytes_sent / source_size if source_size else 0.0)
+    logger.info(
+        "Transkrypcja: %d segmentów, czas %.2fs, przyspieszenie x%.2f, wysłano %d z %d bajtów",
+        stats["segments"], wall_time, stats["speedup"], bytes_sent, source_size,
+    )
+    return stitch_transcripts(texts), stats
+
+def transcribe_audio(audio_source: AudioSource):
+    """
+    Transkrypcja pliku audio za pomocą OpenAI Whisper API.
+    
+    Długie nagrania są dzielone na segmenty w miejscach ciszy i transkrybowane
+    równolegle (patrz ``transcribe_audio_segments``). Wynik zapisywany jest w trwałym
+    cache, więc ponowne wgranie tego samego pliku nie wywołuje już Whisper.
+    
+    Args:
+        audio_source: Surowe dane audio (MP3, WAV, M4A) lub ścieżka do pliku nagrania
+        
+    Returns:
+        str: Tekst transkrypcji audio lub None w przypadku błędu
+    """
+    try:
+        with st.spinner("Transkrypcja audio..."):
+            if not audio_source or not audio_size(audio_source):
+                st.error("Nie otrzymano danych audio")
+                return None
+            return transcribe_audio_cached(audio_source)
+    except (OpenAIError, ValueError, TypeError, KeyError, ConnectionError) as e:
+        log_error(e, "Błąd transkrypcji")
+        return None
+
+def transcribe_audio_cached(audio_source: AudioSource, digest: Optional[str] = None) -> str:
+    """
+    Transkrypcja z użyciem trwałego cache, bez elementów interfejsu (także dla zadań w tle).
+    
+    Args:
+        audio_source (bytes | Path): Surowe dane audio lub ścieżka do pliku nagrania
+        digest (str, optional): MD5 nagrania policzony już przy zapisie na dysk (bez ponownego odczytu pliku)
+        
+    Returns:
+        str: Tekst transkrypcji
+        
+    Raises:
+        OpenAIError: Gdy transkrypcja się nie powiedzie
+    """
+    cache = get_transcription_cache()
+    cache_key = f"{AUDIO_TRANSCRIBE_MODEL}:{audio_preprocess_signature()}:{digest or audio_md5(audio_source)}"
+    cached = cache.get(cache_key)
+    if cached is not None:
+        logger.info("Transkrypcja pobrana z cache (%s)", cache_key)
+        return cached.decode("utf-8")
+    text, _ = transcribe_audio_segments(audio_source)
+    if text:
+        cache.put(cache_key, text.encode("utf-8"))
+    logger.info("Transkrypcja audio zakończona pomyślnie")
+    return text
+
+# =============================================================================
+# METADANE I FILTRY NOTATEK
+# =============================================================================
+
+def detect_language(text: str) -> Optional[str]:
+    """Rozpoznaje język tekstu po najczęstszych słowach (``LANGUAGE_STOPWORDS``); None, gdy brak trafień."""
+    words = re.findall(r"\w+", text.casefold())[:LANGUAGE_DETECT_MAX_WORDS]
+    hits = {language: sum(word in stopwords for word in words) for language, stopwords in LANGUAGE_STOPWORDS.items()}
+    language = max(hits, key=hits.get)
+    return language if hits[language] else None
+
+def parse_tags(tags: Union[str, Iterable[str], None]) -> list[str]:
+    """Zamienia tagi (tekst oddzielony przecinkami lub lista) na listę małych liter bez powtórzeń."""
+    if isinstance(tags, str):
+        tags = tags.split(",")
+    return list(dict.fromkeys(tag.strip().lower() for tag in tags or [] if tag.strip()))
+
+def note_text_metadata(note_text: str) -> dict:
+    """Zwraca metadane wyliczane z treści notatki: liczbę słów i język."""
+    metadata = {"word_count": len(note_text.split())}
+    language = detect_language(note_text)
+    if language:
+        metadata["language"] = language
+    return metadata
+
+def note_metadata(payload: dict) -> dict:
+    """Wybiera z payloadu (lub notatki) pola metadanych ``NOTE_METADATA_INDEXES``."""
+    return {field: payload[field] for field in NOTE_METADATA_INDEXES if payload.get(field) is not None}
+
+def audio_duration_s(audio: AudioSource) -> Optional[float]:
+    """Zwraca długość nagrania z pliku (ffprobe, bez dekodowania) lub None, gdy nie da się jej odczytać."""
+    try:
+        return round(float(mediainfo(str(audio))["duration"]), 1)
+    except (KeyError, ValueError, TypeError, OSError) as e:
+        logger.warning("Nie udało się odczytać długości nagrania %s: %s", audio, e)
+        return None
+
+def build_notes_filter(filters: Optional[dict]) -> Optional[Filter]:
+    """
+    Zamienia filtry listy i wyszukiwania na filtr Qdrant (warunki na indeksowanych polach payloadu).
+    
+    Zakres dat sprawdzany jest na ``created_ts``, a dla notatek bez uzupełnionych metadanych
+    na ``created_at`` - operacje zbiorcze według daty obejmują także starsze notatki.
+    
+    Args:
+        filters (dict, optional): Klucze ``date_from``/``date_to`` (date, włącznie),
+            ``min_duration_s``/``max_duration_s``, ``min_words``/``max_words``, ``language``
+            oraz ``tags`` (notatka ma dowolny z tagów); brakujące klucze nie ograniczają wyników
+            
+    Returns:
+        Filter | None: Filtr lub None, gdy żaden warunek nie jest ustawiony
+    """
+    filters = filters or {}
+    conditions = []
+
+    def add_range(field: str, gte, lte):
+        if gte is not None or lte is not None:
+            conditions.append(FieldCondition(key=field, range=Range(gte=gte, lte=lte)))
+
+    date_from, date_to = filters.get("date_from"), filters.get("date_to")
+    if date_from or date_to:
+        start = datetime.combine(date_from, dt_time.min) if date_from else None
+        end = datetime.combine(date_to, dt_time.max) if date_to else None
+        conditions.append(Filter(should=[
+            FieldCondition(key="created_ts", range=Range(
+                gte=start.timestamp() if start else None, lte=end.timestamp() if end else None,
+            )),
+            # Notatki sprzed wprowadzenia metadanych (bez created_ts) - zakres dat na created_at
+            Filter(must=[
+                IsEmptyCondition(is_empty=PayloadField(key="created_ts")),
+                FieldCondition(key="created_at", range=DatetimeRange(gte=start, lte=end)),
+            ]),
+        ]))
+    add_range("duration_s", filters.get("min_duration_s"), filters.get("max_duration_s"))
+    add_range("word_count", filters.get("min_words"), filters.get("max_words"))
+    if filters.get("language"):
+        conditions.append(FieldCondition(key="language", match=MatchValue(value=filters["language"])))
+    tags = parse_tags(filters.get("tags"))
+    if tags:
+        conditions.append(FieldCondition(key="tags", match=MatchAny(any=tags)))
+    return Filter(must=conditions) if conditions else None
+
+def filter_notes(notes: list[dict], notes_filter: Optional[Filter]) -> list[dict]:
+    """Zostawia notatki spełniające filtr - jedno zapytanie do Qdrant ograniczone do ich ID."""
+    if notes_filter is None or not notes:
+        return notes
+    points, _ = get_qdrant_client().scroll(
+        collection_name=QDRANT_COLLECTION_NAME,
+        scroll_filter=Filter(must=[HasIdCondition(has_id=[note["id"] for note in notes]), notes_filter]),
+        limit=len(notes),
+        with_payload=False,
+        with_vectors=False,
+    )
+    allowed = {str(point.id) for point in points}
+    return [note for note in notes if str(note["id"]) in allowed]
+
+# =============================================================================
+# FUNKCJE OBSŁUGI BAZY DANYCH I EMBEDDINGÓW
+# =============================================================================
+
+def _embedding_cache_key(text: str, dimensions: int = EMBEDDING_DIM) -> str:
+    """Buduje klucz cache embeddingu z modelu, wymiaru i znormalizowanego tekstu."""
+    normalized = " ".join(text.split())
+    return sha256(f"{EMBEDDING_MODEL}:{dimensions}:{normalized}".encode("utf-8")).hexdigest()
+
+def embedding_input(text: str) -> str:
+    """Przycina treść notatki do ``EMBEDDING_INPUT_MAX_CHARS`` - tekst wysyłany do embeddingu całej notatki."""
+    return text[:EMBEDDING_INPUT_MAX_CHARS]
+
+def _estimate_tokens(text: str) -> int:
+    """Zgrubne (zawyżone) oszacowanie liczby tokenów - ok. 3 znaki na token."""
+    return len(text) // 3 + 1
+
+def _embedding_batches(texts: list[str]) -> list[list[str]]:
+    """Dzieli teksty na paczki mieszczące się w limitach elementów i tokenów API."""
+    batches: list[list[str]] = []
+    current: list[str] = []
+    current_tokens = 0
+    for text in texts:
+        tokens = _estimate_tokens(text)
+        if current and (len(current) >= EMBEDDING_BATCH_MAX_ITEMS
+                        or current_tokens + tokens > EMBEDDING_BATCH_MAX_TOKENS):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(text)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+def get_embeddings_many(texts: list[str], dimensions: int = EMBEDDING_DIM) -> list[list[float]]:
+    """
+    Generuje embeddingi dla wielu tekstów, korzystając z cache i paczkowania zapytań.
+    
+    Teksty obecne w cache (lub powtórzone na liście) nie trafiają do API. Pozostałe
+    wysyłane są w możliwie dużych paczkach, z zachowaniem limitów elementów i tokenów.
+    
+    Args:
+        texts (list[str]): Teksty do przekonwertowania na embeddingi
+        dimensions (int): Wymiar wektorów (domyślnie zgodny z profilem przechowywania)
+        
+    Returns:
+        list[list[float]]: Wektory w kolejności odpowiadającej ``texts``
+        
+    Raises:
+        OpenAIError: Gdy zapytanie do API się nie powiedzie
+    """
+    cache = get_embedding_cache()
+    keys = [_embedding_cache_key(text, dimensions) for text in texts]
+    vectors: dict[str, list[float]] = {}
+    missing: dict[str, str] = {}
+    for key, text in zip(keys, texts):
+        if key in vectors or key in missing:
+            continue
+        cached = cache.get(key)
+        if cached is not None:
+            vectors[key] = array("f", cached).tolist()
+        else:
+            missing[key] = text
+
+    if missing:
+        openai_client = get_openai_client()
+        missing_keys = list(missing)
+        offset = 0
+        for batch in _embedding_batches(list(missing.values())):
+            result = get_openai_scheduler().call(
+                EMBEDDING_MODEL,
+                lambda batch=batch: openai_client.embeddings.create(
+                    input=batch,
+                    model=EMBEDDING_MODEL,
+                    dimensions=dimensions,
+                ),
+                tokens=sum(_estimate_tokens(text) for text in batch),
+            )
+            for item in result.data:
+                key = missing_keys[offset + item.index]
+                vectors[key] = item.embedding
+                cache.put(key, array("f", item.embedding).tobytes())
+            offset += len(batch)
+        logger.info("Embeddingi: %d z cache, %d z API", len(vectors) - len(missing), len(missing))
+
+    return [vectors[key] for key in keys]
+
+def get_embeddings(text: str) -> list[float]:
+    """
+    Generuje wektor embeddings dla podanego tekstu przy użyciu OpenAI API.
+    
+    Korzysta z ``get_embeddings_many``, więc niezmieniony tekst (np. powtórzone
+    zapytanie wyszukiwania) jest obsługiwany z cache bez wywołania API.
+    
+    Args:
+        text (str): Tekst do przekonwertowania na embedding
+        
+    Returns:
+        list[float]: Lista liczb reprezentująca wektor embeddings lub pusta lista w przypadku błędu
+    """
+    try:
+        return get_embeddings_many([text])[0]
+    except (OpenAIError, ValueError, TypeError, KeyError, ConnectionError) as e:
+        log_error(e, "Błąd podczas generowania wektora embeddings")
+        return []
+
+@st.cache_resource
+def get_enrichment_executor() -> ThreadPoolExecutor:
+    """
+    Zwraca współdzieloną pulę wątków wzbogacania notatek (jedną na proces).
+    
+    Przekroczenie limitu czasu kroku nie blokuje zapisu na zakończenie wątku.
+    """
+    return ThreadPoolExecutor(max_workers=ENRICHMENT_MAX_WORKERS, thread_name_prefix="enrich")
+
+def _default_enrichment_steps() -> dict[str, Callable[[str], object]]:
+    """Zwraca domyślne, niezależne od siebie kroki wzbogacania notatki."""
+    return {
+        "title": generate_note_title,
+        "vector": lambda text: get_embeddings_many([embedding_input(text)])[0],
+    }
+
+def enrich_note(note_text: str,
+                steps: Optional[dict[str, Callable[[str], object]]] = None,
+                timeouts: Optional[dict[str, float]] = None) -> tuple[dict, dict, dict]:
+    """
+    Uruchamia równolegle niezależne kroki wzbogacania notatki (tytuł, embedding, ...).
+    
+    Łączny czas zapisu to czas najwolniejszego kroku, a nie suma wszystkich.
+    Każdy krok ma własny limit czasu; błąd lub przekroczenie limitu jednego kroku
+    nie przerywa pozostałych.
+    
+    Args:
+        note_text (str): Treść notatki
+        steps (dict, optional): Nazwa kroku -> funkcja przyjmująca tekst notatki
+        timeouts (dict, optional): Nazwa kroku -> limit czasu w sekundach
+        
+    Returns:
+        tuple[dict, dict, dict]: Wyniki udanych kroków, błędy nieudanych kroków
+        oraz czasy (poszczególne kroki i ``total``) w sekundach
+    """
+    steps = steps or _default_enrichment_steps()
+    timeouts = {**ENRICHMENT_TIMEOUTS, **(timeouts or {})}
+    started = time.perf_counter()
+
+    def timed(step):
+        step_started = time.perf_counter()
+        value = step(note_text)
+        return value, time.perf_counter() - step_started
+
+    futures = {
+        name: get_enrichment_executor().submit(contextvars.copy_context().run, timed, step)
+        for name, step in steps.items()
+    }
+    results, errors, timings = {}, {}, {}
+    for name, future in futures.items():
+        remaining = timeouts.get(name, 60.0) - (time.perf_counter() - started)
+        try:
+            results[name], timings[name] = future.result(timeout=max(0.0, remaining))
+            record_metric(f"save.{name}_latency", timings[name])
+        except FutureTimeoutError:
+            errors[name] = TimeoutError(f"Krok '{name}' przekroczył limit {timeouts.get(name, 60.0)}s")
+            logger.warning("Wzbogacanie notatki: przekroczono limit czasu kroku %s", name)
+        except Exception as e:  # pylint: disable=broad-except
+            errors[name] = e
+            logger.warning("Wzbogacanie notatki: krok %s nieudany: %s", name, e)
+
+    timings["total"] = time.perf_counter() - started
+    record_metric("save.enrichment_latency", timings["total"])
+    return results, errors, timings
+
+def prepare_note_point(note_text: str, note_id=None, created_at: Optional[str] = None,
+                       audio_md5: Optional[str] = None, duration_s: Optional[float] = None,
+                       tags: Union[str, Iterable[str], None] = None) -> PointStruct:
+    """
+    Przygotowuje punkt Qdrant dla notatki: ID, tytuł, wektor i payload (bez zapisu).
+    
+    Tytuł i embedding generowane są równolegle (patrz ``enrich_note``). Brak tytułu
+    nie blokuje zapisu, natomiast bez wektora zgłaszany jest wyjątek.
+    
+    Args:
+        note_text (str): Treść notatki
+        note_id (str | int, optional): ID istniejącej notatki lub None dla nowej
+        created_at (str, optional): Data utworzenia (ISO) dla nowej notatki; domyślnie teraz
+        audio_md5 (str, optional): MD5 nagrania, z którego powstała notatka (wykrywanie duplikatów)
+        duration_s (float, optional): Długość nagrania w sekundach
+        tags (str | Iterable[str], optional): Tagi notatki (patrz ``parse_tags``)
+        
+    Returns:
+        PointStruct: Punkt gotowy do upsert
+        
+    Raises:
+        ValueError: Gdy nie udało się wygenerować wektora notatki
+    """
+    if note_id is None:
+        # Losowy UUID - bez skanowania kolekcji i bez kolizji między replikami aplikacji
+        note_id = str(uuid.uuid4())
+        created_at = created_at or datetime.now().isoformat()
+    else:
+        created_at = None
+    enrichment, errors, timings = enrich_note(note_text)
+    if "vector" in errors or not enrichment.get("vector"):
+        raise ValueError(f"Nie udało się wygenerować wektora notatki: {errors.get('vector')}")
+    logger.info("Wzbogacanie notatki %s zajęło %.2fs", note_id, timings["total"])
+    payload = {
+        "text": note_text,
+        "title": enrichment.get("title") or "Brak tytułu",
+        "content_hash": note_text_hash(note_text),
+        **note_text_metadata(note_text),
+    }
+    if created_at:
+        payload["created_at"] = created_at
+        payload["created_ts"] = datetime.fromisoformat(created_at).timestamp()
+    if audio_md5:
+        payload["audio_md5"] = [audio_md5]
+    if duration_s is not None:
+        payload["duration_s"] = duration_s
+    if parse_tags(tags):
+        payload["tags"] = parse_tags(tags)
+    return PointStruct(id=note_id, vector=enrichment["vector"], payload=payload)
+
+def add_note_to_db(note_text, note_id=None):
+    """
+    Dodaje nową notatkę lub aktualizuje istniejącą w bazie danych Qdrant.
+    
+    Args:
+        note_text (str): Treść notatki do zapisania
+        note_id (str | int, optional): ID notatki (dla aktualizacji) lub None (dla nowej notatki)
+        
+    Returns:
+        str | int: ID zapisanej notatki (UUID dla nowych notatek)
+    """
+    try:
+        with st.spinner("Generowanie tytułu i wektora notatki..."):
+            return save_note(note_text, note_id=note_id)
+    except Exception as e:  # noqa: E722
+        st.error(f"Wystąpił błąd podczas zapisywania notatki: {str(e)}")
+        logger.exception("Błąd podczas zapisywania notatki")
+        raise
+
+def note_text_hash(note_text: str) -> str:
+    """Zwraca hash znormalizowanej treści notatki (pole ``content_hash`` w payloadzie)."""
+    return sha256(" ".join(note_text.split()).encode("utf-8")).hexdigest()
+
+def update_note(note_id, note_text: str, title: Optional[str] = None,
+                audio_md5: Union[str, Iterable[str], None] = None,
+                tags: Union[str, Iterable[str], None] = None) -> dict:
+    """
+    Aktualizuje istniejącą notatkę, zapisując w Qdrant tylko to, co się zmieniło.
+    
+    Gdy treść się nie zmieniła (ten sam ``content_hash``), nie ma żadnych wywołań API,
+    a zmienione pola zapisywane są przez ``set_payload``. Zmiana treści przelicza embedding
+    (``update_vectors``) i - jeśli użytkownik nie zmienił tytułu - generuje nowy tytuł.
+    Data utworzenia i pozostałe pola payloadu są zachowywane.
+    
+    Args:
+        note_id (str | int): ID istniejącej notatki
+        note_text (str): Nowa treść notatki
+        title (str, optional): Tytuł podany przez użytkownika
+        audio_md5 (str | Iterable[str], optional): MD5 nagrań dołączanych do notatki (np. przy scalaniu)
+        tags (str | Iterable[str], optional): Nowe tagi notatki; None = bez zmian
+        
+    Returns:
+        dict: Nazwy zaktualizowanych pól payloadu (``payload``) i czy przeliczono wektor (``vector``)
+        
+    Raises:
+        ValueError: Gdy notatka nie istnieje lub nie udało się wygenerować wektora
+    """
+    client = get_qdrant_client()
+    points = client.retrieve(
+        collection_name=QDRANT_COLLECTION_NAME, ids=[note_id], with_payload=True, with_vectors=False,
+    )
+    if not points:
+        raise ValueError(f"Notatka {note_id} nie istnieje")
+    current = points[0].payload or {}
+    content_hash = note_text_hash(note_text)
+    # Notatki zapisane przed wprowadzeniem content_hash porównywane są po zapisanej treści
+    text_changed = content_hash != (current.get("content_hash") or note_text_hash(current.get("text", "")))
+    title = (title or "").strip()
+    title_changed = bool(title) and title != current.get("title")
+
+    updates, vector = {}, None
+    if text_changed:
+        steps = _default_enrichment_steps()
+        if title_changed:
+            del steps["title"]
+        enrichment, errors, _ = enrich_note(note_text, steps=steps)
+        if "vector" in errors or not enrichment.get("vector"):
+            raise ValueError(f"Nie udało się wygenerować wektora notatki: {errors.get('vector')}")
+        vector = enrichment["vector"]
+        if enrichment.get("title"):
+            updates["title"] = enrichment["title"]
+    if title_changed:
+        updates["title"] = title
+    if note_text != current.get("text"):
+        updates["text"] = note_text
+    if current.get("content_hash") != content_hash:
+        updates["content_hash"] = content_hash
+    audio_hashes = list(dict.fromkeys(
+        [*current.get("audio_md5", []), *([audio_md5] if isinstance(audio_md5, str) else audio_md5 or [])]
+    ))
+    if audio_hashes != current.get("audio_md5", []):
+        updates["audio_md5"] = audio_hashes
+    if text_changed:
+        updates.update({
+            field: value for field, value in note_text_metadata(note_text).items() if current.get(field) != value
+        })
+    if tags is not None and parse_tags(tags) != current.get("tags", []):
+        updates["tags"] = parse_tags(tags)
+
+    if vector is not None:
+        client.update_vectors(
+            collection_name=QDRANT_COLLECTION_NAME,
+            points=[PointVectors(id=note_id, vector=vector)],
+        )
+    if updates:
+        client.set_payload(collection_name=QDRANT_COLLECTION_NAME, payload=updates, points=[note_id])
+    if "text" in updates or "title" in updates:
+        get_keyword_index().upsert([{**current, **updates, "id": note_id}])
+    metadata = note_metadata({**current, **updates})
+    if vector is not None:
+        index_note_chunks_logged([(note_id, note_text)], {str(note_id): metadata})
+    elif set(updates) & set(NOTE_METADATA_INDEXES):
+        # Fragmenty przechowują kopię metadanych notatki (filtry w wyszukiwaniu fragmentów)
+        client.set_payload(
+            collection_name=CHUNK_COLLECTION_NAME,
+            payload=metadata,
+            points=FilterSelector(filter=chunk_parent_filter([note_id])),
+        )
+    if updates:
+        notify_notes_changed([note_id])
+    record_metric("edit.vector_recomputed", 1.0 if vector is not None else 0.0)
+    logger.info("Aktualizacja notatki %s: pola %s, wektor %s", note_id, sorted(updates), vector is not None)
+    return {"payload": sorted(updates), "vector": vector is not None}
+
+def save_note(note_text: str, note_id=None, title: Optional[str] = None, audio_md5: Optional[str] = None,
+              duration_s: Optional[float] = None, tags: Union[str, Iterable[str], None] = None):
+    """
+    Wzbogaca i zapisuje notatkę w Qdrant oraz w indeksie słów kluczowych, bez elementów interfejsu.
+    
+    Istniejące notatki aktualizowane są przyrostowo (patrz ``update_note``).
+    
+    Args:
+        note_text (str): Treść notatki do zapisania
+        note_id (str | int, optional): ID notatki (dla aktualizacji) lub None (dla nowej notatki)
+        title (str, optional): Tytuł podany przez użytkownika przy aktualizacji
+        audio_md5 (str, optional): MD5 nagrania, z którego powstała notatka
+        duration_s (float, optional): Długość nagrania nowej notatki w sekundach
+        tags (str | Iterable[str], optional): Tagi notatki
+        
+    Returns:
+        str | int: ID zapisanej notatki
+    """
+    if note_id is not None:
+        update_note(note_id, note_text, title=title, audio_md5=audio_md5, tags=tags)
+        return note_id
+    point = prepare_note_point(note_text, audio_md5=audio_md5, duration_s=duration_s, tags=tags)
+    get_qdrant_client().upsert(
+        collection_name=QDRANT_COLLECTION_NAME,
+        points=[point]
+    )
+    get_keyword_index().upsert([note_from_point(point)])
+    index_note_chunks_logged([(point.id, note_text)], {str(point.id): note_metadata(point.payload)})
+    notify_notes_changed([point.id])
+    return point.id
+
+def delete_note_from_db(note_id):
+    """
+    Usuwa notatkę o podanym ID z bazy danych Qdrant.
+    
+    Args:
+        note_id (str | int): Unikalny identyfikator notatki do usunięcia
+    """
+    try:
+        delete_notes([note_id])
+        st.toast("Notatka usunięta", icon="🗑️")
+    except (ConnectionError, ValueError, KeyError) as e:
+        st.error(f"Błąd podczas usuwania notatki: {str(e)}")
+        logger.exception("Błąd podczas usuwania notatki")
+
+def legacy_note_uuid(legacy_id: int) -> str:
+    """Zwraca deterministyczny UUID dla notatki z dawnym identyfikatorem liczbowym."""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"audio-notes:{QDRANT_COLLECTION_NAME}:{legacy_id}"))
+
+def migrate_legacy_note_ids(batch_size: int = 256) -> int:
+    """
+    Przenosi notatki z liczbowymi ID (dawne count()+1) na identyfikatory UUID.
+    
+    Nowy UUID wyliczany jest deterministycznie z dawnego ID, a dawne ID zostaje
+    w payloadzie jako ``legacy_id``. Dzięki temu migrację można bezpiecznie
+    przerwać i uruchomić ponownie. ``parent_id`` fragmentów notatki zmieniany jest
+    na nowy UUID przed usunięciem dawnego punktu.
+    
+    Args:
+        batch_size (int): Liczba punktów pobieranych w jednej stronie scroll
+        
+    Returns:
+        int: Liczba zmigrowanych notatek
+    """
+    qdrant_client = get_qdrant_client()
+    migrated = 0
+    offset = None
+    while True:
+        points, offset = qdrant_client.scroll(
+            collection_name=QDRANT_COLLECTION_NAME,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        legacy = [point for point in points if isinstance(point.id, int)]
+        if legacy:
+            qdrant_client.upsert(
+                collection_name=QDRANT_COLLECTION_NAME,
+                points=[
+                    PointStruct(
+                        id=legacy_note_uuid(point.id),
+                        vector=point.vector,
+                        payload={**(point.payload or {}), "legacy_id": point.id},
+                    )
+                    for point in legacy
+                ],
+            )
+            # Fragmenty długich notatek wskazują notatkę przez parent_id - przepinamy je na nowe ID
+            for point in legacy:
+                qdrant_client.set_payload(
+                    collection_name=CHUNK_COLLECTION_NAME,
+                    payload={"parent_id": legacy_note_uuid(point.id)},
+                    points=FilterSelector(filter=chunk_parent_filter([point.id])),
+                )
+            qdrant_client.delete(
+                collection_name=QDRANT_COLLECTION_NAME,
+                points_selector=PointIdsList(points=[point.id for point in legacy]),
+            )
+            keyword_index = get_keyword_index()
+            keyword_index.delete([point.id for point in legacy])
+            keyword_index.upsert(
+                {**note, "id": legacy_note_uuid(note["id"])}
+                for note in map(note_from_point, legacy) if note
+            )
+            notify_notes_changed([point.id for point in legacy])
+            migrated += len(legacy)
+        if offset is None:
+            break
+    logger.info("Zmigrowano %d notatek na identyfikatory UUID", migrated)
+    return migrated
+
+def backfill_note_metadata(batch_size: int = 256) -> int:
+    """
+    Uzupełnia metadane (``created_ts``, liczba słów, język) notatek zapisanych przed ich
+    wprowadzeniem i kopiuje je do fragmentów notatek.
+    
+    Nie wywołuje API; notatki z uzupełnionymi metadanymi są pomijane, więc operację
+    można bezpiecznie przerwać i uruchomić ponownie.
+    
+    Args:
+        batch_size (int): Liczba notatek przetwarzanych w jednej paczce
+        
+    Returns:
+        int: Liczba uzupełnionych notatek
+    """
+    client = get_qdrant_client()
+    updated = []
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=QDRANT_COLLECTION_NAME,
+            scroll_filter=Filter(must=[IsEmptyCondition(is_empty=PayloadField(key="word_count"))]),
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=False,
+        )
+        note_operations, chunk_operations = [], []
+        for point in points:
+            if not point.payload or "text" not in point.payload:
+                continue
+            metadata = note_text_metadata(point.payload["text"])
+            try:
+                metadata["created_ts"] = datetime.fromisoformat(point.payload["created_at"]).timestamp()
+            except (KeyError, TypeError, ValueError):
+                pass
+            note_operations.append(SetPayloadOperation(set_payload=SetPayload(payload=metadata, points=[point.id])))
+            chunk_operations.append(SetPayloadOperation(set_payload=SetPayload(
+                payload=note_metadata({**point.payload, **metadata}),
+                filter=chunk_parent_filter([point.id]),
+            )))
+            updated.append(point.id)
+        if note_operations:
+            client.batch_update_points(collection_name=QDRANT_COLLECTION_NAME, update_operations=note_operations)
+            client.batch_update_points(collection_name=CHUNK_COLLECTION_NAME, update_operations=chunk_operations)
+        if offset is None:
+            break
+    if updated:
+        notify_notes_changed(updated)
+    logger.info("Uzupełniono metadane %d notatek", len(updated))
+    return len(updated)
+
+def note_from_point(point, score=None) -> Optional[dict]:
+    """Zamienia punkt Qdrant na słownik notatki używany w interfejsie (None dla punktów bez treści)."""
+    if not point.payload or "text" not in point.payload:
+        return None
+    return {
+        "id": point.id,
+        "title": point.payload.get("title", "Brak tytułu"),
+        "text": point.payload["text"],
+        "created_at": point.payload.get("created_at", "brak daty"),
+        "score": round(score, 3) if score is not None else None,
+        **note_metadata(point.payload),
+    }
+
+def list_notes_page(page_size: int = 20, cursor: Optional[dict] = None,
+                    filters: Optional[dict] = None) -> tuple[list[dict], Optional[dict]]:
+    """
+    Pobiera jedną stronę notatek, od najnowszych, z kursorem do następnej strony.
+    
+    Sortowanie po ``created_at`` odbywa się po stronie Qdrant (indeks payloadu), a kursor
+    zapamiętuje ostatnią wartość daty i ID notatek z tą datą. Po notatkach z datą zwracane
+    są notatki bez ``created_at`` (stronicowane przez ``next_page_offset``). Jeśli serwer
+    nie obsługuje sortowania, lista stronicowana jest wyłącznie przez ``next_page_offset``.
+    
+    Args:
+        page_size (int): Liczba notatek na stronie
+        cursor (dict, optional): Kursor zwrócony przez poprzednie wywołanie; None = pierwsza strona
+        filters (dict, optional): Filtry metadanych (patrz ``build_notes_filter``), wykonywane w Qdrant
+        
+    Returns:
+        tuple[list[dict], dict | None]: Notatki na stronie i kursor następnej strony (None = koniec)
+    """
+    qdrant_client = get_qdrant_client()
+    cursor = cursor or {"mode": "ordered"}
+    notes_filter = build_notes_filter(filters)
+    base_conditions = [notes_filter] if notes_filter else []
+    points = []
+
+    if cursor["mode"] == "ordered":
+        seen = cursor.get("seen", [])
+        try:
+            points, _ = qdrant_client.scroll(
+                collection_name=QDRANT_COLLECTION_NAME,
+                limit=page_size,
+                order_by=OrderBy(key="created_at", direction=Direction.DESC, start_from=cursor.get("start_from")),
+                scroll_filter=Filter(
+                    must=base_conditions, must_not=[HasIdCondition(has_id=seen)] if seen else None,
+                ) if seen or base_conditions else None,
+                with_payload=LIST_PAYLOAD_FIELDS,
+                with_vectors=False,
+            )
+        except UnexpectedResponse as e:
+            logger.warning("Sortowanie po created_at niedostępne, stronicowanie bez sortowania: %s", e)
+            cursor = {"mode": "offset", "offset": None}
+        else:
+            if len(points) == page_size:
+                last_created_at = points[-1].payload["created_at"]
+                boundary_ids = [point.id for point in points if point.payload.get("created_at") == last_created_at]
+                if last_created_at == cursor.get("start_from"):
+                    boundary_ids += seen
+                next_cursor = {"mode": "ordered", "start_from": last_created_at, "seen": boundary_ids}
+                return [note for note in map(note_from_point, points) if note], next_cursor
+            cursor = {"mode": "undated", "offset": None}
+
+    # Notatki bez daty (lub brak sortowania po stronie serwera) - kursor next_page_offset
+    conditions = list(base_conditions)
+    if cursor["mode"] == "undated":
+        conditions.append(IsEmptyCondition(is_empty=PayloadField(key="created_at")))
+    scroll_filter = Filter(must=conditions) if conditions else None
+    more_points, next_offset = qdrant_client.scroll(
+        collection_name=QDRANT_COLLECTION_NAME,
+        limit=page_size - len(points),
+        offset=cursor.get("offset"),
+        scroll_filter=scroll_filter,
+        with_payload=LIST_PAYLOAD_FIELDS,
+        with_vectors=False,
+    )
+    points = list(points) + list(more_points)
+    next_cursor = {"mode": cursor["mode"], "offset": next_offset} if next_offset is not None else None
+    return [note for note in map(note_from_point, points) if note], next_cursor
+
+@st.cache_data(ttl=LIST_CACHE_TTL_S, max_entries=LIST_CACHE_MAX_ENTRIES, show_spinner=False)
+def _list_notes_page_at_version(page_size: int, cursor: Optional[dict], filters: Optional[dict],
+                                version: int) -> tuple[list[dict], Optional[dict]]:
+    """Strona listy zapamiętana dla danej wersji kolekcji (``version`` jest tylko częścią klucza)."""
+    record_metric("cache.list.miss", 1)
+    return list_notes_page(page_size=page_size, cursor=cursor, filters=filters)
+
+def list_notes_page_cached(page_size: int = 20, cursor: Optional[dict] = None,
+                           filters: Optional[dict] = None) -> tuple[list[dict], Optional[dict]]:
+    """
+    Pobiera stronę notatek przez cache odczytu (``st.cache_data``) wspólny dla sesji.
+    
+    Kluczem jest rozmiar strony, kursor, filtry i numer wersji kolekcji, podbijany przez
+    ``notify_notes_changed`` przy każdym zapisie, edycji i usunięciu. Odświeżenia
+    interfejsu bez zmian w bazie nie wykonują więc zapytań do Qdrant. ``LIST_CACHE_TTL_S``
+    ogranicza nieaktualność po zapisach z innych procesów (np. ``bulk_import.py``).
+    """
+    notes, next_cursor = _list_notes_page_at_version(page_size, cursor, filters, get_collection_version().value)
+    return [dict(note) for note in notes], next_cursor
+
+def search_notes_semantic(query: str, limit: int = SEARCH_RESULT_LIMIT, filters: Optional[dict] = None) -> list[dict]:
+    """
+    Wyszukiwanie wektorowe w Qdrant (wymaga embeddingu zapytania).
+    
+    Przeszukiwane są wektory całych notatek oraz fragmenty długich notatek, grupowane
+    po notatce (``query_points_groups``). Notatka otrzymuje lepszy z obu wyników, a gdy pasuje
+    jej fragment - także ``snippet`` z treścią tego fragmentu. Filtry metadanych
+    wykonywane są w Qdrant w obu wyszukiwaniach (fragmenty mają kopię metadanych).
+    Notatki o dawnych liczbowych ID, których ``WithLookup`` nie odnajduje po tekstowym
+    ``parent_id``, pobierane są osobno.
+    
+    Raises:
+        OpenAIError: Gdy nie udało się wygenerować embeddingu zapytania
+    """
+    query_vector = list(get_query_embedding(query))
+    client = get_qdrant_client()
+    notes_filter = build_notes_filter(filters)
+    points = client.query_points(
+        collection_name=QDRANT_COLLECTION_NAME,
+        query=query_vector,
+        query_filter=notes_filter,
+        limit=limit,
+        with_payload=LIST_PAYLOAD_FIELDS,
+        search_params=search_params_for_profile(),
+    ).points
+    notes = {
+        str(note["id"]): note
+        for note in (note_from_point(point, point.score) for point in points) if note
+    }
+    groups = client.query_points_groups(
+        collection_name=CHUNK_COLLECTION_NAME,
+        query=query_vector,
+        query_filter=notes_filter,
+        group_by="parent_id",
+        limit=limit,
+        group_size=1,
+        with_payload=["text"],
+        search_params=search_params_for_profile(),
+        with_lookup=WithLookup(collection=QDRANT_COLLECTION_NAME, with_payload=LIST_PAYLOAD_FIELDS),
+    ).groups
+    missing = [
+        _parse_note_id(str(group.id)) for group in groups if str(group.id) not in notes and group.lookup is None
+    ]
+    lookups = {
+        str(point.id): point
+        for point in (client.retrieve(
+            collection_name=QDRANT_COLLECTION_NAME, ids=missing, with_payload=LIST_PAYLOAD_FIELDS,
+        ) if missing else [])
+    }
+    for group in groups:
+        hit = group.hits[0]
+        lookup = group.lookup or lookups.get(str(group.id))
+        note = notes.get(str(group.id)) or (note_from_point(lookup, hit.score) if lookup else None)
+        if note is None:
+            continue
+        note["score"] = max(note["score"] or 0.0, round(hit.score, 3))
+        note["snippet"] = note_snippet(hit.payload["text"])
+        notes[str(group.id)] = note
+    return sorted(notes.values(), key=lambda note: note["score"] or 0.0, reverse=True)[:limit]
+
+def search_notes_keyword(query: str, filters: Optional[dict] = None) -> list[dict]:
+    """
+    Wyszukiwanie BM25 w lokalnym indeksie słów kluczowych.
+    
+    Indeks nie przechowuje metadanych, więc przy filtrach pobierany jest nadmiar wyników
+    (``KEYWORD_FILTER_OVERFETCH``), a filtr wykonywany jest w Qdrant dla ich ID.
+    """
+    notes_filter = build_notes_filter(filters)
+    if notes_filter is None:
+        return get_keyword_index().search(query)
+    candidates = get_keyword_index().search(query, limit=SEARCH_RESULT_LIMIT * KEYWORD_FILTER_OVERFETCH)
+    return filter_notes(candidates, notes_filter)[:SEARCH_RESULT_LIMIT]
+
+def list_notes_from_db(query=None, mode: str = "hybrid", filters: Optional[dict] = None):
+    """
+    Pobiera listę notatek z bazy danych z opcjonalnym wyszukiwaniem.
+    
+    Bez zapytania zwracana jest pierwsza strona najnowszych notatek (patrz ``list_notes_page_cached``).
+    Wyniki wyszukiwania zapamiętywane są w ``SearchResultCache`` do czasu zapisu notatek.
+    Tryby wyszukiwania:
+    - "hybrid": ranking BM25 z lokalnego indeksu połączony z wyszukiwaniem wektorowym (RRF)
+    - "semantic": tylko wyszukiwanie wektorowe w Qdrant
+    - "keyword": tylko indeks słów kluczowych, bez wywołania API embeddingów
+    
+    Args:
+        query (str, optional): Tekst zapytania
+        mode (str): Tryb wyszukiwania, jeden z kluczy ``SEARCH_MODES``
+        filters (dict, optional): Filtry metadanych (patrz ``build_notes_filter``)
+        
+    Returns:
+        list[dict]: Lista słowników z danymi notatek
+    """
+    try:
+        if not query:
+            return list_notes_page_cached(page_size=20, filters=filters)[0]
+        cache = get_search_cache()
+        cache_key = cache.key(query, mode, filters)
+        results = cache.get(cache_key)
+        if results is not None:
+            return results
+        results, complete = [], True
+        if mode != "semantic":
+            results = search_notes_keyword(query, filters)
+        if mode != "keyword":
+            try:
+                semantic_results = search_notes_semantic(query, filters=filters)
+            except (OpenAIError, ValueError, TypeError, KeyError, ConnectionError) as e:
+                log_error(e, "Błąd podczas generowania wektora embeddings")
+                semantic_results, complete = [], False
+            results = semantic_results if mode == "semantic" else reciprocal_rank_fusion(
+                [results, semantic_results]
+            )[:SEARCH_RESULT_LIMIT]
+        # Niepełne wyniki (nieudane wyszukiwanie wektorowe) nie trafiają do cache
+        if complete:
+            cache.put(cache_key, results)
+        return results
+    except (ConnectionError, ValueError, KeyError, sqlite3.Error) as e:
+        st.error(f"Wystąpił błąd podczas pobierania notatek: {str(e)}")
+        logger.exception("Błąd podczas pobierania notatek")
+        return []
+
+def generate_note_title(note_text):
+    """
+    Generuje krótki, opisowy tytuł dla notatki przy użyciu OpenAI GPT-3.5.
+    
+    Args:
+        note_text (str): Treść notatki do przeanalizowania
+        
+    Returns:
+        str: Wygenerowany tytuł notatki lub "Brak tytułu" w przypadku błędu
+    """
+    try:
+        openai_client = get_openai_client()
+        messages = [
+            {
+                "role": "system",
+                "content": "Jesteś asystentem, który tworzy krótkie, zwięzłe tytuły na podstawie treści notatek. Tytuł powinien mieć maksymalnie 5 słów."
+            },
+            {
+                "role": "user",
+                "content": f"Wygeneruj krótki tytuł dla tej notatki: {note_text}"
+            }
+        ]
+        response = get_openai_scheduler().call(
+            TITLE_MODEL,
+            lambda: openai_client.chat.completions.create(
+                model=TITLE_MODEL,
+                messages=messages,
+                max_tokens=50
+            ),
+            tokens=sum(_estimate_tokens(message["content"]) for message in messages) + 50,
+        )
+        content = None
+        if response and hasattr(response, "choices") and response.choices:
+            content = response.choices[0].message.content
+        if content:
+            return content.strip()
+        return "Brak tytułu"
+    except (OpenAIError, ValueError, TypeError, KeyError, ConnectionError) as e:
+        log_error(e, "Błąd podczas generowania tytułu")
+        return "Brak tytułu"
+
+# =============================================================================
+# FRAGMENTY DŁUGICH NOTATEK (CHUNKING)
+# =============================================================================
+
+def split_into_chunks(text: str, size: int = CHUNK_SIZE_CHARS, overlap: int = CHUNK_OVERLAP_CHARS) -> list[str]:
+    """
+    Dzieli tekst na zachodzące na siebie fragmenty, tnąc na końcu zdania lub słowa.
+    
+    Miejsce cięcia szukane jest w drugiej połowie okna, więc fragment ma co najmniej
+    ``size // 2`` znaków. Zakładka (``overlap`` < ``size // 2``) zaczyna się od początku słowa.
+    
+    Args:
+        text (str): Treść notatki
+        size (int): Docelowa maksymalna długość fragmentu w znakach
+        overlap (int): Długość zakładki między sąsiednimi fragmentami
+        
+    Returns:
+        list[str]: Fragmenty w kolejności występowania
+    """
+    text = text.strip()
+    if len(text) <= size:
+        return [text] if text else []
+    chunks, start = [], 0
+    while start < len(text):
+        end = min(len(text), start + size)
+        if end < len(text):
+            window_start = start + size // 2
+            window = text[window_start:end]
+            cut = max(window.rfind(". "), window.rfind("? "), window.rfind("! "), window.rfind("\n"))
+            if cut < 0:
+                cut = window.rfind(" ")
+            if cut >= 0:
+                end = window_start + cut + 1
+        chunks.append(text[start:end].strip())
+        if end >= len(text):
+            break
+        next_start = max(end - overlap, start + 1)
+        space = text.find(" ", next_start, end)
+        start = space + 1 if space >= 0 else next_start
+    return [chunk for chunk in chunks if chunk]
+
+def chunk_point_id(note_id, index: int) -> str:
+    """Zwraca deterministyczne ID punktu fragmentu (ponowne indeksowanie nadpisuje te same punkty)."""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"audio-notes-chunk:{note_id}:{index}"))
+
+def note_snippet(chunk_text: str, max_chars: int = SEARCH_SNIPPET_MAX_CHARS) -> str:
+    """Skraca tekst fragmentu (w jednej linii) do długości wyświetlanej w wynikach wyszukiwania."""
+    chunk_text = " ".join(chunk_text.split())
+    if len(chunk_text) <= max_chars:
+        return chunk_text
+    return chunk_text[:max_chars].rsplit(" ", 1)[0] + " …"
+
+def embed_texts_parallel(texts: list[str]) -> list[list[float]]:
+    """
+    Generuje embeddingi wielu tekstów w paczkach wysyłanych równolegle.
+    
+    Limity zapytań i tokenów pilnuje harmonogram OpenAI, a powtórzone teksty obsługuje cache.
+    """
+    batches = [texts[start:start + CHUNK_EMBED_BATCH_SIZE] for start in range(0, len(texts), CHUNK_EMBED_BATCH_SIZE)]
+    if len(batches) <= 1:
+        return get_embeddings_many(texts) if texts else []
+    with ThreadPoolExecutor(max_workers=min(CHUNK_EMBED_MAX_WORKERS, len(batches))) as executor:
+        futures = [
+            executor.submit(contextvars.copy_context().run, get_embeddings_many, batch)
+            for batch in batches
+        ]
+        return [vector for future in futures for vector in future.result()]
+
+def build_chunk_points(notes: list[tuple], metadata: Optional[dict] = None) -> list[PointStruct]:
+    """
+    Dzieli długie notatki na fragmenty i generuje ich wektory (bez zapisu).
+    
+    Args:
+        notes (list[tuple]): Pary (ID notatki, treść); notatki krótsze niż ``CHUNK_MIN_CHARS`` są pomijane
+        metadata (dict, optional): ID notatki (tekst) -> metadane kopiowane do fragmentów (``note_metadata``)
+        
+    Returns:
+        list[PointStruct]: Punkty fragmentów z ``parent_id``, ``chunk_index``, ``text`` i metadanymi w payloadzie;
+        ``parent_id`` zapisywany jest jako tekst, zgodnie z indeksem KEYWORD
+    """
+    metadata = metadata or {}
+    items = [
+        (note_id, index, chunk)
+        for note_id, text in notes if len(text) >= CHUNK_MIN_CHARS
+        for index, chunk in enumerate(split_into_chunks(text))
+    ]
+    vectors = embed_texts_parallel([chunk for _, _, chunk in items])
+    return [
+        PointStruct(
+            id=chunk_point_id(note_id, index),
+            vector=vector,
+            payload={
+                "parent_id": str(note_id), "chunk_index": index, "text": chunk, **metadata.get(str(note_id), {}),
+            },
+        )
+        for (note_id, index, chunk), vector in zip(items, vectors)
+    ]
+
+def chunk_parent_filter(note_ids: Iterable) -> Filter:
+    """
+    Zwraca filtr fragmentów należących do podanych notatek.
+    
+    ``parent_id`` zapisywany jest jako tekst ID notatki; fragmenty dawnych notatek
+    zapisane wcześniej z liczbowym ``parent_id`` też są dopasowywane.
+    """
+    note_ids = list(note_ids)
+    conditions = [FieldCondition(key="parent_id", match=MatchAny(any=[str(note_id) for note_id in note_ids]))]
+    legacy_ids = [note_id for note_id in note_ids if isinstance(note_id, int)]
+    if legacy_ids:
+        conditions.append(FieldCondition(key="parent_id", match=MatchAny(any=legacy_ids)))
+    return Filter(should=conditions)
+
+def delete_note_chunks(note_ids: list):
+    """Usuwa wszystkie fragmenty podanych notatek."""
+    get_qdrant_client().delete(
+        collection_name=CHUNK_COLLECTION_NAME,
+        points_selector=FilterSelector(filter=chunk_parent_filter(note_ids)),
+    )
+
+def store_note_chunks(note_ids: list, points: list[PointStruct]):
+    """Zastępuje fragmenty podanych notatek nowymi punktami (przygotowanymi przez ``build_chunk_points``)."""
+    delete_note_chunks(note_ids)
+    if points:
+        get_qdrant_client().upsert(collection_name=CHUNK_COLLECTION_NAME, points=points)
+
+def index_note_chunks(notes: list[tuple], metadata: Optional[dict] = None) -> int:
+    """
+    Przelicza i zapisuje fragmenty notatek, zastępując poprzednie.
+    
+    Args:
+        notes (list[tuple]): Pary (ID notatki, treść)
+        metadata (dict, optional): ID notatki (tekst) -> metadane kopiowane do fragmentów
+        
+    Returns:
+        int: Liczba zapisanych fragmentów
+    """
+    started = time.perf_counter()
+    points = build_chunk_points(notes, metadata)
+    store_note_chunks([note_id for note_id, _ in notes], points)
+    if points:
+        record_metric("chunks.index_latency", time.perf_counter() - started)
+        logger.info("Zaindeksowano %d fragmentów dla %d notatek", len(points), len(notes))
+    return len(points)
+
+def index_note_chunks_logged(notes: list[tuple], metadata: Optional[dict] = None) -> int:
+    """
+    Indeksuje fragmenty zapisanej notatki; błąd jest logowany, a nie zgłaszany.
+    
+    Notatka jest już zapisana i wyszukiwalna po wektorze całej treści, więc nieudane
+    fragmenty nie unieważniają zapisu - uzupełnia je ``python reindex.py chunks``.
+    """
+    try:
+        return index_note_chunks(notes, metadata)
+    except (OpenAIError, ConnectionError, ValueError, KeyError, UnexpectedResponse) as e:
+        record_metric("chunks.index_failed", 1)
+        logger.error(
+            "Nie udało się zaindeksować fragmentów notatek %s: %s",
+            [note_id for note_id, _ in notes], e, exc_info=True,
+        )
+        return 0
+
+# =============================================================================
+# OPERACJE ZBIORCZE NA NOTATKACH
+# =============================================================================
+
+def _id_batches(note_ids: Iterable, size: int = BULK_OPERATION_BATCH_SIZE) -> Iterator[list]:
+    """Dzieli ID notatek (bez powtórzeń) na kolejne paczki o rozmiarze ``size``."""
+    note_ids = list(dict.fromkeys(note_ids))
+    for start in range(0, len(note_ids), size):
+        yield note_ids[start:start + size]
+
+def find_note_ids(scroll_filter: Filter, page_size: int = BULK_OPERATION_BATCH_SIZE) -> list:
+    """Zwraca ID wszystkich notatek spełniających filtr (stronicowane zapytania bez payloadu)."""
+    client = get_qdrant_client()
+    note_ids, offset = [], None
+    while True:
+        points, offset = client.scroll(
+            collection_name=QDRANT_COLLECTION_NAME, scroll_filter=scroll_filter, limit=page_size,
+            offset=offset, with_payload=False, with_vectors=False,
+        )
+        note_ids.extend(point.id for point in points)
+        if offset is None:
+            return note_ids
+
+def delete_notes(note_ids: list) -> int:
+    """
+    Usuwa wiele notatek paczkami, razem z indeksem słów kluczowych i fragmentami.
+    
+    Args:
+        note_ids (list): ID notatek do usunięcia (nieistniejące są pomijane)
+        
+    Returns:
+        int: Liczba usuniętych notatek
+    """
+    client = get_qdrant_client()
+    deleted = []
+    for batch in _id_batches(note_ids):
+        existing = [
+            point.id for point in client.retrieve(
+                collection_name=QDRANT_COLLECTION_NAME, ids=batch, with_payload=False, with_vectors=False,
+            )
+        ]
+        if not existing:
+            continue
+        client.delete(collection_name=QDRANT_COLLECTION_NAME, points_selector=PointIdsList(points=existing))
+        get_keyword_index().delete(existing)
+        delete_note_chunks(existing)
+        deleted.extend(existing)
+    if deleted:
+        notify_notes_changed(deleted, deleted=True)
+    logger.info("Usunięto %d notatek", len(deleted))
+    return len(deleted)
+
+def delete_notes_by_filter(scroll_filter: Filter) -> int:
+    """Usuwa wszystkie notatki spełniające filtr; zwraca liczbę usuniętych notatek."""
+    return delete_notes(find_note_ids(scroll_filter))
+
+def retitle_notes(note_ids: list) -> int:
+    """
+    Generuje ponownie tytuły notatek i zapisuje je jednym zapytaniem na paczkę.
+    
+    Notatki, dla których nie udało się wygenerować tytułu, zachowują dotychczasowy.
+    
+    Returns:
+        int: Liczba notatek ze zmienionym tytułem
+    """
+    client = get_qdrant_client()
+    updated = []
+    with ThreadPoolExecutor(max_workers=BULK_RETITLE_MAX_WORKERS, thread_name_prefix="retitle") as executor:
+        for batch in _id_batches(note_ids):
+            notes = list(iter_notes(batch))
+            futures = [
+                executor.submit(contextvars.copy_context().run, generate_note_title, note["text"])
+                for note in notes
+            ]
+            changed = [
+                {**note, "title": future.result()}
+                for note, future in zip(notes, futures)
+                if future.result() not in ("Brak tytułu", note["title"])
+            ]
+            if not changed:
+                continue
+            client.batch_update_points(
+                collection_name=QDRANT_COLLECTION_NAME,
+                update_operations=[
+                    SetPayloadOperation(set_payload=SetPayload(payload={"title": note["title"]}, points=[note["id"]]))
+                    for note in changed
+                ],
+            )
+            get_keyword_index().upsert(changed)
+            updated.extend(note["id"] for note in changed)
+    if updated:
+        notify_notes_changed(updated)
+    logger.info("Nowe tytuły dla %d z %d notatek", len(updated), len(note_ids))
+    return len(updated)
+
+def reembed_notes(note_ids: list) -> int:
+    """
+    Przelicza wektory notatek (np. po zmianie ``EMBEDDING_MODEL``) i ich fragmentów.
+    
+    Wektory paczki zapisywane są jednym zapytaniem ``update_vectors``.
+    
+    Returns:
+        int: Liczba notatek z przeliczonym wektorem
+    """
+    client = get_qdrant_client()
+    updated = []
+    for batch in _id_batches(note_ids):
+        notes = list(iter_notes(batch))
+        if not notes:
+            continue
+        vectors = embed_texts_parallel([embedding_input(note["text"]) for note in notes])
+        client.update_vectors(
+            collection_name=QDRANT_COLLECTION_NAME,
+            points=[PointVectors(id=note["id"], vector=vector) for note, vector in zip(notes, vectors)],
+        )
+        index_note_chunks(
+            [(note["id"], note["text"]) for note in notes],
+            {str(note["id"]): note_metadata(note) for note in notes},
+        )
+        updated.extend(note["id"] for note in notes)
+    if updated:
+        notify_notes_changed(updated)
+    logger.info("Przeliczono wektory %d notatek", len(updated))
+    return len(updated)
+
+# =============================================================================
+# WYKRYWANIE DUPLIKATÓW
+# =============================================================================
+
+def find_notes_by_audio(audio_md5: str) -> list[dict]:
+    """Zwraca notatki zapisane z nagrania o podanym MD5 (indeks ``audio_md5``)."""
+    points, _ = get_qdrant_client().scroll(
+        collection_name=QDRANT_COLLECTION_NAME,
+        scroll_filter=Filter(must=[FieldCondition(key="audio_md5", match=MatchValue(value=audio_md5))]),
+        limit=DEDUP_MAX_MATCHES,
+        with_payload=LIST_PAYLOAD_FIELDS,
+        with_vectors=False,
+    )
+    return [note for note in map(note_from_point, points) if note]
+
+def find_duplicate_notes(note_text: str, audio_md5: Optional[str] = None,
+                         threshold: float = DEDUP_SIMILARITY_THRESHOLD) -> list[dict]:
+    """
+    Szuka w kolekcji duplikatów nowej notatki przed jej zapisem.
+    
+    Kolejno sprawdzane są: to samo nagranie (``audio_md5``), ta sama treść po normalizacji
+    (``content_hash``) i podobieństwo wektorów powyżej progu. Embedding treści trafia do
+    cache embeddingów, więc późniejszy zapis notatki nie wywołuje ponownie API.
+    
+    Args:
+        note_text (str): Treść nowej notatki
+        audio_md5 (str, optional): MD5 nagrania, z którego powstała notatka
+        threshold (float): Minimalne podobieństwo kosinusowe prawie duplikatu
+        
+    Returns:
+        list[dict]: Notatki-duplikaty z powodem dopasowania (``duplicate_reason``: audio, text, similar)
+    """
+    client = get_qdrant_client()
+    matches = {}
+    exact_conditions = [("text", FieldCondition(key="content_hash", match=MatchValue(value=note_text_hash(note_text))))]
+    if audio_md5:
+        exact_conditions.insert(0, ("audio", FieldCondition(key="audio_md5", match=MatchValue(value=audio_md5))))
+    for reason, condition in exact_conditions:
+        points, _ = client.scroll(
+            collection_name=QDRANT_COLLECTION_NAME, scroll_filter=Filter(must=[condition]),
+            limit=DEDUP_MAX_MATCHES, with_payload=LIST_PAYLOAD_FIELDS, with_vectors=False,
+        )
+        for note in map(note_from_point, points):
+            if note and str(note["id"]) not in matches:
+                matches[str(note["id"])] = {**note, "score": 1.0, "duplicate_reason": reason}
+    vector = get_embeddings_many([embedding_input(note_text)])[0]
+    points = client.query_points(
+        collection_name=QDRANT_COLLECTION_NAME,
+        query=vector,
+        limit=DEDUP_MAX_MATCHES,
+        score_threshold=threshold,
+        with_payload=LIST_PAYLOAD_FIELDS,
+        search_params=search_params_for_profile(),
+    ).points
+    for point in points:
+        note = note_from_point(point, point.score)
+        if note and str(note["id"]) not in matches:
+            matches[str(note["id"])] = {**note, "duplicate_reason": "similar"}
+    record_metric("dedup.match", 1.0 if matches else 0.0)
+    return list(matches.values())[:DEDUP_MAX_MATCHES]
+
+def merge_note_texts(existing: str, new: str) -> str:
+    """Łączy treści duplikatów: pomija tekst zawarty w drugim, w pozostałych przypadkach dopisuje nowy."""
+    normalized_existing, normalized_new = " ".join(existing.casefold().split()), " ".join(new.casefold().split())
+    if normalized_new in normalized_existing:
+        return existing
+    if normalized_existing in normalized_new:
+        return new
+    return f"{existing.rstrip()}\n\n{new.strip()}"
+
+def merge_notes(note_ids: list) -> dict:
+    """
+    Scala notatki w najstarszą z nich (treść, nagrania, tagi), a pozostałe usuwa.
+    
+    Returns:
+        dict: ID zachowanej notatki (``note_id``) i liczba usuniętych notatek (``count``)
+    """
+    points = get_qdrant_client().retrieve(
+        collection_name=QDRANT_COLLECTION_NAME, ids=list(note_ids), with_payload=True, with_vectors=False,
+    )
+    points = sorted(
+        (point for point in points if point.payload and "text" in point.payload),
+        key=lambda point: point.payload.get("created_at") or "",
+    )
+    if len(points) < 2:
+        raise ValueError("Do scalenia potrzebne są co najmniej dwie istniejące notatki")
+    keep, rest = points[0], points[1:]
+    text = keep.payload["text"]
+    for point in rest:
+        text = merge_note_texts(text, point.payload["text"])
+    audio_hashes = [audio for point in rest for audio in point.payload.get("audio_md5", [])]
+    tags = [tag for point in points for tag in point.payload.get("tags", [])]
+    update_note(keep.id, text, audio_md5=audio_hashes, tags=tags)
+    deleted = delete_notes([point.id for point in rest])
+    logger.info("Scalono %d notatek w notatkę %s", deleted, keep.id)
+    return {"note_id": keep.id, "count": deleted}
+
+def find_duplicate_clusters(threshold: float = DEDUP_SIMILARITY_THRESHOLD,
+                            neighbors: int = DEDUP_SCAN_NEIGHBORS,
+                            page_size: int = DEDUP_SCAN_PAGE_SIZE) -> list[list[dict]]:
+    """
+    Znajduje grupy duplikatów w całej kolekcji bez porównywania wszystkich par notatek.
+    
+    Kandydatami na duplikaty są tylko najbliżsi sąsiedzi każdej notatki w indeksie
+    wektorowym (``query_batch_points``, jedno zapytanie na stronę notatek) oraz notatki z tym
+    samym ``content_hash`` lub ``audio_md5``. Pary powyżej progu łączone są w spójne
+    składowe strukturą find-union, więc koszt rośnie liniowo z liczbą notatek.
+    
+    Podobieństwo nie jest przechodnie (A≈B i B≈C nie oznacza A≈C), a grupa scalana jest
+    w najstarszą notatkę - dlatego każda składowa dzielona jest na grupy, w których każda
+    notatka jest duplikatem najstarszej notatki grupy.
+    
+    Returns:
+        list[list[dict]]: Grupy (od największej) notatek ``id``, ``title``, ``created_at``, od najstarszej
+    """
+    client = get_qdrant_client()
+    parent, notes, first_by_hash = {}, {}, {}
+    similar: dict[str, set] = {}
+    note_hashes: dict[str, set] = {}
+
+    def find(note_id):
+        while parent[note_id] != note_id:
+            parent[note_id] = parent[parent[note_id]]
+            note_id = parent[note_id]
+        return note_id
+
+    def union(a, b):
+        parent.setdefault(a, a)
+        parent.setdefault(b, b)
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[root_b] = root_a
 
-# Konfiguracja modeli OpenAI
-EMBEDDING_MODEL = "text-embedding-3-large"  # Model do generowania embeddingów tekstu
-EMBEDDING_DIM = 3072                         # Wymiarowość wektorów embeddingów
-AUDIO_TRANSCRIBE_MODEL = "whisper-1"         # Model do transkrypcji audio
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=QDRANT_COLLECTION_NAME, limit=page_size, offset=offset,
+            with_payload=["title", "created_at", "content_hash", "audio_md5"], with_vectors=True,
+        )
+        for point in points:
+            notes[str(point.id)] = {
+                "id": point.id,
+                "title": point.payload.get("title", "Brak tytułu"),
+                "created_at": point.payload.get("created_at", ""),
+            }
+            hashes = [("text", point.payload.get("content_hash"))]
+            hashes += [("audio", audio) for audio in point.payload.get("audio_md5", [])]
+            note_hashes[str(point.id)] = {key for key in hashes if key[1] is not None}
+            for key in hashes:
+                if key[1] is None:
+                    continue
+                if key in first_by_hash:
+                    union(first_by_hash[key], str(point.id))
+                else:
+                    first_by_hash[key] = str(point.id)
+        if points:
+            responses = client.query_batch_points(
+                collection_name=QDRANT_COLLECTION_NAME,
+                requests=[
+                    QueryRequest(
+                        query=point.vector, limit=neighbors + 1, score_threshold=threshold,
+                        params=search_params_for_profile(), with_payload=False,
+                    )
+                    for point in points
+                ],
+            )
+            for point, response in zip(points, responses):
+                for hit in response.points:
+                    if str(hit.id) != str(point.id):
+                        union(str(point.id), str(hit.id))
+                        similar.setdefault(str(point.id), set()).add(str(hit.id))
+                        similar.setdefault(str(hit.id), set()).add(str(point.id))
+        if offset is None:
+            break
 
-# Konfiguracja bazy danych Qdrant
-QDRANT_COLLECTION_NAME = "notes"             # Nazwa kolekcji w bazie wektorowej
+    def duplicates(a: str, b: str) -> bool:
+        return b in similar.get(a, ()) or bool(note_hashes.get(a, set()) & note_hashes.get(b, set()))
+
+    components = {}
+    for note_id in parent:
+        if note_id in notes:
+            components.setdefault(find(note_id), []).append(note_id)
+    result = []
+    for component in components.values():
+        remaining = sorted(component, key=lambda note_id: notes[note_id]["created_at"])
+        while len(remaining) > 1:
+            oldest, rest = remaining[0], remaining[1:]
+            group = [oldest] + [note_id for note_id in rest if duplicates(oldest, note_id)]
+            if len(group) > 1:
+                result.append([notes[note_id] for note_id in group])
+            remaining = [note_id for note_id in rest if note_id not in group]
+    logger.info("Skanowanie duplikatów: %d notatek, %d grup", len(notes), len(result))
+    return sorted(result, key=len, reverse=True)
 
 # =============================================================================
-# FUNKCJE OBSŁUGI API I KLIENTÓW
+# KOLEJKA ZADAŃ W TLE
 # =============================================================================
 
-def get_openai_client():
-    """Tworzy i zwraca klienta OpenAI z kluczem API z zmiennych środowiskowych."""
-    api_key = get_config_value("OPENAI_API_KEY")
-    if not api_key:
-        raise ValueError("Brak klucza OpenAI API. Sprawdź konfigurację w .env lub Streamlit secrets.")
-    return OpenAI(api_key=api_key)
-
-def transcribe_audio(audio_bytes):
+class JobQueue:
     """
-    Transkrypcja pliku audio za pomocą OpenAI Whisper API.
+    Trwała kolejka zadań w SQLite przetwarzana przez lokalną pulę wątków.
     
-    Args:
-        audio_bytes: Surowe dane audio w formacie WAV
-        
-    Returns:
-        str: Tekst transkrypcji audio lub None w przypadku błędu
+    Zadania (transkrypcja, zapis notatki) wykonywane są poza cyklem odświeżania
+    Streamlit - skrypt tylko zleca zadanie i odpytuje jego status. Zadania pobierane są
+    według priorytetu, a w jego obrębie w kolejności zgłoszenia; pobranie jest atomowe,
+    więc jedną bazę może obsługiwać kilka procesów. Proces wykonujący zadania okresowo
+    to potwierdza (``heartbeat_at``) - zadania procesu, który przestał je potwierdzać
+    (awaria, restart), wracają do kolejki, najwyżej ``JOB_MAX_ATTEMPTS`` razy.
+    
+    Klucz OpenAI zlecającego nie jest zapisywany w bazie - zadanie przechowuje tylko jego
+    skrót (``key_ref``), a sam klucz trzymany jest w pamięci procesu. Zadanie z kluczem
+    nieznanym procesowi (np. po restarcie) czeka w kolejce, aż klucz zostanie ponownie
+    zarejestrowany; zadania bez klucza używają klucza z konfiguracji.
     """
-    try:
-        with st.spinner("Transkrypcja audio..."):
-            if not audio_bytes:
-                st.error("Nie otrzymano danych audio")
-                return None
-            openai_client = get_openai_client()
-            audio_file = BytesIO(audio_bytes)
-            audio_file.name = "audio.mp3"
-            transcript = openai_client.audio.transcriptions.create(
-                file=audio_file,
-                model=AUDIO_TRANSCRIBE_MODEL,
-                response_format="text",
+
+    def __init__(self, path: Path, handlers: dict[str, Callable[[dict], dict]], workers: int = JOB_WORKERS):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.handlers = handlers
+        self.workers = workers
+        self.owner = f"{platform.node()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._keys: dict[str, str] = {}
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, priority INTEGER NOT NULL, "
+            "payload TEXT NOT NULL, result TEXT, error TEXT, "
+            "created_at REAL NOT NULL, started_at REAL, finished_at REAL, "
+            "owner TEXT, heartbeat_at REAL, attempts INTEGER NOT NULL DEFAULT 0, key_ref TEXT)"
+        )
+        # Bazy sprzed wprowadzenia potwierdzeń wykonywania i kluczy zadań - brakujące kolumny
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, definition in (("owner", "TEXT"), ("heartbeat_at", "REAL"),
+                                   ("attempts", "INTEGER NOT NULL DEFAULT 0"), ("key_ref", "TEXT")):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {definition}")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_pending ON jobs(status, priority, created_at)")
+        self._conn.commit()
+
+    def start(self):
+        """Przywraca przerwane zadania, usuwa stare zakończone i uruchamia wątki robocze."""
+        self.requeue_stale()
+        self.purge_finished(JOB_RETENTION_S)
+        for index in range(self.workers):
+            threading.Thread(target=self._work, name=f"job-worker-{index}", daemon=True).start()
+        threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True).start()
+
+    def register_key(self, api_key: Optional[str]) -> Optional[str]:
+        """
+        Zapamiętuje klucz OpenAI w pamięci procesu i zwraca jego skrót zapisywany przy zadaniach.
+        
+        Wznawia też zadania tego klucza, które czekały w kolejce (np. po restarcie procesu).
+        
+        Returns:
+            str | None: Skrót klucza lub None, gdy klucza nie podano
+        """
+        if not api_key:
+            return None
+        key_ref = sha256(api_key.encode("utf-8")).hexdigest()
+        with self._lock:
+            known = key_ref in self._keys
+            self._keys[key_ref] = api_key
+        if not known:
+            self._wakeup.set()
+        return key_ref
+
+    def submit(self, kind: str, payload: dict, priority: int = PRIORITY_INTERACTIVE,
+               job_id: Optional[str] = None, api_key: Optional[str] = None) -> str:
+        """
+        Dodaje zadanie do kolejki i zwraca jego ID.
+        
+        Args:
+            api_key (str, optional): Klucz OpenAI, którym wykonane zostanie zadanie (domyślnie z konfiguracji)
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"Nieznany rodzaj zadania: {kind}")
+        job_id = job_id or str(uuid.uuid4())
+        key_ref = self.register_key(api_key)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, status, priority, payload, created_at, key_ref) "
+                "VALUES (?, ?, 'queued', ?, ?, ?, ?)",
+                (job_id, kind, priority, json.dumps(payload), time.time(), key_ref),
             )
-            logger.info("Transkrypcja audio zakończona pomyślnie")
-            return str(transcript)
-    except (ValueError, TypeError, KeyError, ConnectionError) as e:
-        log_error(e, "Błąd transkrypcji")
-        return None
+            self._conn.commit()
+        self._wakeup.set()
+        return job_id
 
-@st.cache_resource
-def get_qdrant_client():
-    """
-    Tworzy i zwraca klienta bazy danych Qdrant z cache'owaniem i wake-up.
-    
-    Returns:
-        QdrantClient: Skonfigurowany klient bazy danych Qdrant
-    """
-    try:
-        # Pobierz konfigurację z .env lub Streamlit secrets
-        qdrant_url = get_config_value("QDRANT_URL")
-        qdrant_key = get_config_value("QDRANT_API_KEY")
+    def get(self, job_id: str) -> Optional[dict]:
+        """Zwraca stan zadania (status, wynik, błąd) lub None, gdy zadanie nie istnieje."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, kind, status, priority, payload, result, error FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def claim(self) -> Optional[dict]:
+        """
+        Pobiera następne zadanie z kolejki i oznacza je jako wykonywane przez ten proces.
         
-        if not qdrant_url or not qdrant_key:
-            st.error("Brak konfiguracji Qdrant. Sprawdź .env lub Streamlit secrets.")
-            st.stop()
+        Wybór i oznaczenie zadania to jedno polecenie UPDATE, więc to samo zadanie nie
+        zostanie pobrane przez dwa procesy korzystające z tej samej bazy. Pomijane są
+        zadania z kluczem OpenAI, którego ten proces nie zna.
+        """
+        now = time.time()
+        with self._lock:
+            key_refs = list(self._keys)
+            placeholders = ", ".join("?" * len(key_refs))
+            row = self._conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = ?, heartbeat_at = ?, owner = ?, "
+                "attempts = attempts + 1 "
+                "WHERE id = (SELECT id FROM jobs WHERE status = 'queued' "
+                f"AND (key_ref IS NULL OR key_ref IN ({placeholders})) "
+                "ORDER BY priority, created_at LIMIT 1) "
+                "AND status = 'queued' "
+                "RETURNING id, kind, status, priority, payload, result, error, created_at, key_ref",
+                (now, now, self.owner, *key_refs),
+            ).fetchone()
+            self._conn.commit()
+        if row is None:
+            return None
+        record_metric("jobs.queue_wait", now - row[7])
+        return {**self._row_to_job(row[:7]), "key_ref": row[8]}
+
+    def heartbeat(self) -> int:
+        """Potwierdza, że zadania pobrane przez ten proces są nadal wykonywane."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE owner = ? AND status = 'running'",
+                (time.time(), self.owner),
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+    def requeue_stale(self, stale_after_s: float = JOB_STALE_AFTER_S,
+                      max_attempts: int = JOB_MAX_ATTEMPTS) -> int:
+        """
+        Przywraca do kolejki zadania procesów, które przestały potwierdzać ich wykonywanie.
         
-        client = QdrantClient(
-            url=qdrant_url,
-            api_key=qdrant_key,
-            timeout=60  # Zwiększony timeout dla uśpionych serwerów
-        )
+        Zadania przerwane już ``max_attempts`` razy (np. powodujące awarię procesu)
+        oznaczane są jako nieudane zamiast kolejnego wznowienia.
         
-        # Wake up serwer - próba prostego zapytania
-        with st.spinner("🔄 Budzenie serwera Qdrant..."):
+        Returns:
+            int: Liczba zadań przywróconych do kolejki
+        """
+        cutoff = time.time() - stale_after_s
+        with self._lock:
+            failed = self._conn.execute(
+                "UPDATE jobs SET status = 'failed', finished_at = ?, "
+                "error = 'Zadanie przerwane zbyt wiele razy (' || attempts || ')' "
+                "WHERE status = 'running' AND COALESCE(heartbeat_at, started_at, 0) < ? AND attempts >= ?",
+                (time.time(), cutoff, max_attempts),
+            ).rowcount
+            requeued = self._conn.execute(
+                "UPDATE jobs SET status = 'queued', started_at = NULL, heartbeat_at = NULL, owner = NULL "
+                "WHERE status = 'running' AND COALESCE(heartbeat_at, started_at, 0) < ?",
+                (cutoff,),
+            ).rowcount
+            self._conn.commit()
+        if requeued or failed:
+            logger.info("Kolejka zadań: przywrócono %d przerwanych zadań, porzucono %d", requeued, failed)
+        if requeued:
+            self._wakeup.set()
+        return requeued
+
+    def purge_finished(self, max_age_s: float) -> int:
+        """Usuwa zakończone zadania starsze niż ``max_age_s`` sekund."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+                (time.time() - max_age_s,),
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+    def _finish(self, job_id: str, status: str, result: Optional[dict] = None, error: Optional[str] = None):
+        # Zadanie przejęte w międzyczasie przez inny proces nie jest nadpisywane
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ? AND owner = ?",
+                (status, json.dumps(result) if result is not None else None, error, time.time(), job_id, self.owner),
+            )
+            self._conn.commit()
+
+    def _heartbeat(self):
+        """Pętla wątku potwierdzeń: odświeża własne zadania i przywraca porzucone przez inne procesy."""
+        while True:
+            time.sleep(JOB_HEARTBEAT_INTERVAL_S)
             try:
-                collections = client.get_collections()
-                logger.info("Qdrant aktywny, kolekcje: %d", len(collections.collections))
-            except (ConnectionError, TimeoutError, OSError) as wake_error:
-                logger.warning("Pierwszy ping nieudany (serwer się budzi): %s", wake_error)
-                time.sleep(3)  # Czekaj na przebudzenie
-                collections = client.get_collections()  # Drugi ping
-                
-        logger.info("Pomyślnie połączono z Qdrant")
-        return client
-    except (ConnectionError, ValueError, KeyError) as e:
-        log_error(e, "Nie można połączyć się z bazą danych Qdrant")
-        st.stop()
+                self.heartbeat()
+                self.requeue_stale()
+            except sqlite3.Error as e:
+                logger.warning("Kolejka zadań: nieudane potwierdzenie wykonywania: %s", e)
 
-def initialize_collection():
+    def _work(self):
+        """Pętla wątku roboczego: pobiera i wykonuje zadania do końca procesu."""
+        while True:
+            job = self.claim()
+            if job is None:
+                self._wakeup.wait(timeout=JOB_POLL_INTERVAL_S)
+                self._wakeup.clear()
+                continue
+            started = time.perf_counter()
+            try:
+                with request_priority(job["priority"]), openai_api_key(self._keys.get(job["key_ref"])):
+                    result = self.handlers[job["kind"]](job["payload"])
+            except Exception as e:  # pylint: disable=broad-except
+                logger.exception("Zadanie %s (%s) nieudane", job["id"], job["kind"])
+                self._finish(job["id"], "failed", error=str(e))
+            else:
+                self._finish(job["id"], "done", result=result)
+            finally:
+                _remove_job_files(job["payload"])
+            record_metric(f"jobs.{job['kind']}_latency", time.perf_counter() - started)
+
+    @staticmethod
+    def _row_to_job(row) -> dict:
+        job_id, kind, status, priority, payload, result, error = row
+        return {
+            "id": job_id,
+            "kind": kind,
+            "status": status,
+            "priority": priority,
+            "payload": json.loads(payload),
+            "result": json.loads(result) if result else None,
+            "error": error,
+        }
+
+def _remove_job_files(payload: dict):
+    """Usuwa pliki wejściowe zadania zapisane w ``JOB_FILES_DIR``."""
+    audio_path = payload.get("audio_path")
+    if audio_path and Path(audio_path).parent == JOB_FILES_DIR:
+        Path(audio_path).unlink(missing_ok=True)
+
+def _run_transcription_job(payload: dict) -> dict:
+    """Zadanie: transkrypcja nagrania zapisanego w pliku wejściowym."""
+    text = transcribe_audio_cached(Path(payload["audio_path"]), digest=payload.get("audio_md5"))
+    if not text:
+        raise ValueError("Transkrypcja zwróciła pusty tekst")
+    return {"text": text}
+
+def _run_save_note_job(payload: dict) -> dict:
+    """Zadanie: wzbogacenie i zapis notatki."""
+    note_id = save_note(
+        payload["text"], note_id=payload.get("note_id"), title=payload.get("title"), audio_md5=payload.get("audio_md5"),
+        duration_s=payload.get("duration_s"), tags=payload.get("tags"),
+    )
+    return {"note_id": note_id}
+
+def _run_retitle_job(payload: dict) -> dict:
+    """Zadanie: ponowne generowanie tytułów wielu notatek."""
+    return {"count": retitle_notes(payload["note_ids"])}
+
+def _run_reembed_job(payload: dict) -> dict:
+    """Zadanie: przeliczenie wektorów wielu notatek."""
+    return {"count": reembed_notes(payload["note_ids"])}
+
+def _run_merge_job(payload: dict) -> dict:
+    """Zadanie: scalenie grupy duplikatów w najstarszą notatkę."""
+    return merge_notes(payload["note_ids"])
+
+def _run_dedup_scan_job(payload: dict) -> dict:
+    """Zadanie: wyszukanie grup duplikatów w całej kolekcji."""
+    return {"clusters": find_duplicate_clusters(payload.get("threshold", DEDUP_SIMILARITY_THRESHOLD))}
+
+@st.cache_resource
+def get_job_queue() -> JobQueue:
+    """Zwraca kolejkę zadań współdzieloną przez wszystkie sesje, z uruchomionymi wątkami roboczymi."""
+    queue = JobQueue(JOBS_DB_PATH, {
+        "transcribe": _run_transcription_job,
+        "save_note": _run_save_note_job,
+        "retitle": _run_retitle_job,
+        "reembed": _run_reembed_job,
+        "merge": _run_merge_job,
+        "dedup_scan": _run_dedup_scan_job,
+    })
+    queue.start()
+    return queue
+
+def submit_transcription_job(audio_source: AudioSource, priority: int = PRIORITY_INTERACTIVE,
+                             digest: Optional[str] = None) -> str:
     """
-    Inicjalizuje kolekcję w bazie Qdrant z odpowiednią konfiguracją wektorów.
+    Zleca transkrypcję nagrania w tle; zwraca ID zadania.
     
-    Returns:
-        QdrantClient: Klient z zainicjalizowaną kolekcją
+    Nagranie zapisane już na dysku (ścieżka) przekazywane jest bez kopiowania, a dane
+    w pamięci zapisywane są jako plik wejściowy zadania. MD5 policzony przy zapisie
+    nagrania (``digest``) trafia do zadania, więc plik nie jest czytany ponownie.
     """
-    try:
-        client = get_qdrant_client()
-        collections = client.get_collections().collections
-        exists = any(collection.name == QDRANT_COLLECTION_NAME for collection in collections)
-        if not exists:
-            client.create_collection(
-                collection_name=QDRANT_COLLECTION_NAME,
-                vectors_config=VectorParams(size=EMBEDDING_DIM, distance=Distance.COSINE)
-            )
-            logger.info("Utworzono nową kolekcję: %s", QDRANT_COLLECTION_NAME)
-        return client
-    except (ValueError, KeyError, ConnectionError) as e:
-        log_error(e, "Błąd podczas inicjalizacji kolekcji Qdrant")
-        st.stop()
+    job_id = str(uuid.uuid4())
+    if isinstance(audio_source, (bytes, bytearray)):
+        JOB_FILES_DIR.mkdir(parents=True, exist_ok=True)
+        audio_path = JOB_FILES_DIR / f"{job_id}.audio"
+        audio_path.write_bytes(audio_source)
+    else:
+        audio_path = Path(audio_source)
+    payload = {"audio_path": str(audio_path)}
+    if digest:
+        payload["audio_md5"] = digest
+    return get_job_queue().submit("transcribe", payload, priority, job_id=job_id, api_key=_openai_api_key.get())
 
-def verify_openai_key(api_key: str) -> bool:
-    """Weryfikuje poprawność klucza OpenAI przez próbę pobrania własnych usage lub modelu."""
-    try:
-        client = OpenAI(api_key=api_key)
-        client.models.list()
-        return True
-    except (OpenAIError, ValueError, KeyError, ConnectionError):
-        return False
+def submit_save_note_job(note_text: str, note_id=None, title: Optional[str] = None,
+                         audio_md5: Optional[str] = None, duration_s: Optional[float] = None,
+                         tags: Optional[list[str]] = None, priority: int = PRIORITY_INTERACTIVE) -> str:
+    """Zleca zapis (lub aktualizację) notatki w tle; zwraca ID zadania."""
+    payload = {
+        "text": note_text, "note_id": note_id, "title": title,
+        "audio_md5": audio_md5, "duration_s": duration_s, "tags": tags,
+    }
+    return get_job_queue().submit("save_note", payload, priority, api_key=_openai_api_key.get())
+
+def submit_bulk_job(kind: str, note_ids: list, priority: int = PRIORITY_BACKGROUND) -> str:
+    """Zleca w tle operację zbiorczą ("retitle", "reembed", "merge") na podanych notatkach; zwraca ID zadania."""
+    return get_job_queue().submit(kind, {"note_ids": list(note_ids)}, priority, api_key=_openai_api_key.get())
+
+def submit_dedup_scan_job(threshold: float = DEDUP_SIMILARITY_THRESHOLD, priority: int = PRIORITY_BACKGROUND) -> str:
+    """Zleca w tle wyszukanie grup duplikatów w kolekcji; zwraca ID zadania."""
+    return get_job_queue().submit("dedup_scan", {"threshold": threshold}, priority, api_key=_openai_api_key.get())
+
+def track_job(job_id: str, kind: str, label: str, **context):
+    """Dodaje zadanie do listy zadań bieżącej sesji śledzonych w interfejsie."""
+    st.session_state.setdefault("pending_jobs", {})[job_id] = {"kind": kind, "label": label, **context}
+
+def has_pending_job(kind: str) -> bool:
+    """Sprawdza, czy sesja ma niezakończone zadanie danego rodzaju."""
+    return any(info["kind"] == kind for info in st.session_state.get("pending_jobs", {}).values())
+
+@st.fragment(run_every=JOB_POLL_INTERVAL_S)
+def render_pending_jobs():
+    """
+    Wyświetla postęp zadań sesji, odświeżając się co ``JOB_POLL_INTERVAL_S``.
+    
+    Po zakończeniu któregoś z zadań odświeża całą aplikację, aby ``apply_finished_jobs``
+    mógł pokazać wynik (np. transkrypcję w edytorze).
+    """
+    pending = st.session_state.get("pending_jobs", {})
+    queue = get_job_queue()
+    finished = []
+    for job_id, info in list(pending.items()):
+        job = queue.get(job_id)
+        if job is None or job["status"] in ("done", "failed"):
+            finished.append((pending.pop(job_id), job))
+        else:
+            st.caption(f"⏳ {info['label']}: {JOB_STATUS_LABELS[job['status']]}")
+    if finished:
+        st.session_state.setdefault("finished_jobs", []).extend(finished)
+        st.rerun()
+
+def apply_finished_jobs():
+    """Przenosi wyniki zakończonych zadań sesji do stanu sesji i wyświetla komunikaty."""
+    for info, job in st.session_state.pop("finished_jobs", []):
+        if job is None or job["status"] == "failed":
+            error = job["error"] if job else "zadanie nie zostało znalezione"
+            st.error(f"{info['label']}: {error}")
+        elif info["kind"] == "transcribe":
+            # Wynik dotyczy tylko nagrania, które jest nadal wybrane
+            if info.get("audio_md5") == st.session_state.get("note_audio_bytes_md5"):
+                st.session_state["note_audio_text"] = job["result"]["text"]
+                st.toast("Transkrypcja zakończona!", icon="✅")
+        elif info["kind"] == "save_note":
+            st.toast(info.get("done_message", "Notatka zapisana"), icon="🎉")
+        elif info["kind"] in ("retitle", "reembed"):
+            st.toast(f"{info['label']}: zaktualizowano {job['result']['count']} notatek", icon="✅")
+        elif info["kind"] == "merge":
+            st.toast(f"Scalono {job['result']['count'] + 1} notatek w jedną", icon="🧬")
+        elif info["kind"] == "dedup_scan":
+            st.session_state["duplicate_clusters"] = job["result"]["clusters"]
+            st.toast(f"Znaleziono {len(job['result']['clusters'])} grup duplikatów", icon="🧬")
 
 # =============================================================================
-# FUNKCJE OBSŁUGI BAZY DANYCH I EMBEDDINGÓW
+# FUNKCJE EKSPORTU DOKUMENTÓW
 # =============================================================================
 
-def get_embeddings(text: str) -> list[float]:
+def build_note_pdf(title: str, text: str, note_id) -> bytes:
     """
-    Generuje wektor embeddings dla podanego tekstu przy użyciu OpenAI API.
+    Generuje plik PDF z tytułem i treścią notatki.
+    
+    Wbudowane czcionki FPDF nie obsługują polskich znaków, dlatego są one pomijane.
     
     Args:
-        text (str): Tekst do przekonwertowania na embedding
+        title (str): Tytuł notatki
+        text (str): Treść notatki
+        note_id: ID notatki (tytuł zastępczy)
         
     Returns:
-        list[float]: Lista liczb reprezentująca wektor embeddings lub pusta lista w przypadku błędu
+        bytes: Zawartość pliku PDF
     """
-    try:
-        openai_client = get_openai_client()
-        result = openai_client.embeddings.create(
-            input=[text],
-            model=EMBEDDING_MODEL,
-            dimensions=EMBEDDING_DIM,
-        )
-        return result.data[0].embedding
-    except (ValueError, TypeError, KeyError, ConnectionError) as e:
-        log_error(e, "Błąd podczas generowania wektora embeddings")
-        return []
+    if FPDF is None:
+        raise ValueError("Eksport PDF niedostępny. Zainstaluj fpdf.")
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("helvetica", size=12)
+    safe_title = title.encode('ascii', 'ignore').decode('ascii')
+    safe_text = text.encode('ascii', 'ignore').decode('ascii')
+    if not safe_title.strip():
+        safe_title = f"Notatka {note_id}"
+    if not safe_text.strip():
+        safe_text = "Treść zawiera znaki specjalne nieobsługiwane przez PDF"
+    pdf.multi_cell(0, 10, safe_title + "\n\n" + safe_text)
+    pdf_output = pdf.output()
+    if isinstance(pdf_output, str):
+        return pdf_output.encode('latin1')
+    return bytes(pdf_output)
 
-def add_note_to_db(note_text, note_id=None):
+def build_note_docx(title: str, text: str) -> bytes:
     """
-    Dodaje nową notatkę lub aktualizuje istniejącą w bazie danych Qdrant.
+    Generuje plik DOCX z tytułem i treścią notatki (pełne wsparcie polskich znaków).
     
     Args:
-        note_text (str): Treść notatki do zapisania
-        note_id (int, optional): ID notatki (dla aktualizacji) lub None (dla nowej notatki)
+        title (str): Tytuł notatki
+        text (str): Treść notatki
         
     Returns:
-        int: ID zapisanej notatki
+        bytes: Zawartość pliku DOCX
     """
-    try:
-        qdrant_client = get_qdrant_client()
-        if note_id is None:
-            points_count = qdrant_client.count(
-                collection_name=QDRANT_COLLECTION_NAME,
-                exact=True,
-            )
-            note_id = points_count.count + 1
-            created_at = datetime.now().isoformat()
-        else:
-            created_at = None
-        title = generate_note_title(note_text)
-        vector = get_embeddings(text=note_text)
-        payload = {
-            "text": note_text,
-            "title": title,
-        }
-        if created_at:
-            payload["created_at"] = created_at
-        qdrant_client.upsert(
-            collection_name=QDRANT_COLLECTION_NAME,
-            points=[
-                PointStruct(
-                    id=note_id,
-                    vector=vector,
-                    payload=payload,
-                )
-            ]
-        )
-        return note_id
-    except Exception as e:  # noqa: E722
-        st.error(f"Wystąpił błąd podczas zapisywania notatki: {str(e)}")
-        logger.exception("Błąd podczas zapisywania notatki")
-        raise
+    doc = Document()
+    doc.add_heading(title, 0)
+    doc.add_paragraph(text)
+    docx_bytes = io.BytesIO()
+    doc.save(docx_bytes)
+    return docx_bytes.getvalue()
 
-def delete_note_from_db(note_id):
+def note_content_hash(note: dict) -> str:
+    """Zwraca hash tytułu i treści notatki (klucz cache eksportów)."""
+    return sha256(f"{note['title']}\n{note['text']}".encode("utf-8")).hexdigest()
+
+@st.cache_data(max_entries=EXPORT_CACHE_MAX_ENTRIES, show_spinner="Generowanie pliku...")
+def get_note_export(note_id, content_hash: str, export_format: str, _title: str, _text: str) -> bytes:
     """
-    Usuwa notatkę o podanym ID z bazy danych Qdrant.
+    Zwraca plik eksportu notatki, generując go tylko przy pierwszym żądaniu.
+    
+    Kluczem cache są (ID notatki, hash treści, format); tytuł i treść (argumenty
+    z podkreślnikiem) nie są hashowane przez Streamlit. Najdawniej użyte wpisy są
+    usuwane po przekroczeniu ``EXPORT_CACHE_MAX_ENTRIES``.
     
     Args:
-        note_id (int): Unikalny identyfikator notatki do usunięcia
+        note_id: ID notatki
+        content_hash (str): Hash treści z ``note_content_hash``
+        export_format (str): "pdf" lub "docx"
+        
+    Returns:
+        bytes: Zawartość pliku
     """
-    try:
-        qdrant_client = get_qdrant_client()
-        from qdrant_client.models import PointIdsList
-        qdrant_client.delete(collection_name=QDRANT_COLLECTION_NAME, points_selector=PointIdsList(points=[note_id]))
-        st.toast("Notatka usunięta", icon="🗑️")
-    except (ConnectionError, ValueError, KeyError) as e:
-        st.error(f"Błąd podczas usuwania notatki: {str(e)}")
-        logger.exception("Błąd podczas usuwania notatki")
+    logger.info("Generowanie eksportu %s notatki %s", export_format, note_id)
+    if export_format == "pdf":
+        return build_note_pdf(_title, _text, note_id)
+    if export_format == "docx":
+        return build_note_docx(_title, _text)
+    raise ValueError(f"Nieobsługiwany format eksportu: {export_format}")
 
-def list_notes_from_db(query=None):
+def iter_notes(note_ids: Optional[list] = None, page_size: int = BULK_EXPORT_PAGE_SIZE) -> Iterator[dict]:
     """
-    Pobiera listę notatek z bazy danych z opcjonalnym wyszukiwaniem semantycznym.
+    Zwraca kolejno notatki z bazy, pobierając je stronami (stałe zużycie pamięci).
     
     Args:
-        query (str, optional): Tekst zapytania do wyszukiwania semantycznego
+        note_ids (list, optional): ID wybranych notatek; None = cała kolekcja (od najnowszych)
+        page_size (int): Liczba notatek pobieranych w jednym zapytaniu
         
-    Returns:
-        list[dict]: Lista słowników z danymi notatek
+    Yields:
+        dict: Notatka w formacie ``note_from_point``
     """
-    try:
+    if note_ids is not None:
         qdrant_client = get_qdrant_client()
-        if not query:
-            notes = qdrant_client.scroll(collection_name=QDRANT_COLLECTION_NAME, limit=20)[0]
-            result = []
-            for note in notes:
-                if note.payload and "text" in note.payload:
-                    result.append({
-                        "id": note.id,
-                        "title": note.payload.get("title", "Brak tytułu"),
-                        "text": note.payload["text"],
-                        "created_at": note.payload.get("created_at", "brak daty"),
-                        "score": None,
-                    })
-            return result
-        else:
-            query_vector = get_embeddings(text=query)
-            notes = qdrant_client.search(
+        for start in range(0, len(note_ids), page_size):
+            points = qdrant_client.retrieve(
                 collection_name=QDRANT_COLLECTION_NAME,
-                query_vector=query_vector,
-                limit=20,
+                ids=note_ids[start:start + page_size],
+                with_payload=LIST_PAYLOAD_FIELDS,
             )
-            result = []
-            for note in notes:
-                if note.payload and "text" in note.payload:
-                    result.append({
-                        "id": note.id,
-                        "title": note.payload.get("title", "Brak tytułu"),
-                        "text": note.payload["text"],
-                        "created_at": note.payload.get("created_at", "brak daty"),
-                        "score": round(note.score, 3),
-                    })
-            return result
-    except (ConnectionError, ValueError, KeyError) as e:
-        st.error(f"Wystąpił błąd podczas pobierania notatek: {str(e)}")
-        logger.exception("Błąd podczas pobierania notatek")
-        return []
+            yield from (note for note in map(note_from_point, points) if note)
+        return
+    cursor = None
+    while True:
+        notes, cursor = list_notes_page(page_size=page_size, cursor=cursor)
+        yield from notes
+        if cursor is None:
+            return
 
-def generate_note_title(note_text):
+def export_notes_bulk(notes: Iterable[dict], export_format: str, output: BinaryIO) -> int:
     """
-    Generuje krótki, opisowy tytuł dla notatki przy użyciu OpenAI GPT-3.5.
+    Zapisuje wiele notatek do jednego pliku: archiwum ZIP lub zbiorczego DOCX/PDF.
+    
+    Notatki zapisywane są przyrostowo w trakcie iteracji, więc dla ZIP pamięć nie
+    rośnie z liczbą notatek. Zbiorcze DOCX/PDF budowane są w pamięci przez
+    python-docx/FPDF i do zapisu całych kolekcji zalecany jest ZIP.
     
     Args:
-        note_text (str): Treść notatki do przeanalizowania
+        notes (Iterable[dict]): Notatki do eksportu (np. z ``iter_notes``)
+        export_format (str): Jeden z kluczy ``BULK_EXPORT_FORMATS``
+        output (BinaryIO): Plik docelowy otwarty do zapisu binarnego
         
     Returns:
-        str: Wygenerowany tytuł notatki lub "Brak tytułu" w przypadku błędu
+        int: Liczba wyeksportowanych notatek
+    """
+    count = 0
+    if export_format.startswith("zip-"):
+        note_format = export_format[len("zip-"):]
+        with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for note in notes:
+                if note_format == "txt":
+                    data = f"{note['title']}\n\n{note['text']}".encode("utf-8")
+                elif note_format == "pdf":
+                    data = build_note_pdf(note["title"], note["text"], note["id"])
+                else:
+                    data = build_note_docx(note["title"], note["text"])
+                archive.writestr(f"notatka_{note['id']}.{note_format}", data)
+                count += 1
+    elif export_format == "docx":
+        doc = Document()
+        for note in notes:
+            if count:
+                doc.add_page_break()
+            doc.add_heading(note["title"], 1)
+            doc.add_paragraph(f"Dodano: {note['created_at']}")
+            doc.add_paragraph(note["text"])
+            count += 1
+        doc.save(output)
+    elif export_format == "pdf":
+        if FPDF is None:
+            raise ValueError("Eksport PDF niedostępny. Zainstaluj fpdf.")
+        pdf = FPDF()
+        pdf.set_font("helvetica", size=12)
+        for note in notes:
+            pdf.add_page()
+            safe_title = note["title"].encode('ascii', 'ignore').decode('ascii') or f"Notatka {note['id']}"
+            safe_text = note["text"].encode('ascii', 'ignore').decode('ascii')
+            pdf.multi_cell(0, 10, safe_title + "\n\n" + safe_text)
+            count += 1
+        pdf_output = pdf.output()
+        output.write(pdf_output.encode('latin1') if isinstance(pdf_output, str) else bytes(pdf_output))
+    else:
+        raise ValueError(f"Nieobsługiwany format eksportu: {export_format}")
+    logger.info("Eksport zbiorczy (%s): %d notatek", export_format, count)
+    return count
+
+def read_bulk_export_once(path: str) -> bytes:
+    """
+    Odczytuje przygotowany eksport zbiorczy i usuwa plik tymczasowy.
+    
+    Wywoływana przez ``st.download_button`` dopiero po kliknięciu, więc archiwum
+    nie jest wczytywane przy każdym przebiegu skryptu, a po pobraniu znika z dysku.
     """
+    export_path = Path(path)
     try:
-        with st.spinner("Generowanie tytułu..."):
-            openai_client = get_openai_client()
-            response = openai_client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "Jesteś asystentem, który tworzy krótkie, zwięzłe tytuły na podstawie treści notatek. Tytuł powinien mieć maksymalnie 5 słów."
-                    },
-                    {
-                        "role": "user",
-                        "content": f"Wygeneruj krótki tytuł dla tej notatki: {note_text}"
-                    }
-                ],
-                max_tokens=50
-            )
-            content = None
-            if response and hasattr(response, "choices") and response.choices:
-                content = response.choices[0].message.content
-            if content:
-                return content.strip()
-            return "Brak tytułu"
-    except (ValueError, TypeError, KeyError, ConnectionError) as e:
-        log_error(e, "Błąd podczas generowania tytułu")
-        return "Brak tytułu"
+        return export_path.read_bytes()
+    finally:
+        export_path.unlink(missing_ok=True)
 
 # =============================================================================
 # GŁÓWNA FUNKCJA APLIKACJI I INTERFEJS UŻYTKOWNIKA
 # =============================================================================
 
+def _toggle_note_selection(note_id):
+    """Callback checkboxa "Zaznacz" - dodaje lub usuwa notatkę z zaznaczenia."""
+    selected_notes = st.session_state.setdefault("selected_notes", {})
+    if selected_notes.pop(str(note_id), None) is None:
+        selected_notes[str(note_id)] = note_id
+
+def render_note_filters(key: str) -> dict:
+    """
+    Wyświetla pola filtrów metadanych (zakres dat, język, tagi, liczba słów, długość nagrania).
+    
+    Args:
+        key (str): Prefiks kluczy widżetów (osobne filtry dla wyszukiwania i listy)
+        
+    Returns:
+        dict: Ustawione filtry w formacie ``build_notes_filter``
+    """
+    with st.expander("🔎 Filtry"):
+        col1, col2 = st.columns(2)
+        with col1:
+            date_from = st.date_input("Dodano od", value=None, key=f"{key}_date_from")
+            language = st.selectbox(
+                "Język", [None, *NOTE_LANGUAGES],
+                format_func=lambda code: "dowolny" if code is None else NOTE_LANGUAGES[code], key=f"{key}_language",
+            )
+            min_words = st.number_input("Min. liczba słów", min_value=0, value=None, step=50, key=f"{key}_min_words")
+            min_duration_s = st.number_input(
+                "Min. długość nagrania [s]", min_value=0, value=None, step=30, key=f"{key}_min_duration",
+            )
+        with col2:
+            date_to = st.date_input("Dodano do", value=None, key=f"{key}_date_to")
+            tags = st.text_input("Tagi (dowolny z, po przecinku)", key=f"{key}_tags")
+            max_words = st.number_input("Maks. liczba słów", min_value=0, value=None, step=50, key=f"{key}_max_words")
+            max_duration_s = st.number_input(
+                "Maks. długość nagrania [s]", min_value=0, value=None, step=30, key=f"{key}_max_duration",
+            )
+    filters = {
+        "date_from": date_from, "date_to": date_to, "language": language, "tags": parse_tags(tags),
+        "min_words": min_words, "max_words": max_words,
+        "min_duration_s": min_duration_s, "max_duration_s": max_duration_s,
+    }
+    return {name: value for name, value in filters.items() if value not in (None, [])}
+
+def _remember_audio_duplicates(audio_md5: str):
+    """Sprawdza (raz na nagranie), czy nagranie zapisano już jako notatkę, i zapamiętuje wynik w sesji."""
+    try:
+        st.session_state["note_audio_duplicates"] = find_notes_by_audio(audio_md5)
+    except (ConnectionError, ValueError, UnexpectedResponse) as e:
+        logger.warning("Nie udało się sprawdzić duplikatów nagrania: %s", e)
+        st.session_state["note_audio_duplicates"] = []
+
+def _render_audio_duplicates():
+    """Ostrzega, że wybrane nagranie zostało już zapisane jako notatka."""
+    duplicates = st.session_state.get("note_audio_duplicates")
+    if duplicates:
+        titles = ", ".join(f"„{note['title']}”" for note in duplicates)
+        st.warning(f"To nagranie zostało już zapisane jako notatka: {titles}")
+
+def _submit_new_note(note_text: str, audio_md5: Optional[str], duration_s: Optional[float] = None,
+                     tags: Optional[list[str]] = None):
+    """Sprawdza duplikaty nowej notatki; bez duplikatów zleca zapis, w przeciwnym razie prosi o decyzję."""
+    try:
+        with st.spinner("Sprawdzanie duplikatów..."):
+            duplicates = find_duplicate_notes(note_text, audio_md5)
+    except (OpenAIError, ConnectionError, ValueError, KeyError, UnexpectedResponse) as e:
+        logger.warning("Nie udało się sprawdzić duplikatów notatki: %s", e)
+        duplicates = []
+    if duplicates:
+        st.session_state["pending_duplicate"] = {
+            "text": note_text, "audio_md5": audio_md5, "duration_s": duration_s, "tags": tags, "matches": duplicates,
+        }
+    else:
+        job_id = submit_save_note_job(note_text, audio_md5=audio_md5, duration_s=duration_s, tags=tags)
+        track_job(job_id, "save_note", "Zapis notatki")
+
+def _render_pending_duplicate(openai_ready: bool = True):
+    """
+    Wyświetla znalezione duplikaty zapisywanej notatki z opcjami: scal, pomiń, zapisz jako nową.
+    
+    Args:
+        openai_ready (bool): Czy klucz OpenAI jest zweryfikowany (scalenie i zapis wymagają embeddingów)
+    """
+    pending = st.session_state.get("pending_duplicate")
+    if not pending:
+        return
+    with st.container(border=True):
+        st.warning("Podobna notatka jest już zapisana:")
+        for match in pending["matches"]:
+            st.markdown(
+                f"**{match['title']}** ({DEDUP_REASON_LABELS[match['duplicate_reason']]}, "
+                f"podobieństwo {match['score']}) - dodano {match['created_at']}"
+            )
+        merge_col, skip_col, keep_col = st.columns(3)
+        with merge_col:
+            if st.button("Scal z istniejącą", key="duplicate_merge", disabled=not openai_ready):
+                target = pending["matches"][0]
+                job_id = submit_save_note_job(
+                    merge_note_texts(target["text"], pending["text"]), note_id=target["id"],
+                    audio_md5=pending["audio_md5"], tags=parse_tags([*target.get("tags", []), *(pending.get("tags") or [])]),
+                )
+                track_job(job_id, "save_note", "Scalanie notatki", done_message="Notatka scalona z istniejącą")
+                del st.session_state["pending_duplicate"]
+                st.rerun()
+        with skip_col:
+            if st.button("Pomiń", key="duplicate_skip"):
+                del st.session_state["pending_duplicate"]
+                st.toast("Notatka nie została zapisana", icon="⏭️")
+                st.rerun()
+        with keep_col:
+            if st.button("Zapisz jako nową", key="duplicate_keep", disabled=not openai_ready):
+                job_id = submit_save_note_job(
+                    pending["text"], audio_md5=pending["audio_md5"],
+                    duration_s=pending.get("duration_s"), tags=pending.get("tags"),
+                )
+                track_job(job_id, "save_note", "Zapis notatki")
+                del st.session_state["pending_duplicate"]
+                st.rerun()
+
 def main():
     """Główna funkcja aplikacji Streamlit zawierająca cały interfejs użytkownika."""
     # Konfiguracja strony Streamlit z tytułem i layoutem
@@ -498,18 +3759,23 @@ def main():
     # Sprawdź czy klucz jest dostępny w konfiguracji
     config_key = get_config_value("OPENAI_API_KEY")
     api_key = None
+    key_pending = False  # Weryfikacja w toku - interfejs działa, akcje wymagające OpenAI są wyłączone
     
     if config_key:
         # Klucz znaleziony w .env lub secrets
         st.sidebar.success("✅ Klucz OpenAI znaleziony w konfiguracji")
         api_key = config_key
         
-        # Weryfikacja klucza z konfiguracji
-        with st.spinner("Weryfikacja klucza OpenAI..."):
-            if not verify_openai_key(api_key):
-                st.sidebar.error("❌ Klucz z konfiguracji jest nieprawidłowy!")
-                config_key = None  # Wymusi wprowadzenie nowego klucza
-                api_key = None
+        # Weryfikacja klucza z konfiguracji (w tle, z pamięcią wyniku)
+        key_status = get_openai_key_status(api_key)
+        if key_status == "pending":
+            # Niezweryfikowany klucz nie jest używany - fragment odświeży aplikację po weryfikacji
+            st.sidebar.info("⏳ Trwa weryfikacja klucza OpenAI...")
+            key_pending = True
+        elif key_status == "invalid":
+            st.sidebar.error("❌ Klucz z konfiguracji jest nieprawidłowy!")
+            config_key = None  # Wymusi wprowadzenie nowego klucza
+            api_key = None
     
     if not config_key:
         # Brak klucza w konfiguracji - prośba o wprowadzenie
@@ -529,27 +3795,38 @@ def main():
             st.info("💡 **Gdzie znaleźć klucz:** https://platform.openai.com/api-keys")
             st.stop()
         
-        # Weryfikacja wprowadzonego klucza
-        with st.spinner("Weryfikacja klucza OpenAI..."):
-            if verify_openai_key(user_key):
-                st.sidebar.success("✅ Klucz jest prawidłowy!")
-                api_key = user_key
-            else:
-                st.sidebar.error("❌ Nieprawidłowy klucz OpenAI API!")
-                st.error("🔑 **Nieprawidłowy klucz OpenAI API**")
-                st.error("Sprawdź klucz i spróbuj ponownie")
-                st.info("💡 **Wskazówki:**")
-                st.info("• Klucz musi zaczynać się od 'sk-'")
-                st.info("• Sprawdź czy klucz nie wygasł")
-                st.info("• Upewnij się, że masz środki na koncie OpenAI")
-                st.stop()
+        # Weryfikacja wprowadzonego klucza (w tle, z pamięcią wyniku)
+        key_status = get_openai_key_status(user_key)
+        if key_status == "valid":
+            st.sidebar.success("✅ Klucz jest prawidłowy!")
+            api_key = user_key
+        elif key_status == "pending":
+            st.sidebar.info("⏳ Trwa weryfikacja klucza OpenAI...")
+            api_key = user_key
+            key_pending = True
+        else:
+            st.sidebar.error("❌ Nieprawidłowy klucz OpenAI API!")
+            st.error("🔑 **Nieprawidłowy klucz OpenAI API**")
+            st.error("Sprawdź klucz i spróbuj ponownie")
+            st.info("💡 **Wskazówki:**")
+            st.info("• Klucz musi zaczynać się od 'sk-'")
+            st.info("• Sprawdź czy klucz nie wygasł")
+            st.info("• Upewnij się, że masz środki na koncie OpenAI")
+            st.stop()
     
     # Ustawienie klucza do dalszego użycia
-    if api_key:
-        env["OPENAI_API_KEY"] = api_key
+    if key_pending:
+        # Strona renderuje się od razu; fragment odświeży ją po rozstrzygnięciu weryfikacji
+        wait_for_openai_key(api_key)
+        _openai_api_key.set(None)  # Niezweryfikowany klucz nie jest używany
+    elif api_key:
+        # Klucz tylko dla tej sesji (i zleconych przez nią zadań) - bez zmiany wspólnej konfiguracji procesu
+        _openai_api_key.set(api_key)
+        get_job_queue().register_key(api_key)
     else:
         st.error("Błąd: Brak prawidłowego klucza OpenAI")
         st.stop()
+    openai_ready = not key_pending
     
     # =============================================================================
     # INICJALIZACJA STANU SESJI
@@ -558,8 +3835,8 @@ def main():
     # Inicjalizacja stanu sesji dla przechowywania danych między interakcjami
     if "note_audio_bytes_md5" not in st.session_state:
         st.session_state["note_audio_bytes_md5"] = None
-    if "note_audio_bytes" not in st.session_state:
-        st.session_state["note_audio_bytes"] = None
+    if "note_audio_path" not in st.session_state:
+        st.session_state["note_audio_path"] = None
     if "note_text" not in st.session_state:
         st.session_state["note_text"] = ""
     if "note_audio_text" not in st.session_state:
@@ -568,13 +3845,27 @@ def main():
     # Nagłówek główny aplikacji
     st.title("🎤 Audio Notes AI 🤖")
     st.write("Nagraj notatkę głosową lub wyszukaj w swoich notatkach")
+
+    # Wyniki i postęp zadań w tle (transkrypcja, zapis) zleconych w tej sesji
+    apply_finished_jobs()
+    if st.session_state.get("pending_jobs"):
+        render_pending_jobs()
     
     # Inicjalizacja połączenia z bazą danych Qdrant
     try:
         initialize_collection()
+        # Wynik sprawdzenia jest zapamiętany w procesie, a ostrzeżenie wyświetlane w każdej sesji
+        collection_dim = check_collection_profile()
     except (ValueError, KeyError, ConnectionError) as e:
         log_error(e)
-        st.stop()    # Komunikaty o zależnościach systemowych
+        st.stop()
+    if collection_dim is not None:
+        st.warning(
+            f"Kolekcja {QDRANT_COLLECTION_NAME} nie pasuje do profilu {STORAGE_PROFILE} "
+            f"({collection_dim} ≠ {EMBEDDING_DIM} wymiarów). Zmigruj ją poleceniem `python reindex.py migrate`."
+        )
+
+    # Komunikaty o zależnościach systemowych
     if MISSING_DEPS:
         msg = f"Brakuje zależności systemowych: {', '.join(MISSING_DEPS)}.\n"
         if SYSTEM == "Darwin":
@@ -591,6 +3882,13 @@ def main():
     if not FPDF_AVAILABLE:
         st.info("Eksport PDF niedostępny. Zainstaluj fpdf: pip install fpdf")
 
+    # Podgląd metryk wydajności (czasy transkrypcji, zapisu itp.)
+    metrics = get_metrics_snapshot()
+    if metrics:
+        with st.sidebar.expander("📊 Metryki wydajności"):
+            for name, metric in sorted(metrics.items()):
+                st.caption(f"{name}: ostatnio {metric['last']:.3f}, średnio {metric['avg']:.3f} (n={metric['count']})")
+
     # Utworzenie trzech głównych zakładek interfejsu użytkownika
     add_tab, search_tab, list_tab = st.tabs(["Dodaj notatkę", "Wyszukaj notatkę", "Lista notatek"])
 
@@ -611,28 +3909,36 @@ def main():
             )
             
             if uploaded_audio is not None:
-                # Odczytaj plik audio
-                audio_bytes = uploaded_audio.read()
-                st.session_state["note_audio_bytes"] = audio_bytes
-                
-                # Sprawdzenie czy plik się zmienił (hash MD5)
-                current_md5 = md5(audio_bytes).hexdigest()
-                if st.session_state["note_audio_bytes_md5"] != current_md5:
-                    st.session_state["note_audio_text"] = ""
-                    st.session_state["note_text"] = ""
-                    st.session_state["note_audio_bytes_md5"] = current_md5
+                # Zapis pliku na dysk porcjami (raz na wgrany plik) - w stanie sesji tylko ścieżka i MD5
+                if st.session_state.get("note_audio_upload_id") != uploaded_audio.file_id:
+                    audio_path, current_md5 = spool_audio(
+                        uploaded_audio, Path(uploaded_audio.name).suffix.lower() or ".mp3"
+                    )
+                    st.session_state["note_audio_upload_id"] = uploaded_audio.file_id
+                    st.session_state["note_audio_path"] = str(audio_path)
+
+                    # Sprawdzenie czy plik się zmienił (hash MD5)
+                    if st.session_state["note_audio_bytes_md5"] != current_md5:
+                        st.session_state["note_audio_text"] = ""
+                        st.session_state["note_text"] = ""
+                        st.session_state["note_audio_bytes_md5"] = current_md5
+                        st.session_state["note_audio_duration_s"] = audio_duration_s(audio_path)
+                        _remember_audio_duplicates(current_md5)
 
                 # Wyświetlenie odtwarzacza audio
-                st.audio(audio_bytes)
+                st.audio(st.session_state["note_audio_path"])
+                _render_audio_duplicates()
                 
-                # Przycisk do uruchomienia transkrypcji
-                if st.button("Transkrybuj audio"):
-                    transcribed_text = transcribe_audio(audio_bytes)
-                    if transcribed_text:
-                        st.session_state["note_audio_text"] = transcribed_text
-                        st.success("Transkrypcja zakończona!")
-                    else:
-                        st.error("Błąd transkrypcji. Sprawdź format pliku.")
+                # Przycisk do zlecenia transkrypcji w tle
+                if st.button("Transkrybuj audio", disabled=has_pending_job("transcribe") or not openai_ready):
+                    job_id = submit_transcription_job(
+                        Path(st.session_state["note_audio_path"]), digest=st.session_state["note_audio_bytes_md5"],
+                    )
+                    track_job(
+                        job_id, "transcribe", "Transkrypcja audio",
+                        audio_md5=st.session_state["note_audio_bytes_md5"],
+                    )
+                    st.rerun()
         else:
             # Komponent do nagrywania audio z konfigurowalnymi komunikatami
             note_audio = audiorecorder(
@@ -640,39 +3946,57 @@ def main():
                 stop_prompt="Zatrzymaj nagrywanie",
             )
             
-            # Obsługa nagrania audio - konwersja i przechowywanie w session state
+            # Obsługa nagrania audio - konwersja i zapis na dysk (w session state tylko ścieżka)
             if note_audio:
-                # Eksport nagrania do formatu MP3 w pamięci
-                audio = BytesIO()
-                note_audio.export(audio, format="mp3")
-                st.session_state["note_audio_bytes"] = audio.getvalue()
-                
-                # Sprawdzenie czy nagranie się zmieniło (hash MD5)
-                current_md5 = md5(st.session_state["note_audio_bytes"]).hexdigest()
-                if st.session_state["note_audio_bytes_md5"] != current_md5:
-                    # Resetowanie poprzednich transkrypcji przy nowym nagraniu
-                    st.session_state["note_audio_text"] = ""
-                    st.session_state["note_text"] = ""
-                    st.session_state["note_audio_bytes_md5"] = current_md5
+                # Eksport nagrania do pliku MP3 nazwanego skrótem MD5 treści - raz na nagranie,
+                # rozpoznawane po skrócie surowych próbek (bez kodowania MP3 przy każdym odświeżeniu)
+                recording_md5 = md5(note_audio.raw_data).hexdigest()
+                if st.session_state.get("note_audio_recording_md5") != recording_md5:
+                    audio_path, current_md5 = spool_audio_segment(note_audio)
+                    st.session_state["note_audio_recording_md5"] = recording_md5
+                    st.session_state["note_audio_path"] = str(audio_path)
+                    
+                    # Sprawdzenie czy nagranie się zmieniło (hash MD5)
+                    if st.session_state["note_audio_bytes_md5"] != current_md5:
+                        # Resetowanie poprzednich transkrypcji przy nowym nagraniu
+                        st.session_state["note_audio_text"] = ""
+                        st.session_state["note_text"] = ""
+                        st.session_state["note_audio_bytes_md5"] = current_md5
+                        st.session_state["note_audio_duration_s"] = round(note_audio.duration_seconds, 1)
+                        _remember_audio_duplicates(current_md5)
 
                 # Wyświetlenie odtwarzacza audio
-                st.audio(st.session_state["note_audio_bytes"], format="audio/mp3")
+                st.audio(st.session_state["note_audio_path"], format="audio/mp3")
+                _render_audio_duplicates()
 
-                # Przycisk do uruchomienia transkrypcji przez OpenAI Whisper
-                if st.button("Transkrybuj audio"):
-                    st.session_state["note_audio_text"] = transcribe_audio(st.session_state["note_audio_bytes"])
+                # Przycisk do zlecenia transkrypcji przez OpenAI Whisper w tle
+                if st.button("Transkrybuj audio", disabled=has_pending_job("transcribe") or not openai_ready):
+                    current_md5 = st.session_state["note_audio_bytes_md5"]
+                    job_id = submit_transcription_job(Path(st.session_state["note_audio_path"]), digest=current_md5)
+                    track_job(job_id, "transcribe", "Transkrypcja audio", audio_md5=current_md5)
+                    st.rerun()
 
                 # Edytor tekstu do modyfikacji transkrybowanej notatki
                 if st.session_state["note_audio_text"]:
                     st.session_state["note_text"] = st.text_area("Edytuj notatkę", value=st.session_state["note_audio_text"])
 
+                # Tagi nowej notatki (filtrowanie listy i wyszukiwania)
+                if st.session_state["note_text"]:
+                    note_tags = st.text_input("Tagi (oddzielone przecinkami)", key="note_tags")
+
                 # Przycisk zapisu notatki z walidacją długości tekstu
-                if st.session_state["note_text"] and st.button("Zapisz notatkę", disabled=not st.session_state["note_text"]):
+                if st.session_state["note_text"] and st.button("Zapisz notatkę", disabled=not st.session_state["note_text"] or not openai_ready):
                     if len(st.session_state["note_text"].strip()) < 5:
                         st.error("Notatka musi mieć co najmniej 5 znaków.")
                     else:
-                        add_note_to_db(note_text=st.session_state["note_text"])
-                        st.toast("Notatka zapisana", icon="🎉")
+                        _submit_new_note(
+                            st.session_state["note_text"], st.session_state["note_audio_bytes_md5"],
+                            duration_s=st.session_state.get("note_audio_duration_s"), tags=parse_tags(note_tags),
+                        )
+                        st.rerun()
+
+        # Decyzja użytkownika, gdy zapisywana notatka ma duplikaty w kolekcji
+        _render_pending_duplicate(openai_ready)
 
     # =========================================================================
     # ZAKŁADKA 2: WYSZUKIWANIE SEMANTYCZNE NOTATEK
@@ -680,11 +4004,18 @@ def main():
     with search_tab:
         # Pole tekstowe do wprowadzenia zapytania wyszukiwania
         query = st.text_input("Wyszukaj notatkę")
+        # Do czasu weryfikacji klucza dostępne jest tylko wyszukiwanie bez wywołania API
+        search_mode = st.radio(
+            "Tryb wyszukiwania", list(SEARCH_MODES) if openai_ready else ["keyword"],
+            format_func=SEARCH_MODES.get, horizontal=True,
+        )
+        search_filters = render_note_filters("search")
         
         # Przycisk uruchamiający wyszukiwanie semantyczne
         if st.button("Szukaj"):
             # Wywołanie funkcji wyszukiwania z parametrem query
-            results = list_notes_from_db(query)
+            results = list_notes_from_db(query, mode=search_mode, filters=search_filters)
+            st.session_state["last_search_ids"] = [note["id"] for note in results]
             
             # Obsługa przypadku braku wyników
             if not results:
@@ -694,10 +4025,14 @@ def main():
                 for note in results:
                     with st.container(border=True):
                         st.markdown(f"### {note['title']}")
+                        # Fragment długiej notatki, który najlepiej pasuje do zapytania
+                        if note.get("snippet"):
+                            st.markdown(f"> {note['snippet']}")
                         st.markdown(note["text"])
-                        # Wyświetlenie oceny podobieństwa jeśli dostępna
+                        # Wyświetlenie oceny podobieństwa (semantyczne) lub trafności (BM25/RRF)
                         if note["score"]:
-                            st.markdown(f':violet[Podobieństwo: {note["score"]}]')
+                            score_label = "Podobieństwo" if search_mode == "semantic" else "Trafność"
+                            st.markdown(f':violet[{score_label}: {note["score"]}]')
 
     # =========================================================================
     # ZAKŁADKA 3: LISTA WSZYSTKICH NOTATEK I ZARZĄDZANIE
@@ -705,9 +4040,22 @@ def main():
     with list_tab:
         st.subheader("Wszystkie notatki")
         
-        # Pobranie wszystkich notatek z bazy danych
-        notes = list_notes_from_db()
+        # Stronicowanie: stos kursorów kolejnych stron w session state
+        page_size = st.selectbox("Notatek na stronie", LIST_PAGE_SIZES, index=1, key="list_page_size")
+        list_filters = render_note_filters("list")
+        if st.session_state.get("list_cursor_query") != (page_size, list_filters):
+            st.session_state["list_cursors"] = [None]
+            st.session_state["list_cursor_query"] = (page_size, list_filters)
+        cursors = st.session_state["list_cursors"]
+        try:
+            notes, next_cursor = list_notes_page_cached(page_size=page_size, cursor=cursors[-1], filters=list_filters)
+        except (ConnectionError, ValueError, KeyError) as e:
+            log_error(e, "Wystąpił błąd podczas pobierania notatek")
+            notes, next_cursor = [], None
         
+        # Zaznaczone notatki (ID jako tekst -> oryginalne ID) dla operacji zbiorczych
+        selected_notes = st.session_state.setdefault("selected_notes", {})
+
         # Obsługa przypadku pustej bazy danych
         if not notes:
             st.info("Brak notatek w bazie.")
@@ -718,7 +4066,19 @@ def main():
                     # Wyświetlenie tytułu, treści i daty utworzenia
                     st.markdown(f"### {note['title']}")
                     st.markdown(note["text"])
-                    st.caption(f"Dodano: {note['created_at']}")
+                    details = [f"Dodano: {note['created_at']}"]
+                    if note.get("language"):
+                        details.append(f"Język: {NOTE_LANGUAGES.get(note['language'], note['language'])}")
+                    if note.get("tags"):
+                        details.append(f"Tagi: {', '.join(note['tags'])}")
+                    st.caption(" · ".join(details))
+                    st.checkbox(
+                        "Zaznacz",
+                        value=str(note["id"]) in selected_notes,
+                        key=f"select_{note['id']}",
+                        on_change=_toggle_note_selection,
+                        args=(note["id"],),
+                    )
                     
                     # Trzy kolumny z przyciskami akcji
                     col1, col2, col3 = st.columns([1,1,2])
@@ -736,6 +4096,7 @@ def main():
                             st.session_state["edit_note_id"] = note['id']
                             st.session_state["edit_note_text"] = note['text']
                             st.session_state["edit_note_title"] = note['title']
+                            st.session_state["edit_note_tags"] = ", ".join(note.get("tags", []))
                             st.rerun()
                     
                     # Kolumna 3: Opcje eksportu w różnych formatach
@@ -746,54 +4107,169 @@ def main():
                             file_name=f"notatka_{note['id']}.txt",
                             key=f"txt_{note['id']}"
                         )
-                        if FPDF is not None:
+                        # PDF i DOCX generowane dopiero na żądanie (i cache'owane)
+                        for export_format in ("pdf", "docx"):
+                            if export_format == "pdf" and FPDF is None:
+                                st.info("Eksport PDF niedostępny. Zainstaluj fpdf.")
+                                continue
+                            ready_key = f"export_ready_{export_format}_{note['id']}"
+                            if not st.session_state.get(ready_key):
+                                st.button(
+                                    f"Przygotuj {export_format.upper()}",
+                                    key=f"prepare_{export_format}_{note['id']}",
+                                    on_click=st.session_state.__setitem__,
+                                    args=(ready_key, True),
+                                )
+                                continue
                             try:
-                                pdf = FPDF()
-                                pdf.add_page()
-                                pdf.set_font("helvetica", size=12)
-                                safe_title = note["title"].encode('ascii', 'ignore').decode('ascii')
-                                safe_text = note["text"].encode('ascii', 'ignore').decode('ascii')
-                                if not safe_title.strip():
-                                    safe_title = f"Notatka {note['id']}"
-                                if not safe_text.strip():
-                                    safe_text = "Treść zawiera znaki specjalne nieobsługiwane przez PDF"
-                                pdf.multi_cell(0, 10, safe_title + "\n\n" + safe_text)
-                                pdf_bytes = io.BytesIO()
-                                pdf_output = pdf.output()
-                                if isinstance(pdf_output, str):
-                                    pdf_bytes.write(pdf_output.encode('latin1'))
-                                else:
-                                    pdf_bytes.write(pdf_output)
-                                pdf_bytes.seek(0)
                                 st.download_button(
-                                    "Eksport PDF",
-                                    data=pdf_bytes,
-                                    file_name=f"notatka_{note['id']}.pdf",
-                                    key=f"pdf_{note['id']}"
+                                    f"Eksport {export_format.upper()}",
+                                    data=get_note_export(
+                                        note["id"], note_content_hash(note), export_format,
+                                        note["title"], note["text"],
+                                    ),
+                                    file_name=f"notatka_{note['id']}.{export_format}",
+                                    key=f"{export_format}_{note['id']}"
                                 )
-                            except (ValueError, TypeError, KeyError, ConnectionError) as e:
-                                logger.error("Błąd podczas generowania PDF: %s", str(e))
-                                st.error("Nie udało się wygenerować pliku PDF. Spróbuj eksportu DOCX lub TXT.")
-                        else:
-                            st.info("Eksport PDF niedostępny. Zainstaluj fpdf.")
-                        
-                        # EKSPORT DOCX - pełne wsparcie dla polskich znaków
-                        try:
-                            doc = Document()
-                            doc.add_heading(note["title"], 0)
-                            doc.add_paragraph(note["text"])
-                            docx_bytes = io.BytesIO()
-                            doc.save(docx_bytes)
-                            docx_bytes.seek(0)
-                            st.download_button(
-                                "Eksport DOCX",
-                                data=docx_bytes,
-                                file_name=f"notatka_{note['id']}.docx",
-                                key=f"docx_{note['id']}"
-                            )
-                        except (ValueError, TypeError, KeyError, ConnectionError) as e:
-                            logger.error("Błąd podczas generowania DOCX: %s", str(e))
-                            st.error("Nie udało się wygenerować pliku DOCX.")
+                            except (ValueError, TypeError, KeyError) as e:
+                                logger.error("Błąd podczas generowania %s: %s", export_format.upper(), str(e))
+                                st.error(f"Nie udało się wygenerować pliku {export_format.upper()}. Spróbuj eksportu TXT.")
+
+        # Eksport zbiorczy: cała kolekcja, zaznaczone notatki lub wyniki wyszukiwania
+        with st.expander("📦 Eksport zbiorczy"):
+            scopes = {
+                "all": "Cała kolekcja",
+                "selected": f"Zaznaczone notatki ({len(selected_notes)})",
+                "search": f"Wyniki ostatniego wyszukiwania ({len(st.session_state.get('last_search_ids', []))})",
+            }
+            scope = st.radio("Zakres", list(scopes), format_func=scopes.get, key="bulk_export_scope")
+            export_format = st.selectbox(
+                "Format", list(BULK_EXPORT_FORMATS), format_func=BULK_EXPORT_FORMATS.get, key="bulk_export_format"
+            )
+            if st.button("Przygotuj eksport"):
+                note_ids = {
+                    "all": None,
+                    "selected": list(selected_notes.values()),
+                    "search": st.session_state.get("last_search_ids", []),
+                }[scope]
+                previous = st.session_state.pop("bulk_export", None)
+                if previous:
+                    Path(previous["path"]).unlink(missing_ok=True)
+                extension = "zip" if export_format.startswith("zip-") else export_format
+                with tempfile.NamedTemporaryFile(suffix=f".{extension}", delete=False) as output:
+                    try:
+                        with st.spinner("Eksportowanie notatek..."):
+                            count = export_notes_bulk(iter_notes(note_ids), export_format, output)
+                        st.session_state["bulk_export"] = {
+                            "path": output.name, "extension": extension, "count": count,
+                        }
+                    except (ValueError, TypeError, KeyError, ConnectionError, OSError) as e:
+                        output.close()
+                        Path(output.name).unlink(missing_ok=True)
+                        log_error(e, "Błąd eksportu zbiorczego")
+            bulk_export = st.session_state.get("bulk_export")
+            if bulk_export and not Path(bulk_export["path"]).exists():
+                # Plik został już pobrany (i usunięty) - czyścimy stan
+                st.session_state.pop("bulk_export", None)
+            elif bulk_export:
+                # Archiwum czytane jest dopiero po kliknięciu, a nie przy każdym przebiegu skryptu
+                st.download_button(
+                    f"Pobierz eksport ({bulk_export['count']} notatek)",
+                    data=lambda path=bulk_export["path"]: read_bulk_export_once(path),
+                    file_name=f"notatki_{datetime.now():%Y%m%d_%H%M}.{bulk_export['extension']}",
+                    key="bulk_export_download",
+                    on_click="ignore",
+                )
+
+        # Operacje zbiorcze: usuwanie, nowe tytuły i wektory dla wielu notatek naraz
+        with st.expander("🧹 Operacje zbiorcze"):
+            scopes = {
+                "selected": f"Zaznaczone notatki ({len(selected_notes)})",
+                "search": f"Wyniki ostatniego wyszukiwania ({len(st.session_state.get('last_search_ids', []))})",
+                "filtered": "Notatki spełniające filtry listy",
+            }
+            scope = st.radio("Zakres", list(scopes), format_func=scopes.get, key="bulk_op_scope")
+            confirm_delete = st.checkbox("Potwierdzam usunięcie notatek z zakresu", key="bulk_op_confirm")
+            delete_col, retitle_col, reembed_col = st.columns(3)
+            with delete_col:
+                delete_clicked = st.button("Usuń", key="bulk_delete", disabled=not confirm_delete)
+            with retitle_col:
+                retitle_clicked = st.button("Nowe tytuły", key="bulk_retitle", disabled=not openai_ready)
+            with reembed_col:
+                reembed_clicked = st.button("Przelicz wektory", key="bulk_reembed", disabled=not openai_ready)
+            if delete_clicked or retitle_clicked or reembed_clicked:
+                try:
+                    if scope != "filtered":
+                        note_ids = {
+                            "selected": list(selected_notes.values()),
+                            "search": st.session_state.get("last_search_ids", []),
+                        }[scope]
+                    elif not list_filters:
+                        note_ids = None
+                    else:
+                        note_ids = find_note_ids(build_notes_filter(list_filters))
+                    if note_ids is None:
+                        st.warning("Ustaw co najmniej jeden filtr listy.")
+                    elif not note_ids:
+                        st.info("Brak notatek w wybranym zakresie.")
+                    elif delete_clicked:
+                        with st.spinner("Usuwanie notatek..."):
+                            deleted = delete_notes(note_ids)
+                        removed = {str(note_id) for note_id in note_ids}
+                        for note_id in removed:
+                            selected_notes.pop(note_id, None)
+                        st.session_state["last_search_ids"] = [
+                            note_id for note_id in st.session_state.get("last_search_ids", [])
+                            if str(note_id) not in removed
+                        ]
+                        st.session_state["list_cursors"] = [None]
+                        st.toast(f"Usunięto {deleted} notatek", icon="🗑️")
+                        st.rerun()
+                    else:
+                        kind, label = ("retitle", "Nowe tytuły") if retitle_clicked else ("reembed", "Przeliczanie wektorów")
+                        track_job(submit_bulk_job(kind, note_ids), kind, f"{label} ({len(note_ids)} notatek)")
+                        st.info("Operacja zlecona w tle - postęp widoczny na górze strony.")
+                except (ValueError, KeyError, ConnectionError, UnexpectedResponse) as e:
+                    log_error(e, "Błąd operacji zbiorczej")
+
+        # Grupy duplikatów w całej kolekcji (skanowanie w tle)
+        with st.expander("🧬 Duplikaty"):
+            if st.button("Znajdź duplikaty", key="dedup_scan", disabled=has_pending_job("dedup_scan")):
+                track_job(submit_dedup_scan_job(), "dedup_scan", "Wyszukiwanie duplikatów")
+                st.rerun()
+            clusters = st.session_state.get("duplicate_clusters")
+            if clusters is not None and not clusters:
+                st.info("Nie znaleziono duplikatów.")
+            for index, cluster in enumerate(clusters or []):
+                with st.container(border=True):
+                    for note in cluster:
+                        st.markdown(f"- **{note['title']}** (dodano {note['created_at'] or 'brak daty'})")
+                    cluster_ids = [note["id"] for note in cluster]
+                    merge_col, keep_col = st.columns(2)
+                    with merge_col:
+                        if st.button("Scal w najstarszą", key=f"dedup_merge_{index}", disabled=not openai_ready):
+                            track_job(submit_bulk_job("merge", cluster_ids), "merge", "Scalanie duplikatów")
+                            clusters.pop(index)
+                            st.rerun()
+                    with keep_col:
+                        if st.button("Zostaw najstarszą, usuń resztę", key=f"dedup_keep_{index}"):
+                            deleted = delete_notes(cluster_ids[1:])
+                            clusters.pop(index)
+                            st.toast(f"Usunięto {deleted} duplikatów", icon="🗑️")
+                            st.rerun()
+
+        # Nawigacja między stronami listy
+        prev_col, page_col, next_col = st.columns([1, 2, 1])
+        with prev_col:
+            if st.button("← Poprzednia", disabled=len(cursors) == 1):
+                cursors.pop()
+                st.rerun()
+        with page_col:
+            st.caption(f"Strona {len(cursors)}")
+        with next_col:
+            if st.button("Następna →", disabled=next_cursor is None):
+                cursors.append(next_cursor)
+                st.rerun()
 
     # =========================================================================
     # TRYB EDYCJI NOTATEK
@@ -802,35 +4278,43 @@ def main():
         with st.form("edit_note_form", clear_on_submit=True):
             st.subheader("Edytuj notatkę")
             
-            # Pole tekstowe z aktualną treścią notatki do edycji
+            # Pola z aktualnym tytułem i treścią notatki do edycji
+            new_title = st.text_input("Tytuł", value=st.session_state["edit_note_title"])
             new_text = st.text_area("Treść notatki", value=st.session_state["edit_note_text"])
+            new_tags = st.text_input("Tagi (oddzielone przecinkami)", value=st.session_state.get("edit_note_tags", ""))
             
             # Przycisk zapisania zmian z walidacją
             col1, col2 = st.columns([1, 1])
             
             with col1:
-                if st.form_submit_button("Zapisz zmiany"):
+                if st.form_submit_button("Zapisz zmiany", disabled=not openai_ready):
                     if not new_text or len(new_text.strip()) < 5:
                         st.error("Notatka musi mieć co najmniej 5 znaków.")
                     else:
                         try:
-                            add_note_to_db(note_text=new_text, note_id=st.session_state["edit_note_id"])
-                            st.toast("Notatka zaktualizowana", icon="✅")
-                            # Usunięcie stanu edycji po zapisaniu
-                            for key in ["edit_note_id", "edit_note_text", "edit_note_title"]:
+                            job_id = submit_save_note_job(
+                                new_text, note_id=st.session_state["edit_note_id"], title=new_title,
+                                tags=parse_tags(new_tags),
+                            )
+                            track_job(job_id, "save_note", "Aktualizacja notatki", done_message="Notatka zaktualizowana")
+                            # Usunięcie stanu edycji po zleceniu zapisu
+                            for key in ["edit_note_id", "edit_note_text", "edit_note_title", "edit_note_tags"]:
                                 if key in st.session_state:
                                     del st.session_state[key]
                             st.rerun()
-                        except (ValueError, TypeError, KeyError, ConnectionError) as e:
+                        except (ValueError, TypeError, KeyError, sqlite3.Error) as e:
                             st.error(f"Błąd podczas zapisywania: {str(e)}")
             
             with col2:
                 if st.form_submit_button("Anuluj"):
                     # Usunięcie stanu edycji bez zapisywania
-                    for key in ["edit_note_id", "edit_note_text", "edit_note_title"]:
+                    for key in ["edit_note_id", "edit_note_text", "edit_note_title", "edit_note_tags"]:
                         if key in st.session_state:
                             del st.session_state[key]
                     st.rerun()
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        record_script_run_time()
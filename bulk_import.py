@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Masowy import nagrań audio do kolekcji notatek Audio Notes AI.
+
+Skrypt przechodzi rekurencyjnie po katalogu, a każdy plik audio przechodzi przez
+potok: transkrypcja → wzbogacenie (tytuł, embedding) → paczkowany upsert.
+Pliki czytane są bezpośrednio z dysku, bez wczytywania całych nagrań do pamięci.
+Postęp zapisywany jest w pliku checkpointu, więc przerwany import można wznowić
+bez ponownego przetwarzania zapisanych już lub pominiętych plików.
+
+Użycie:
+    python bulk_import.py /sciezka/do/nagran --workers 4 --batch-size 32
+"""
+
+import argparse
+import sqlite3
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+
+import app
+
+AUDIO_EXTENSIONS = {".mp3", ".wav", ".m4a", ".ogg", ".webm", ".flac", ".mp4"}
+DEFAULT_CHECKPOINT = app.DB_DIR / "bulk_import.sqlite3"
+
+
+def open_checkpoint(path: Path) -> sqlite3.Connection:
+    """Otwórz (lub utwórz) bazę checkpointu z listą zaimportowanych i pominiętych plików"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path))
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS imported ("
+        "file_key TEXT PRIMARY KEY, path TEXT NOT NULL, note_id TEXT NOT NULL, imported_at TEXT NOT NULL)"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS skipped ("
+        "file_key TEXT PRIMARY KEY, path TEXT NOT NULL, reason TEXT NOT NULL, skipped_at TEXT NOT NULL)"
+    )
+    conn.commit()
+    return conn
+
+
+def mark_skipped(conn: sqlite3.Connection, key: str, path: Path, reason: str):
+    """Zapisz w checkpoincie plik pominięty z podanego powodu - wznowiony import go nie przetwarza"""
+    conn.execute(
+        "INSERT OR REPLACE INTO skipped (file_key, path, reason, skipped_at) VALUES (?, ?, ?, ?)",
+        (key, str(path), reason, datetime.now().isoformat()),
+    )
+    conn.commit()
+
+
+def file_key(path: Path) -> str:
+    """Klucz pliku w checkpoincie - ścieżka, rozmiar i czas modyfikacji"""
+    stat = path.stat()
+    return f"{path.resolve()}:{stat.st_size}:{int(stat.st_mtime)}"
+
+
+def find_audio_files(root: Path) -> list[Path]:
+    """Znajdź wszystkie pliki audio w katalogu (rekurencyjnie, w stałej kolejności)"""
+    return sorted(p for p in root.rglob("*") if p.is_file() and p.suffix.lower() in AUDIO_EXTENSIONS)
+
+
+def process_file(path: Path):
+    """Transkrypcja i wzbogacenie jednego pliku - zwraca punkt Qdrant i punkty fragmentów lub powód pominięcia"""
+    # Nagranie zapisane już jako notatka (ten sam MD5) pomijamy przed transkrypcją
+    audio_md5 = app.audio_md5(path)
+    if app.find_notes_by_audio(audio_md5):
+        return "nagranie już zapisane jako notatka"
+    # Import ustępuje pierwszeństwa zapytaniom interaktywnym w harmonogramie OpenAI
+    with app.request_priority(app.PRIORITY_BACKGROUND):
+        text = app.transcribe_audio_cached(path, digest=audio_md5)
+        if not text or len(text.strip()) < 5:
+            return "pusta transkrypcja"
+        created_at = datetime.fromtimestamp(path.stat().st_mtime).isoformat()
+        point = app.prepare_note_point(
+            text, created_at=created_at, audio_md5=audio_md5, duration_s=app.audio_duration_s(path),
+        )
+        return point, app.build_chunk_points([(point.id, text)], {str(point.id): app.note_metadata(point.payload)})
+
+
+def flush(conn: sqlite3.Connection, pending: list) -> int:
+    """Zapisz paczkę punktów w Qdrant, a następnie oznacz pliki jako zaimportowane"""
+    if not pending:
+        return 0
+    app.get_qdrant_client().upsert(
+        collection_name=app.QDRANT_COLLECTION_NAME,
+        points=[point for _, _, point, _ in pending],
+    )
+    app.get_keyword_index().upsert(app.note_from_point(point) for _, _, point, _ in pending)
+    app.store_note_chunks(
+        [point.id for _, _, point, _ in pending],
+        [chunk for _, _, _, chunks in pending for chunk in chunks],
+    )
+    now = datetime.now().isoformat()
+    conn.executemany(
+        "INSERT OR REPLACE INTO imported (file_key, path, note_id, imported_at) VALUES (?, ?, ?, ?)",
+        [(key, str(path), str(point.id), now) for key, path, point, _ in pending],
+    )
+    conn.commit()
+    count = len(pending)
+    pending.clear()
+    return count
+
+
+def run_import(root: Path, workers: int, batch_size: int, checkpoint: Path) -> int:
+    """Zaimportuj katalog nagrań; zwraca kod wyjścia procesu"""
+    conn = open_checkpoint(checkpoint)
+    app.initialize_collection()
+
+    done = {row[0] for row in conn.execute("SELECT file_key FROM imported UNION SELECT file_key FROM skipped")}
+    todo = [(file_key(path), path) for path in find_audio_files(root)]
+    todo = [(key, path) for key, path in todo if key not in done]
+    print(f"📂 Plików do importu: {len(todo)} (pominięto przetworzone wcześniej: {len(done)})")
+
+    started = time.perf_counter()
+    imported = skipped = failed = 0
+    pending: list = []
+    # MD5 nagrań zapisanych w tym przebiegu - identyczne pliki przetwarzane równolegle przechodzą
+    # sprawdzenie find_notes_by_audio, zanim pierwszy z nich trafi do Qdrant
+    imported_md5: set = set()
+    queue = iter(todo)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        in_flight = {}
+
+        def submit_next():
+            # Ograniczamy liczbę plików "w locie", aby pamięć nie rosła z rozmiarem katalogu
+            for key, path in queue:
+                in_flight[executor.submit(process_file, path)] = (key, path)
+                return True
+            return False
+
+        for _ in range(workers * 2):
+            if not submit_next():
+                break
+
+        while in_flight:
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                key, path = in_flight.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:  # pylint: disable=broad-except
+                    failed += 1
+                    app.logger.exception("Import pliku %s nieudany", path)
+                    print(f"❌ {path}: {e}")
+                else:
+                    if not isinstance(result, str) and result[0].payload["audio_md5"][0] in imported_md5:
+                        result = "duplikat nagrania importowanego w tym przebiegu"
+                    if isinstance(result, str):
+                        skipped += 1
+                        mark_skipped(conn, key, path, result)
+                        print(f"⚠️ {path}: {result} - pominięto")
+                    else:
+                        imported_md5.add(result[0].payload["audio_md5"][0])
+                        pending.append((key, path, *result))
+                submit_next()
+
+            if len(pending) >= batch_size:
+                imported += flush(conn, pending)
+                elapsed = time.perf_counter() - started
+                print(f"✅ Zaimportowano {imported} plików ({imported / elapsed * 60:.1f} plików/min)")
+
+        imported += flush(conn, pending)
+
+    elapsed = time.perf_counter() - started
+    rate = imported / elapsed * 60 if elapsed > 0 else 0.0
+    app.record_metric("bulk_import.files_per_minute", rate)
+    print("\n" + "=" * 50)
+    print(f"🎉 Zaimportowano: {imported}, pominięto: {skipped}, błędy: {failed}")
+    print(f"⏱️ Czas: {elapsed:.1f}s, przepustowość: {rate:.1f} plików/min")
+    conn.close()
+    return 1 if failed else 0
+
+
+def main():
+    """Punkt wejścia CLI"""
+    parser = argparse.ArgumentParser(description="Masowy import nagrań audio do Audio Notes AI")
+    parser.add_argument("directory", type=Path, help="Katalog z nagraniami (przeszukiwany rekurencyjnie)")
+    parser.add_argument("--workers", type=int, default=4, help="Liczba plików przetwarzanych równolegle")
+    parser.add_argument("--batch-size", type=int, default=32, help="Liczba notatek w jednym upsert do Qdrant")
+    parser.add_argument("--checkpoint", type=Path, default=DEFAULT_CHECKPOINT, help="Plik checkpointu importu")
+    args = parser.parse_args()
+
+    if not args.directory.is_dir():
+        print(f"❌ Katalog nie istnieje: {args.directory}")
+        sys.exit(2)
+
+    try:
+        sys.exit(run_import(args.directory, max(1, args.workers), max(1, args.batch_size), args.checkpoint))
+    except KeyboardInterrupt:
+        print("\n👋 Import przerwany - uruchom ponownie, aby kontynuować od checkpointu")
+        sys.exit(130)
+
+
+if __name__ == "__main__":
+    main()
@@ -106,6 +106,14 @@ def run_streamlit():
     except subprocess.CalledProcessError as e:
         print(f"\n❌ Błąd uruchomienia Streamlit: {e}")
 
+def run_id_migration():
+    """Przenieś notatki z liczbowymi ID na identyfikatory UUID"""
+    print("\n🔁 Migracja identyfikatorów notatek...")
+    
+    import app
+    migrated = app.migrate_legacy_note_ids()
+    print(f"✅ Zmigrowano notatek: {migrated}")
+
 def main():
     """Główna funkcja quick start"""
     print("🚀 AUDIO NOTATKI - ENTERPRISE VERSION 2.1.0")
@@ -133,13 +141,16 @@ def main():
     print("🎉 WSZYSTKO GOTOWE!")
     print("\nWybierz opcję:")
     print("1. Uruchom aplikację w przeglądarce")
-    print("2. Zakończ")
+    print("2. Migruj liczbowe ID notatek do UUID")
+    print("3. Zakończ")
     
     try:
-        choice = input("\nTwój wybór (1/2): ").strip()
+        choice = input("\nTwój wybór (1/2/3): ").strip()
         
         if choice == '1':
             run_streamlit()
+        elif choice == '2':
+            run_id_migration()
         else:
             print("\n👋 Do zobaczenia!")
             
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Migracja kolekcji notatek między profilami przechowywania i benchmark profili.
+
+Profile (``STORAGE_PROFILES`` w app.py) różnią się wymiarem wektorów, kwantyzacją
+i przechowywaniem wektorów na dysku. Wektory ``text-embedding-3`` można skracać
+(Matryoshka): przejście na mniejszy wymiar to obcięcie i ponowna normalizacja
+wektora, bez wywołań API. Przejście na większy wymiar wymaga ponownego embeddingu. Migracja obejmuje także
+kolekcję fragmentów ``<kolekcja>_chunks``, tworzoną w tym samym profilu.
+
+Polecenie ``chunks`` dzieli długie notatki na fragmenty i indeksuje je w kolekcji
+``<kolekcja>_chunks`` (np. notatki zapisane przed wprowadzeniem fragmentów).
+
+Polecenie ``metadata`` uzupełnia metadane notatek zapisanych przed ich wprowadzeniem
+(``created_ts``, liczba słów, język), potrzebne do filtrowania listy i wyszukiwania.
+
+Polecenie ``keywords`` przebudowuje lokalny indeks słów kluczowych (BM25) repliki, np. po
+edycjach notatek wykonanych przez inne repliki aplikacji.
+
+Użycie:
+    python reindex.py migrate --profile compact --target notes_compact
+    python reindex.py benchmark --sample 2000 --queries 50
+    python reindex.py chunks
+    python reindex.py metadata
+    python reindex.py keywords
+"""
+
+import argparse
+import math
+import random
+import sys
+import time
+import uuid
+
+from qdrant_client.models import Filter, HasIdCondition, PointStruct, SearchParams
+
+import app
+
+
+def resize_vector(vector: list[float], dim: int) -> list[float]:
+    """Obetnij wektor do ``dim`` wymiarów i znormalizuj go ponownie (Matryoshka)"""
+    truncated = vector[:dim]
+    norm = math.sqrt(sum(value * value for value in truncated)) or 1.0
+    return [value / norm for value in truncated]
+
+
+def upsert_resized(target: str, points: list, target_dim: int) -> int:
+    """Zapisz punkty w kolekcji docelowej, dopasowując wymiar ich wektorów; zwraca liczbę zapisanych punktów"""
+    source_dim = len(points[0].vector)
+    if target_dim <= source_dim:
+        vectors = [resize_vector(point.vector, target_dim) for point in points]
+    else:
+        # Większy wymiar wymaga ponownego embeddingu treści - punktów bez treści nie da się przenieść
+        missing = [point.id for point in points if not (point.payload or {}).get("text")]
+        if missing:
+            app.logger.warning("Migracja do %s: pominięto punkty bez treści: %s", target, missing)
+            print(f"⚠️ Pominięto {len(missing)} punktów bez treści: {missing}")
+            points = [point for point in points if (point.payload or {}).get("text")]
+        if not points:
+            return 0
+        vectors = app.get_embeddings_many(
+            [app.embedding_input(point.payload["text"]) for point in points], dimensions=target_dim,
+        )
+    app.get_qdrant_client().upsert(
+        collection_name=target,
+        points=[
+            PointStruct(id=point.id, vector=vector, payload=point.payload)
+            for point, vector in zip(points, vectors)
+        ],
+    )
+    return len(points)
+
+
+def copy_points(source: str, target: str, target_dim: int, batch_size: int, limit=None) -> int:
+    """Skopiuj punkty między kolekcjami, dopasowując wymiar wektorów; zwraca liczbę punktów"""
+    client = app.get_qdrant_client()
+    scanned = copied = 0
+    offset = None
+    while True:
+        page = batch_size if limit is None else min(batch_size, limit - scanned)
+        points, offset = client.scroll(
+            collection_name=source, limit=page, offset=offset, with_payload=True, with_vectors=True,
+        )
+        if not points:
+            break
+        copied += upsert_resized(target, points, target_dim)
+        scanned += len(points)
+        print(f"  … skopiowano {copied} punktów")
+        if offset is None or (limit is not None and scanned >= limit):
+            break
+    return copied
+
+
+def run_migrate(args) -> int:
+    """Utwórz kolekcje notatek i fragmentów w nowym profilu i skopiuj do nich punkty"""
+    client = app.get_qdrant_client()
+    existing = {collection.name for collection in client.get_collections().collections}
+    # Kolekcja fragmentów ma ten sam profil (wymiar) co kolekcja notatek
+    source_chunks, target_chunks = f"{args.source}_chunks", f"{args.target}_chunks"
+    for collection in (args.target, target_chunks):
+        if collection in existing:
+            print(f"❌ Kolekcja docelowa {collection} już istnieje")
+            return 2
+    dim = app.STORAGE_PROFILES[args.profile]["dim"]
+    print(f"🔁 Migracja {args.source} → {args.target} (profil {args.profile})")
+    app.create_collection_for_profile(client, args.target, args.profile)
+    copied = copy_points(args.source, args.target, dim, args.batch_size)
+    print(f"✅ Zmigrowano {copied} notatek")
+    app.create_collection_for_profile(client, target_chunks, args.profile, payload_indexes=app.CHUNK_PAYLOAD_INDEXES)
+    if source_chunks in existing:
+        chunks = copy_points(source_chunks, target_chunks, dim, args.batch_size)
+        print(f"✅ Zmigrowano {chunks} fragmentów ({source_chunks} → {target_chunks})")
+    else:
+        print(f"💡 Brak kolekcji {source_chunks} - po przełączeniu kolekcji uruchom: python reindex.py chunks")
+    print(f"💡 Ustaw w .env: QDRANT_COLLECTION_NAME={args.target} oraz STORAGE_PROFILE={args.profile}")
+    return 0
+
+
+def run_benchmark(args) -> int:
+    """Porównaj recall@k i opóźnienie wyszukiwania profili na próbce notatek"""
+    client = app.get_qdrant_client()
+    run_id = uuid.uuid4().hex[:8]
+    profiles = args.profiles or list(app.STORAGE_PROFILES)
+
+    # Zapytania: wektory losowych notatek z próbki (bez kosztów API)
+    points, _ = client.scroll(
+        collection_name=args.source, limit=args.sample + args.queries, with_payload=True, with_vectors=True,
+    )
+    if len(points) < 2:
+        print("❌ Kolekcja źródłowa zawiera za mało notatek")
+        return 2
+    # Zapytania to wektory odłożonych notatek spoza próbki - wynik nie zawiera trafień "samych w siebie"
+    random.Random(0).shuffle(points)
+    held_out = min(args.queries, len(points) // 2)
+    queries = [point.vector for point in points[:held_out]]
+    sample = points[held_out:]
+    # Punkt odniesienia ograniczony do próbki skopiowanej do kolekcji profilu
+    sample_filter = Filter(must=[HasIdCondition(has_id=[point.id for point in sample])])
+
+    print(f"📊 Benchmark: {len(sample)} notatek, {len(queries)} zapytań, recall@{args.k}")
+    print(f"{'profil':<10}{'wymiar':>8}{'recall':>10}{'p50 [ms]':>12}{'p95 [ms]':>12}")
+
+    results = {}
+    for profile in profiles:
+        collection = f"bench_{run_id}_{profile}"
+        dim = app.STORAGE_PROFILES[profile]["dim"]
+        try:
+            app.create_collection_for_profile(client, collection, profile)
+            for start in range(0, len(sample), args.batch_size):
+                upsert_resized(collection, sample[start:start + args.batch_size], dim)
+            recalls, latencies = [], []
+            for query in queries:
+                # Punkt odniesienia: dokładne wyszukiwanie na pełnych wektorach źródłowych
+                truth = client.query_points(
+                    collection_name=args.source, query=query, query_filter=sample_filter,
+                    limit=args.k, search_params=SearchParams(exact=True),
+                ).points
+                started = time.perf_counter()
+                found = client.query_points(
+                    collection_name=collection, query=resize_vector(query, dim), limit=args.k,
+                    search_params=app.search_params_for_profile(profile),
+                ).points
+                latencies.append((time.perf_counter() - started) * 1000)
+                truth_ids = {point.id for point in truth}
+                recalls.append(len(truth_ids & {point.id for point in found}) / max(1, len(truth_ids)))
+            latencies.sort()
+            results[profile] = {
+                "recall": sum(recalls) / len(recalls),
+                "p50": latencies[len(latencies) // 2],
+                "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+            }
+            print(f"{profile:<10}{dim:>8}{results[profile]['recall']:>10.3f}"
+                  f"{results[profile]['p50']:>12.2f}{results[profile]['p95']:>12.2f}")
+        finally:
+            client.delete_collection(collection)
+    return 0
+
+
+def index_chunks(notes: list[dict]) -> int:
+    """Zaindeksuj fragmenty paczki notatek razem z ich metadanymi"""
+    return app.index_note_chunks(
+        [(note["id"], note["text"]) for note in notes],
+        {str(note["id"]): app.note_metadata(note) for note in notes},
+    )
+
+
+def run_chunks(args) -> int:
+    """Przelicz fragmenty wszystkich długich notatek w kolekcji"""
+    app.initialize_collection()
+    indexed = chunks = 0
+    batch = []
+    for note in app.iter_notes(page_size=args.batch_size):
+        if len(note["text"]) < app.CHUNK_MIN_CHARS:
+            continue
+        batch.append(note)
+        if len(batch) >= args.batch_size:
+            chunks += index_chunks(batch)
+            indexed += len(batch)
+            batch.clear()
+            print(f"  … {indexed} notatek, {chunks} fragmentów")
+    if batch:
+        chunks += index_chunks(batch)
+        indexed += len(batch)
+    print(f"✅ Zaindeksowano {chunks} fragmentów z {indexed} długich notatek")
+    return 0
+
+
+def run_metadata(args) -> int:
+    """Uzupełnij metadane notatek (bez wywołań API)"""
+    app.initialize_collection()
+    updated = app.backfill_note_metadata(batch_size=args.batch_size)
+    print(f"✅ Uzupełniono metadane {updated} notatek")
+    return 0
+
+
+def run_keywords(args) -> int:
+    """Przebuduj lokalny indeks słów kluczowych z notatek w kolekcji"""
+    app.initialize_collection()
+    index = app.KeywordIndex(app.KEYWORD_INDEX_PATH)
+    indexed = index.rebuild(app.iter_notes(page_size=args.batch_size))
+    print(f"✅ Zaindeksowano {indexed} notatek w {app.KEYWORD_INDEX_PATH}")
+    return 0
+
+
+def main():
+    """Punkt wejścia CLI"""
+    parser = argparse.ArgumentParser(description="Profile przechowywania wektorów Audio Notes AI")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate = subparsers.add_parser("migrate", help="Przenieś kolekcję do innego profilu")
+    migrate.add_argument("--profile", choices=list(app.STORAGE_PROFILES), required=True)
+    migrate.add_argument("--target", required=True, help="Nazwa nowej kolekcji")
+    migrate.add_argument("--source", default=app.QDRANT_COLLECTION_NAME, help="Kolekcja źródłowa")
+    migrate.add_argument("--batch-size", type=int, default=256)
+
+    benchmark = subparsers.add_parser("benchmark", help="Porównaj recall i opóźnienie profili")
+    benchmark.add_argument("--profiles", nargs="*", choices=list(app.STORAGE_PROFILES))
+    benchmark.add_argument("--source", default=app.QDRANT_COLLECTION_NAME, help="Kolekcja źródłowa (pełne wektory)")
+    benchmark.add_argument("--sample", type=int, default=2000, help="Liczba notatek w próbce")
+    benchmark.add_argument("--queries", type=int, default=50, help="Liczba zapytań testowych (notatki spoza próbki)")
+    benchmark.add_argument("--k", type=int, default=10, help="Liczba wyników (recall@k)")
+    benchmark.add_argument("--batch-size", type=int, default=256)
+
+    chunks = subparsers.add_parser("chunks", help="Przelicz fragmenty długich notatek")
+    chunks.add_argument("--batch-size", type=int, default=32, help="Liczba notatek w jednej paczce")
+
+    metadata = subparsers.add_parser("metadata", help="Uzupełnij metadane starszych notatek")
+    metadata.add_argument("--batch-size", type=int, default=256, help="Liczba notatek w jednej paczce")
+
+    keywords = subparsers.add_parser("keywords", help="Przebuduj lokalny indeks słów kluczowych")
+    keywords.add_argument("--batch-size", type=int, default=256, help="Liczba notatek w jednej paczce")
+
+    args = parser.parse_args()
+    if args.command == "migrate":
+        sys.exit(run_migrate(args))
+    if args.command == "chunks":
+        sys.exit(run_chunks(args))
+    if args.command == "metadata":
+        sys.exit(run_metadata(args))
+    if args.command == "keywords":
+        sys.exit(run_keywords(args))
+    sys.exit(run_benchmark(args))
+
+
+if __name__ == "__main__":
+    main()
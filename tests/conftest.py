@@ -0,0 +1,97 @@
+"""
+Wspólne fixtures testów Audio Notes AI.
+
+Testy działają bez sieci: ``app`` importowany jest w katalogu tymczasowym z plikiem
+``.env`` wybierającym wbudowany Qdrant w pamięci (``STORAGE_BACKEND=memory``), więc
+bazy SQLite (cache, indeks słów kluczowych, kolejka zadań) również trafiają do tego
+katalogu. Klient OpenAI zastępowany jest atrapą o deterministycznych odpowiedziach.
+"""
+
+import math
+import os
+import sys
+import tempfile
+from hashlib import md5
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from qdrant_client.models import PointStruct
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+WORK_DIR = Path(tempfile.mkdtemp(prefix="audio-notes-tests-"))
+(WORK_DIR / ".env").write_text("STORAGE_BACKEND=memory\nOPENAI_API_KEY=sk-test\n", encoding="utf-8")
+os.chdir(WORK_DIR)
+sys.path.insert(0, str(REPO_ROOT))
+
+import app  # noqa: E402  pylint: disable=wrong-import-position
+
+
+def fake_vector(text: str, dimensions: int = app.EMBEDDING_DIM) -> list[float]:
+    """Znormalizowany wektor "worka słów" - teksty o wspólnych słowach są do siebie podobne."""
+    vector = [0.0] * dimensions
+    for word in text.lower().split():
+        vector[int(md5(word.encode("utf-8")).hexdigest(), 16) % dimensions] += 1.0
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return [value / norm for value in vector]
+
+
+def add_point(client, note_id, text: str, **payload):
+    """Zapisuje notatkę bezpośrednio w kolekcji (bez wzbogacania), np. w dawnym formacie payloadu."""
+    client.upsert(
+        collection_name=app.QDRANT_COLLECTION_NAME,
+        points=[PointStruct(id=note_id, vector=fake_vector(text), payload={"text": text, **payload})],
+    )
+
+
+class FakeOpenAI:
+    """Atrapa klienta OpenAI: embeddingi, tytuły i transkrypcje bez zapytań sieciowych."""
+
+    def __init__(self):
+        self.embedding_requests: list[list[str]] = []
+        self.title_requests: list[str] = []
+        self.embeddings = SimpleNamespace(create=self._create_embeddings)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create_completion))
+        self.audio = SimpleNamespace(transcriptions=SimpleNamespace(create=self._create_transcription))
+        self.fail_embeddings = False
+
+    def _create_embeddings(self, input, model, dimensions):  # pylint: disable=redefined-builtin,unused-argument
+        if self.fail_embeddings:
+            raise ConnectionError("Atrapa: embeddingi niedostępne")
+        self.embedding_requests.append(list(input))
+        return SimpleNamespace(data=[
+            SimpleNamespace(index=index, embedding=fake_vector(text, dimensions)) for index, text in enumerate(input)
+        ])
+
+    def _create_completion(self, model, messages, max_tokens):  # pylint: disable=unused-argument
+        note_text = messages[-1]["content"].split(": ", 1)[-1]
+        self.title_requests.append(note_text)
+        title = " ".join(note_text.split()[:3]).capitalize()
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=title))])
+
+    def _create_transcription(self, file, model, response_format):  # pylint: disable=unused-argument
+        return f"transkrypcja {file.name}"
+
+
+@pytest.fixture(autouse=True)
+def openai_client(monkeypatch):
+    """Podmienia klienta OpenAI na atrapę we wszystkich testach."""
+    client = FakeOpenAI()
+    monkeypatch.setattr(app, "get_openai_client", lambda: client)
+    return client
+
+
+@pytest.fixture
+def qdrant():
+    """Pusta kolekcja notatek i fragmentów w Qdrant w pamięci oraz czyste pamięci podręczne."""
+    client = app.get_qdrant_client()
+    for collection in (app.QDRANT_COLLECTION_NAME, app.CHUNK_COLLECTION_NAME):
+        client.delete_collection(collection)
+    app.reset_collection_cache()
+    app.get_search_cache.clear()
+    # Nowa wersja kolekcji - strony listy zapamiętane w poprzednich testach nie są używane
+    app.get_collection_version().bump()
+    app.initialize_collection()
+    # Indeks słów kluczowych z poprzednich testów jest przebudowywany z pustej kolekcji
+    app.get_keyword_index()
+    return client
@@ -0,0 +1,68 @@
+"""Testy masowego importu nagrań (checkpoint i pomijanie duplikatów)."""
+
+import sqlite3
+
+import pytest
+
+import app
+import bulk_import
+
+TRANSCRIPTS = {b"nagranie-a": "notatka o budżecie firmy", b"nagranie-c": "notatka o urlopie", b"cisza": ""}
+
+
+@pytest.fixture
+def transcriptions(monkeypatch):
+    """Transkrypcja zależna od treści pliku; zwraca listę przetranskrybowanych plików."""
+    calls = []
+
+    def transcribe(path, digest=None):
+        calls.append(path.name)
+        return TRANSCRIPTS[path.read_bytes()]
+
+    monkeypatch.setattr(app, "transcribe_audio_cached", transcribe)
+    monkeypatch.setattr(app, "audio_duration_s", lambda path: 12.0)
+    return calls
+
+
+def write_recordings(root, files: dict):
+    for name, content in files.items():
+        (root / name).write_bytes(content)
+
+
+def skipped_reasons(checkpoint) -> dict:
+    with sqlite3.connect(str(checkpoint)) as conn:
+        return dict(conn.execute("SELECT path, reason FROM skipped"))
+
+
+def test_import_skips_duplicates_and_resumes(qdrant, transcriptions, tmp_path, capsys):
+    recordings, checkpoint = tmp_path / "nagrania", tmp_path / "import.sqlite3"
+    recordings.mkdir()
+    write_recordings(recordings, {
+        "a.wav": b"nagranie-a", "b.wav": b"nagranie-a", "c.mp3": b"nagranie-c", "d.wav": b"cisza", "e.txt": b"x",
+    })
+
+    assert bulk_import.run_import(recordings, workers=4, batch_size=10, checkpoint=checkpoint) == 0
+
+    notes = list(app.iter_notes())
+    assert sorted(note["text"] for note in notes) == ["notatka o budżecie firmy", "notatka o urlopie"]
+    reasons = skipped_reasons(checkpoint)
+    assert sorted(reasons.values()) == ["duplikat nagrania importowanego w tym przebiegu", "pusta transkrypcja"]
+    assert str(recordings / "d.wav") in reasons
+
+    transcriptions.clear()
+    assert bulk_import.run_import(recordings, workers=2, batch_size=10, checkpoint=checkpoint) == 0
+    assert transcriptions == []
+    assert "Plików do importu: 0" in capsys.readouterr().out
+    assert len(list(app.iter_notes())) == 2
+
+
+def test_recording_saved_earlier_is_skipped(qdrant, transcriptions, tmp_path):
+    recordings, checkpoint = tmp_path / "nagrania", tmp_path / "import.sqlite3"
+    recordings.mkdir()
+    write_recordings(recordings, {"a.wav": b"nagranie-a"})
+    app.save_note("notatka z aplikacji", audio_md5=app.audio_md5(recordings / "a.wav"))
+
+    assert bulk_import.run_import(recordings, workers=1, batch_size=1, checkpoint=checkpoint) == 0
+
+    assert transcriptions == []
+    assert list(skipped_reasons(checkpoint).values()) == ["nagranie już zapisane jako notatka"]
@@ -0,0 +1,94 @@
+"""Testy trwałego cache LRU w SQLite i cache transkrypcji."""
+
+import sqlite3
+
+import pytest
+
+import app
+
+
+def cache_sizes(path, table: str) -> tuple[int, int]:
+    """Zapisany łączny rozmiar i faktyczna suma rozmiarów wpisów."""
+    with sqlite3.connect(str(path)) as conn:
+        total = conn.execute(f"SELECT total FROM {table}_meta WHERE id = 0").fetchone()[0]
+        actual = conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {table}").fetchone()[0]
+    return total, actual
+
+
+class TestSQLiteLRUCache:
+    def test_get_and_put(self, tmp_path):
+        cache = app.SQLiteLRUCache(tmp_path / "cache.sqlite3", "items", 1000)
+        assert cache.get("a") is None
+        cache.put("a", b"wartosc")
+        assert cache.get("a") == b"wartosc"
+        assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1, "bytes": 7}
+
+    def test_replacing_entry_keeps_total_size(self, tmp_path):
+        path = tmp_path / "cache.sqlite3"
+        cache = app.SQLiteLRUCache(path, "items", 1000)
+        cache.put("a", b"x" * 100)
+        cache.put("a", b"x" * 40)
+        cache.put("b", b"x" * 10)
+        assert cache.stats()["bytes"] == 50
+        assert cache_sizes(path, "items") == (50, 50)
+
+    def test_evicts_least_recently_used(self, tmp_path, monkeypatch):
+        clock = iter(range(1, 100))
+        monkeypatch.setattr(app.time, "time", lambda: next(clock))
+        path = tmp_path / "cache.sqlite3"
+        cache = app.SQLiteLRUCache(path, "items", 300)
+        for key in "abc":
+            cache.put(key, b"x" * 100)
+        assert cache.get("a") is not None  # "a" używany ostatnio - "b" jest najstarszy
+        cache.put("d", b"x" * 150)
+
+        assert cache.get("b") is None
+        assert cache.get("c") is None
+        assert cache.get("a") is not None and cache.get("d") is not None
+        assert cache_sizes(path, "items") == (250, 250)
+
+    def test_total_is_seeded_for_existing_table(self, tmp_path):
+        path = tmp_path / "cache.sqlite3"
+        with sqlite3.connect(str(path)) as conn:
+            conn.execute(
+                "CREATE TABLE items (key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+                "size INTEGER NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.executemany("INSERT INTO items VALUES (?, ?, ?, 0)", [("a", b"xx", 2), ("b", b"xxx", 3)])
+        cache = app.SQLiteLRUCache(path, "items", 1000)
+        assert cache.stats()["bytes"] == 5
+
+    def test_instances_share_total(self, tmp_path):
+        path = tmp_path / "cache.sqlite3"
+        first = app.SQLiteLRUCache(path, "items", 1000)
+        second = app.SQLiteLRUCache(path, "items", 1000)
+        first.put("a", b"x" * 10)
+        second.put("b", b"x" * 20)
+        assert first.stats()["bytes"] == 30
+
+
+class TestTranscriptionCache:
+    def test_transcription_is_cached(self, monkeypatch, tmp_path):
+        cache = app.SQLiteLRUCache(tmp_path / "cache.sqlite3", "transcriptions", 10_000)
+        monkeypatch.setattr(app, "get_transcription_cache", lambda: cache)
+        calls = []
+
+        def transcribe(audio_source):
+            calls.append(audio_source)
+            return "tekst nagrania", {}
+
+        monkeypatch.setattr(app, "transcribe_audio_segments", transcribe)
+        assert app.transcribe_audio_cached(b"audio") == "tekst nagrania"
+        assert app.transcribe_audio_cached(b"audio") == "tekst nagrania"
+        assert calls == [b"audio"]
+
+    def test_precomputed_digest_skips_rehashing(self, monkeypatch, tmp_path):
+        cache = app.SQLiteLRUCache(tmp_path / "cache.sqlite3", "transcriptions", 10_000)
+        monkeypatch.setattr(app, "get_transcription_cache", lambda: cache)
+        monkeypatch.setattr(app, "transcribe_audio_segments", lambda audio_source: ("tekst nagrania", {}))
+        digest = app.audio_md5(b"audio")
+        assert app.transcribe_audio_cached(b"audio", digest=digest) == "tekst nagrania"
+
+        monkeypatch.setattr(app, "audio_md5", lambda audio: pytest.fail("MD5 liczony ponownie"))
+        monkeypatch.setattr(app, "transcribe_audio_segments", lambda audio_source: pytest.fail("brak trafienia w cache"))
+        assert app.transcribe_audio_cached(b"audio", digest=digest) == "tekst nagrania"
@@ -0,0 +1,97 @@
+"""Testy fragmentów długich notatek (osobne wektory fragmentów w kolekcji ``_chunks``)."""
+
+from qdrant_client.models import PointStruct
+
+import app
+from conftest import add_point, fake_vector
+
+LONG_TEXT = " ".join(f"Zdanie numer {i} opisuje kolejny punkt spotkania projektowego." for i in range(60))
+
+
+def chunk_payloads(client, note_id) -> list[dict]:
+    points, _ = client.scroll(
+        collection_name=app.CHUNK_COLLECTION_NAME, scroll_filter=app.chunk_parent_filter([note_id]), limit=100,
+    )
+    return [point.payload for point in points]
+
+
+class TestSplitIntoChunks:
+    def test_short_text_is_one_chunk(self):
+        assert app.split_into_chunks("  krótki tekst ") == ["krótki tekst"]
+        assert app.split_into_chunks("   ") == []
+
+    def test_chunks_overlap_and_cover_text(self):
+        chunks = app.split_into_chunks(LONG_TEXT, size=400, overlap=100)
+        assert all(200 <= len(chunk) <= 400 for chunk in chunks[:-1])
+        assert chunks[0].startswith("Zdanie numer 0 ") and chunks[-1].endswith("numer 59 opisuje kolejny punkt spotkania projektowego.")
+        for previous, current in zip(chunks, chunks[1:]):
+            assert current.split()[0] in previous.split()[-20:]
+
+
+class TestNoteChunks:
+    def test_long_note_is_chunked_with_metadata(self, qdrant):
+        note_id = app.save_note(LONG_TEXT, tags="projekt")
+        payloads = chunk_payloads(qdrant, note_id)
+        assert len(payloads) > 1
+        assert sorted(payload["chunk_index"] for payload in payloads) == list(range(len(payloads)))
+        assert all(payload["tags"] == ["projekt"] for payload in payloads)
+
+    def test_short_note_has_no_chunks(self, qdrant):
+        note_id = app.save_note("krótka notatka")
+        assert chunk_payloads(qdrant, note_id) == []
+
+    def test_metadata_change_is_copied_to_chunks(self, qdrant):
+        note_id = app.save_note(LONG_TEXT)
+
+        app.update_note(note_id, LONG_TEXT, tags="projekt")
+
+        assert all(payload["tags"] == ["projekt"] for payload in chunk_payloads(qdrant, note_id))
+
+    def test_legacy_note_chunks_are_updated(self, qdrant):
+        add_point(qdrant, 7, LONG_TEXT, title="Stara", content_hash=app.note_text_hash(LONG_TEXT))
+        app.index_note_chunks([(7, LONG_TEXT)])
+        assert chunk_payloads(qdrant, 7)
+
+        app.update_note(7, LONG_TEXT, tags="archiwum")
+
+        assert all(payload["tags"] == ["archiwum"] for payload in chunk_payloads(qdrant, 7))
+
+    def test_parent_id_is_stored_as_text(self, qdrant):
+        note_id = app.save_note(LONG_TEXT)
+        add_point(qdrant, 7, LONG_TEXT, title="Stara")
+        app.index_note_chunks([(7, LONG_TEXT)])
+        assert {payload["parent_id"] for payload in chunk_payloads(qdrant, note_id)} == {note_id}
+        assert {payload["parent_id"] for payload in chunk_payloads(qdrant, 7)} == {"7"}
+
+    def test_semantic_search_finds_legacy_note_by_chunk(self, qdrant):
+        # Wektor całej notatki nie pasuje do zapytania - notatka trafia do wyników tylko przez fragment
+        qdrant.upsert(
+            collection_name=app.QDRANT_COLLECTION_NAME,
+            points=[PointStruct(id=7, vector=fake_vector("inny temat"), payload={"text": LONG_TEXT, "title": "Stara"})],
+        )
+        app.index_note_chunks([(7, LONG_TEXT)])
+        add_point(qdrant, 8, "Zdanie numer jeden", title="Pierwsza")
+        add_point(qdrant, 9, "Kolejny punkt spotkania", title="Druga")
+        query = app.split_into_chunks(LONG_TEXT)[1]
+
+        results = app.search_notes_semantic(query, limit=2)
+
+        legacy = next(note for note in results if note["id"] == 7)
+        assert legacy["title"] == "Stara"
+        assert legacy["snippet"]
+
+    def test_deleting_note_deletes_chunks(self, qdrant):
+        note_id = app.save_note(LONG_TEXT)
+        app.delete_notes([note_id])
+        assert chunk_payloads(qdrant, note_id) == []
+
+    def test_chunk_failure_does_not_fail_update(self, qdrant, monkeypatch):
+        note_id = app.save_note("krótka notatka przed zmianą")
+
+        def failing_chunks(notes, metadata=None):
+            raise ConnectionError("Qdrant niedostępny")
+
+        monkeypatch.setattr(app, "build_chunk_points", failing_chunks)
+        assert app.update_note(note_id, LONG_TEXT)["vector"] is True
+        point = qdrant.retrieve(collection_name=app.QDRANT_COLLECTION_NAME, ids=[note_id])[0]
+        assert point.payload["text"] == LONG_TEXT
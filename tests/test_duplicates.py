@@ -0,0 +1,40 @@
+"""Testy wyszukiwania grup duplikatów w kolekcji."""
+
+import app
+from conftest import add_point
+
+
+class TestFindDuplicateClusters:
+    def test_groups_exact_and_similar_duplicates(self, qdrant):
+        text = "spotkanie z klientem w sprawie nowej umowy"
+        add_point(qdrant, 1, text, created_at="2024-01-01", content_hash=app.note_text_hash(text))
+        add_point(qdrant, 2, text + " ", created_at="2024-01-02", content_hash=app.note_text_hash(text))
+        add_point(qdrant, 3, "zupełnie inna treść", created_at="2024-01-03")
+        add_point(qdrant, 4, "lista zakupów", created_at="2024-01-04", audio_md5=["md5-a"])
+        add_point(qdrant, 5, "inna transkrypcja nagrania", created_at="2024-01-05", audio_md5=["md5-a"])
+
+        clusters = app.find_duplicate_clusters()
+
+        assert sorted([note["id"] for note in cluster] for cluster in clusters) == [[1, 2], [4, 5]]
+
+    def test_chain_is_split_around_oldest_note(self, qdrant):
+        # 1 i 2 mają wspólne nagranie, 2 i 3 także - ale 1 i 3 nie są duplikatami
+        add_point(qdrant, 1, "pierwsza notatka", created_at="2024-01-01", audio_md5=["a"])
+        add_point(qdrant, 2, "druga notatka", created_at="2024-01-02", audio_md5=["a", "b"])
+        add_point(qdrant, 3, "trzecia notatka", created_at="2024-01-03", audio_md5=["b", "c"])
+        add_point(qdrant, 4, "czwarta notatka", created_at="2024-01-04", audio_md5=["c"])
+
+        clusters = app.find_duplicate_clusters(page_size=2)
+
+        assert [[note["id"] for note in cluster] for cluster in clusters] == [[1, 2], [3, 4]]
+        assert clusters[0][0] == {"id": 1, "title": "Brak tytułu", "created_at": "2024-01-01"}
+
+    def test_duplicates_at_ingest(self, qdrant):
+        note_id = app.save_note("notatka z zebrania zarządu", audio_md5="md5-x")
+
+        by_text = app.find_duplicate_notes("notatka  z zebrania zarządu")
+        by_audio = app.find_duplicate_notes("zupełnie inna transkrypcja", audio_md5="md5-x")
+
+        assert [note["id"] for note in by_text] == [note_id]
+        assert [note["id"] for note in by_audio] == [note_id]
+        assert app.find_duplicate_notes("nic wspólnego") == []
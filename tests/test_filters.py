@@ -0,0 +1,78 @@
+"""Testy filtrów metadanych notatek wykonywanych w Qdrant."""
+
+from datetime import date, datetime
+
+import app
+from conftest import add_point
+
+
+def matching_ids(client, filters: dict) -> set:
+    points, _ = client.scroll(
+        collection_name=app.QDRANT_COLLECTION_NAME, scroll_filter=app.build_notes_filter(filters), limit=100,
+    )
+    return {point.id for point in points}
+
+
+def created(value: str) -> dict:
+    return {"created_at": value, "created_ts": datetime.fromisoformat(value).timestamp()}
+
+
+class TestBuildNotesFilter:
+    def test_no_filters(self):
+        assert app.build_notes_filter(None) is None
+        assert app.build_notes_filter({"language": "", "tags": " , "}) is None
+
+    def test_metadata_filters(self, qdrant):
+        add_point(qdrant, 1, "a", duration_s=30.0, word_count=100, language="pl", tags=["praca"])
+        add_point(qdrant, 2, "b", duration_s=300.0, word_count=10, language="en", tags=["dom", "zakupy"])
+        add_point(qdrant, 3, "c")
+
+        assert matching_ids(qdrant, {"min_duration_s": 60}) == {2}
+        assert matching_ids(qdrant, {"max_words": 50}) == {2}
+        assert matching_ids(qdrant, {"language": "pl"}) == {1}
+        assert matching_ids(qdrant, {"tags": "Zakupy, inne"}) == {2}
+        assert matching_ids(qdrant, {"language": "pl", "min_words": 200}) == set()
+
+    def test_date_range_is_inclusive(self, qdrant):
+        add_point(qdrant, 1, "a", **created("2024-03-01T00:00:00"))
+        add_point(qdrant, 2, "b", **created("2024-03-31T23:59:00"))
+        add_point(qdrant, 3, "c", **created("2024-04-01T00:00:00"))
+
+        assert matching_ids(qdrant, {"date_from": date(2024, 3, 1), "date_to": date(2024, 3, 31)}) == {1, 2}
+        assert matching_ids(qdrant, {"date_from": date(2024, 4, 1)}) == {3}
+        assert matching_ids(qdrant, {"date_to": date(2024, 2, 28)}) == set()
+
+
+class TestLegacyDateFallback:
+    """Notatki sprzed wprowadzenia metadanych mają tylko ``created_at``."""
+
+    def test_legacy_notes_match_on_created_at(self, qdrant):
+        add_point(qdrant, 1, "a", created_at="2024-03-15T12:00:00")
+        add_point(qdrant, 2, "b", created_at="2024-05-15T12:00:00")
+        add_point(qdrant, 3, "c")
+
+        assert matching_ids(qdrant, {"date_from": date(2024, 3, 1), "date_to": date(2024, 3, 31)}) == {1}
+        assert matching_ids(qdrant, {"date_from": date(2024, 4, 1)}) == {2}
+        assert matching_ids(qdrant, {"date_to": date(2024, 12, 31)}) == {1, 2}
+
+    def test_created_ts_takes_precedence(self, qdrant):
+        # created_ts jest źródłem prawdy - created_at sprawdzany tylko przy jego braku
+        add_point(qdrant, 1, "a", created_at="2024-03-15T12:00:00",
+                  created_ts=datetime(2024, 6, 1).timestamp())
+        assert matching_ids(qdrant, {"date_from": date(2024, 3, 1), "date_to": date(2024, 3, 31)}) == set()
+
+    def test_bulk_delete_by_date_includes_legacy_notes(self, qdrant):
+        add_point(qdrant, 1, "a", **created("2024-03-01T09:00:00"))
+        add_point(qdrant, 2, "b", created_at="2024-03-20T09:00:00")
+        add_point(qdrant, 3, "c", created_at="2024-04-20T09:00:00")
+
+        filters = {"date_from": date(2024, 3, 1), "date_to": date(2024, 3, 31)}
+        assert app.delete_notes_by_filter(app.build_notes_filter(filters)) == 2
+        assert matching_ids(qdrant, {}) == {3}
+
+    def test_list_view_filters_legacy_notes(self, qdrant):
+        add_point(qdrant, 1, "a", created_at="2024-03-20T09:00:00")
+        add_point(qdrant, 2, "b", created_at="2024-04-20T09:00:00")
+
+        notes, _ = app.list_notes_page(filters={"date_from": date(2024, 4, 1)})
+        assert [note["id"] for note in notes] == [2]
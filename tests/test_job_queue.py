@@ -0,0 +1,177 @@
+"""Testy trwałej kolejki zadań w SQLite."""
+
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import app
+
+
+def echo(payload: dict) -> dict:
+    return {"echo": payload["value"]}
+
+
+def broken(payload: dict) -> dict:
+    raise ValueError(f"nieudane: {payload['value']}")
+
+
+def current_key(payload: dict) -> dict:
+    return {"key": app._require_openai_key()}  # pylint: disable=protected-access
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return tmp_path / "jobs.sqlite3"
+
+
+def make_queue(path, **kwargs) -> app.JobQueue:
+    return app.JobQueue(path, {"echo": echo, "broken": broken, "key": current_key}, **kwargs)
+
+
+def age_running_jobs(path, seconds: float):
+    """Cofa potwierdzenia wykonywania, jakby proces przestał je wysyłać."""
+    with sqlite3.connect(str(path)) as conn:
+        conn.execute("UPDATE jobs SET heartbeat_at = heartbeat_at - ? WHERE status = 'running'", (seconds,))
+
+
+class TestJobQueue:
+    def test_unknown_kind_is_rejected(self, db_path):
+        with pytest.raises(ValueError):
+            make_queue(db_path).submit("unknown", {})
+
+    def test_claim_by_priority_then_submission_order(self, db_path):
+        queue = make_queue(db_path)
+        first = queue.submit("echo", {"value": 1}, priority=app.PRIORITY_BACKGROUND)
+        second = queue.submit("echo", {"value": 2}, priority=app.PRIORITY_INTERACTIVE)
+        third = queue.submit("echo", {"value": 3}, priority=app.PRIORITY_INTERACTIVE)
+
+        claimed = [queue.claim()["id"] for _ in range(3)]
+        assert claimed == [second, third, first]
+        assert queue.claim() is None
+        assert queue.get(first)["status"] == "running"
+
+    def test_each_job_is_claimed_once_across_queues(self, db_path):
+        queues = [make_queue(db_path) for _ in range(4)]
+        submitted = {queues[0].submit("echo", {"value": i}) for i in range(40)}
+        claimed, lock = [], threading.Lock()
+
+        def drain(queue):
+            while (job := queue.claim()) is not None:
+                with lock:
+                    claimed.append(job["id"])
+
+        threads = [threading.Thread(target=drain, args=(queue,)) for queue in queues]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert sorted(claimed) == sorted(submitted)
+
+    def test_finish_is_ignored_for_job_taken_over(self, db_path):
+        crashed, other = make_queue(db_path), make_queue(db_path)
+        job_id = crashed.submit("echo", {"value": 1})
+        crashed.claim()
+        age_running_jobs(db_path, app.JOB_STALE_AFTER_S + 1)
+        assert other.requeue_stale() == 1
+        assert other.claim()["id"] == job_id
+
+        crashed._finish(job_id, "done", result={"echo": "stary"})  # pylint: disable=protected-access
+        assert other.get(job_id)["status"] == "running"
+        other._finish(job_id, "done", result={"echo": 1})  # pylint: disable=protected-access
+        assert other.get(job_id)["result"] == {"echo": 1}
+
+    def test_heartbeat_keeps_job_running(self, db_path):
+        queue = make_queue(db_path)
+        queue.submit("echo", {"value": 1})
+        queue.claim()
+        age_running_jobs(db_path, app.JOB_STALE_AFTER_S + 1)
+        assert queue.heartbeat() == 1
+        assert queue.requeue_stale() == 0
+
+    def test_job_interrupted_too_many_times_fails(self, db_path):
+        queue = make_queue(db_path)
+        job_id = queue.submit("echo", {"value": 1})
+        queue.claim()
+        age_running_jobs(db_path, 100)
+        assert queue.requeue_stale(stale_after_s=10, max_attempts=2) == 1
+        queue.claim()
+        age_running_jobs(db_path, 100)
+        assert queue.requeue_stale(stale_after_s=10, max_attempts=2) == 0
+
+        job = queue.get(job_id)
+        assert job["status"] == "failed"
+        assert "(2)" in job["error"]
+
+    def test_purge_finished(self, db_path):
+        queue = make_queue(db_path)
+        done, queued = queue.submit("echo", {"value": 1}), queue.submit("echo", {"value": 2})
+        queue.claim()
+        queue._finish(done, "done", result={})  # pylint: disable=protected-access
+        assert queue.purge_finished(-1) == 1
+        assert queue.get(done) is None
+        assert queue.get(queued)["status"] == "queued"
+
+    def test_migrates_database_without_heartbeat_columns(self, db_path):
+        with sqlite3.connect(str(db_path)) as conn:
+            conn.execute(
+                "CREATE TABLE jobs (id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, "
+                "priority INTEGER NOT NULL, payload TEXT NOT NULL, result TEXT, error TEXT, "
+                "created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+            )
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, priority, payload, created_at, started_at) "
+                "VALUES ('old', 'echo', 'running', 0, '{\"value\": 1}', 0, 0)"
+            )
+        queue = make_queue(db_path)
+        assert queue.requeue_stale() == 1
+        assert queue.claim()["id"] == "old"
+
+    def test_key_is_not_stored_in_database(self, db_path):
+        make_queue(db_path).submit("echo", {"value": 1}, api_key="sk-sekret")
+        with sqlite3.connect(str(db_path)) as conn:
+            row = conn.execute("SELECT payload, key_ref FROM jobs").fetchone()
+        assert "sk-sekret" not in " ".join(row)
+        assert row[1]
+
+    def test_job_with_unknown_key_waits_for_registration(self, db_path):
+        make_queue(db_path).submit("echo", {"value": 1}, api_key="sk-a")
+        restarted = make_queue(db_path)
+        assert restarted.claim() is None
+        restarted.register_key("sk-a")
+        assert restarted.claim()["key_ref"] == restarted.register_key("sk-a")
+
+    def test_workers_use_key_of_submitter(self, db_path, monkeypatch):
+        monkeypatch.setattr(app, "get_config_value", lambda key: "sk-konfiguracja")
+        queue = make_queue(db_path, workers=2)
+        queue.start()
+        jobs = {
+            queue.submit("key", {}, api_key="sk-a"): "sk-a",
+            queue.submit("key", {}, api_key="sk-b"): "sk-b",
+            queue.submit("key", {}): "sk-konfiguracja",
+        }
+
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            if all(queue.get(job_id)["status"] == "done" for job_id in jobs):
+                break
+            time.sleep(0.05)
+        assert {job_id: queue.get(job_id)["result"]["key"] for job_id in jobs} == jobs
+        assert app._openai_api_key.get() is None  # pylint: disable=protected-access
+
+    def test_workers_run_handlers(self, db_path):
+        queue = make_queue(db_path, workers=2)
+        queue.start()
+        done = queue.submit("echo", {"value": "ok"})
+        failed = queue.submit("broken", {"value": "x"})
+
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            if all(queue.get(job_id)["status"] in ("done", "failed") for job_id in (done, failed)):
+                break
+            time.sleep(0.05)
+        assert queue.get(done)["status"] == "done"
+        assert queue.get(done)["result"] == {"echo": "ok"}
+        assert queue.get(failed)["status"] == "failed"
+        assert queue.get(failed)["error"] == "nieudane: x"
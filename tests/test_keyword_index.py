@@ -0,0 +1,68 @@
+"""Testy lokalnego indeksu słów kluczowych (SQLite FTS5)."""
+
+import sqlite3
+
+import pytest
+
+import app
+
+
+def note(note_id, title: str, text: str) -> dict:
+    return {"id": note_id, "title": title, "text": text, "created_at": "2024-05-01 10:00:00"}
+
+
+@pytest.fixture
+def index(tmp_path):
+    return app.KeywordIndex(tmp_path / "keywords.sqlite3")
+
+
+class TestKeywordIndex:
+    def test_search_ranks_title_matches_first(self, index):
+        index.upsert([
+            note("a", "Zakupy", "kupić mleko i chleb na budżet domowy"),
+            note("b", "Budżet", "plan wydatków na kolejny miesiąc"),
+            *(note(f"other-{i}", "Spacer", "las i jezioro") for i in range(5)),
+        ])
+        results = index.search("budżet")
+        assert [result["id"] for result in results] == ["b", "a"]
+        assert results[0]["score"] > results[1]["score"] > 0
+
+    def test_search_ignores_diacritics_and_special_characters(self, index):
+        index.upsert([note("a", "Zażółć", "gęślą jaźń")])
+        assert [result["id"] for result in index.search('GESLA "AND* (')] == ["a"]
+        assert index.search("***") == []
+
+    def test_numeric_ids_are_restored(self, index):
+        index.upsert([note(7, "Stara notatka", "sprzed migracji")])
+        assert index.search("migracji")[0]["id"] == 7
+
+    def test_upsert_replaces_note(self, index):
+        index.upsert([note("a", "Pierwszy", "stara treść")])
+        index.upsert([note("a", "Drugi", "nowa treść")])
+        assert index.count() == 1
+        assert index.search("stara") == []
+        assert index.search("nowa")[0]["title"] == "Drugi"
+
+    def test_delete_removes_note_from_search(self, index):
+        index.upsert([note("a", "Jeden", "wspólne słowo"), note("b", "Dwa", "wspólne słowo")])
+        index.delete(["a"])
+        assert [result["id"] for result in index.search("wspólne")] == ["b"]
+        assert index.count() == 1
+
+    def test_rebuild_replaces_contents(self, index):
+        index.upsert([note("old", "Stara", "usunięta notatka")])
+        count = index.rebuild(note(str(i), f"Notatka {i}", "treść") for i in range(1200))
+        assert count == 1200
+        assert index.count() == 1200
+        assert index.search("usunięta") == []
+        assert len(index.search("treść", limit=5)) == 5
+
+    def test_legacy_schema_is_dropped(self, tmp_path):
+        path = tmp_path / "keywords.sqlite3"
+        with sqlite3.connect(str(path)) as conn:
+            conn.execute("CREATE VIRTUAL TABLE notes_fts USING fts5(note_id UNINDEXED, title, text)")
+        index = app.KeywordIndex(path)
+        with sqlite3.connect(str(path)) as conn:
+            tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        assert "notes_fts" not in tables
+        assert index.count() == 0
@@ -0,0 +1,46 @@
+"""Testy identyfikatorów notatek i migracji dawnych ID liczbowych na UUID."""
+
+import uuid
+
+import app
+from conftest import add_point
+
+INTRO = " ".join(f"Wstęp {i} opisuje tło projektu i skład zespołu." for i in range(80))
+LONG_TEXT = INTRO + " Na końcu ustalono termin wdrożenia serwera pocztowego."
+
+
+def test_new_notes_get_uuids(qdrant):
+    first, second = app.save_note("pierwsza notatka"), app.save_note("druga notatka")
+    assert first != second
+    assert all(uuid.UUID(note_id) for note_id in (first, second))
+
+
+class TestMigrateLegacyNoteIds:
+    def test_notes_are_moved_to_uuids(self, qdrant):
+        add_point(qdrant, 1, "stara notatka o budżecie", title="Budżet", created_at="2023-01-01")
+        add_point(qdrant, 2, "stara notatka o urlopie", title="Urlop", created_at="2023-01-02")
+        app.get_keyword_index().rebuild(app.iter_notes())
+
+        assert app.migrate_legacy_note_ids(batch_size=1) == 2
+        assert app.migrate_legacy_note_ids() == 0
+
+        points, _ = qdrant.scroll(collection_name=app.QDRANT_COLLECTION_NAME, limit=10)
+        assert {point.id: point.payload["legacy_id"] for point in points} == {
+            app.legacy_note_uuid(1): 1, app.legacy_note_uuid(2): 2,
+        }
+        assert [note["id"] for note in app.get_keyword_index().search("budżecie")] == [app.legacy_note_uuid(1)]
+
+    def test_chunk_search_finds_migrated_note(self, qdrant):
+        add_point(qdrant, 7, LONG_TEXT, title="Wdrożenie", created_at="2023-01-01")
+        app.index_note_chunks([(7, LONG_TEXT)])
+        chunks = qdrant.count(collection_name=app.CHUNK_COLLECTION_NAME, exact=True).count
+
+        app.migrate_legacy_note_ids()
+
+        new_id = app.legacy_note_uuid(7)
+        results = app.search_notes_semantic("termin wdrożenia serwera pocztowego")
+        assert results[0]["id"] == new_id
+        assert results[0]["snippet"]  # wynik pochodzi także z fragmentu notatki
+        app.delete_notes([new_id])
+        assert qdrant.count(collection_name=app.CHUNK_COLLECTION_NAME, exact=True).count == 0
+        assert chunks > 1
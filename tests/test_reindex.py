@@ -0,0 +1,61 @@
+"""Testy migracji kolekcji między profilami przechowywania (reindex.py)."""
+
+from argparse import Namespace
+
+import pytest
+from qdrant_client.models import PointStruct
+
+import app
+import reindex
+from conftest import fake_vector
+
+LONG_TEXT = " ".join(f"Zdanie numer {i} opisuje kolejny punkt spotkania projektowego." for i in range(400))
+
+
+@pytest.fixture
+def cleanup(qdrant):
+    """Usuwa kolekcje utworzone przez test migracji."""
+    created = []
+    yield created
+    for collection in created:
+        qdrant.delete_collection(collection)
+
+
+def collection_dim(client, collection: str) -> int:
+    return client.get_collection(collection).config.params.vectors.size
+
+
+def test_migrate_copies_notes_and_chunks(qdrant, cleanup):
+    cleanup += ["notes_compact", "notes_compact_chunks"]
+    app.save_note("krótka notatka")
+    app.save_note(LONG_TEXT)
+    chunks = qdrant.count(collection_name=app.CHUNK_COLLECTION_NAME, exact=True).count
+
+    args = Namespace(source=app.QDRANT_COLLECTION_NAME, target="notes_compact", profile="compact", batch_size=2)
+    assert reindex.run_migrate(args) == 0
+
+    assert qdrant.count(collection_name="notes_compact", exact=True).count == 2
+    assert qdrant.count(collection_name="notes_compact_chunks", exact=True).count == chunks > 1
+    assert collection_dim(qdrant, "notes_compact") == collection_dim(qdrant, "notes_compact_chunks") == 1024
+    assert reindex.run_migrate(args) == 2
+
+
+def test_upscaling_reembeds_truncated_text_and_skips_points_without_text(qdrant, openai_client, cleanup):
+    cleanup += ["small", "small_chunks", "notes_full", "notes_full_chunks"]
+    text = "Notatka sprzed migracji. " + LONG_TEXT
+    app.create_collection_for_profile(qdrant, "small", "compact")
+    qdrant.upsert(collection_name="small", points=[
+        PointStruct(id=1, vector=reindex.resize_vector(fake_vector("a"), 1024), payload={"text": text}),
+        PointStruct(id=2, vector=reindex.resize_vector(fake_vector("b"), 1024), payload={"title": "Bez treści"}),
+    ])
+    openai_client.embedding_requests.clear()
+
+    args = Namespace(source="small", target="notes_full", profile="full", batch_size=10)
+    assert reindex.run_migrate(args) == 0
+
+    points, _ = qdrant.scroll(collection_name="notes_full", limit=10)
+    assert [point.id for point in points] == [1]
+    assert len(text) > app.EMBEDDING_INPUT_MAX_CHARS
+    assert openai_client.embedding_requests == [[text[:app.EMBEDDING_INPUT_MAX_CHARS]]]
+    assert collection_dim(qdrant, "notes_full_chunks") == 3072
+
@@ -0,0 +1,54 @@
+"""Testy cache wyników wyszukiwania w pamięci procesu."""
+
+import app
+
+
+class TestSearchResultCache:
+    def test_key_uses_query_as_embedded(self):
+        cache = app.SearchResultCache()
+        assert cache.key("Spotkanie zarządu", "hybrid") == cache.key("Spotkanie zarządu", "hybrid")
+        assert cache.key("Spotkanie ZARZĄDU", "hybrid") != cache.key("spotkanie zarządu", "hybrid")
+        assert cache.key("spotkanie", "hybrid") != cache.key("spotkanie", "keyword")
+
+    def test_returns_copies(self):
+        cache = app.SearchResultCache()
+        key = cache.key("q", "hybrid")
+        cache.put(key, [{"id": 1, "title": "A"}])
+        cache.get(key)[0]["title"] = "zmieniony"
+        assert cache.get(key) == [{"id": 1, "title": "A"}]
+
+    def test_expired_and_evicted_entries(self, monkeypatch):
+        now = [100.0]
+        monkeypatch.setattr(app.time, "monotonic", lambda: now[0])
+        cache = app.SearchResultCache(max_entries=2, ttl_s=10)
+        keys = [cache.key(query, "hybrid") for query in ("a", "b", "c")]
+        for key in keys:
+            cache.put(key, [])
+        assert cache.get(keys[0]) is None
+        assert cache.get(keys[2]) == []
+        now[0] += 11
+        assert cache.get(keys[2]) is None
+
+    def test_save_invalidates_everything(self):
+        cache = app.SearchResultCache(invalidation="precise")
+        key = cache.key("q", "hybrid")
+        cache.put(key, [{"id": 1}])
+        cache.invalidate([2])
+        assert cache.get(key) is None
+        assert cache.key("q", "hybrid") != key
+
+    def test_precise_delete_invalidates_only_matching_entries(self):
+        cache = app.SearchResultCache(invalidation="precise")
+        first, second = cache.key("a", "hybrid"), cache.key("b", "hybrid")
+        cache.put(first, [{"id": 1}])
+        cache.put(second, [{"id": 2}])
+        cache.invalidate([1], deleted=True)
+        assert cache.get(first) is None
+        assert cache.get(second) == [{"id": 2}]
+
+    def test_version_delete_invalidates_everything(self):
+        cache = app.SearchResultCache(invalidation="version")
+        key = cache.key("b", "hybrid")
+        cache.put(key, [{"id": 2}])
+        cache.invalidate([1], deleted=True)
+        assert cache.get(key) is None
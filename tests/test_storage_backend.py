@@ -0,0 +1,40 @@
+"""Testy pełnego cyklu notatek na wbudowanym backendzie ``STORAGE_BACKEND=memory`` (bez sieci)."""
+
+import app
+
+
+def test_memory_backend_is_used(qdrant):
+    assert app.STORAGE_BACKEND == "memory"
+    assert app.get_qdrant_client() is qdrant
+    assert qdrant.collection_exists(app.QDRANT_COLLECTION_NAME)
+    assert qdrant.collection_exists(app.CHUNK_COLLECTION_NAME)
+
+
+def test_add_list_search_and_delete(qdrant):
+    garden = app.save_note("podlać pomidory w ogrodzie i przyciąć róże", tags="dom")
+    meeting = app.save_note("spotkanie projektowe o budżecie na przyszły kwartał", duration_s=90.0)
+
+    listed = app.list_notes_from_db()
+    assert {note["id"] for note in listed} == {garden, meeting}
+    assert qdrant.count(collection_name=app.QDRANT_COLLECTION_NAME, exact=True).count == 2
+
+    for mode in app.SEARCH_MODES:
+        results = app.list_notes_from_db("budżecie kwartał", mode=mode)
+        assert results[0]["id"] == meeting, mode
+    assert [note["id"] for note in app.list_notes_from_db("róże", mode="keyword", filters={"tags": "dom"})] == [garden]
+    assert app.list_notes_from_db("róże", mode="keyword", filters={"min_duration_s": 60}) == []
+
+    assert app.delete_notes([garden, "00000000-0000-0000-0000-000000000000"]) == 1
+    assert [note["id"] for note in app.list_notes_from_db()] == [meeting]
+    assert app.list_notes_from_db("róże", mode="keyword") == []
+
+
+def test_long_note_is_found_by_chunk(qdrant):
+    intro = " ".join(f"Wstęp {i} opisuje tło projektu i zespół." for i in range(80))
+    note_id = app.save_note(intro + " Na końcu ustalono termin wdrożenia serwera pocztowego.")
+    assert qdrant.count(collection_name=app.CHUNK_COLLECTION_NAME, exact=True).count > 1
+
+    results = app.list_notes_from_db("termin wdrożenia serwera pocztowego", mode="semantic")
+
+    assert results[0]["id"] == note_id
+    assert "serwera pocztowego" in results[0]["snippet"]
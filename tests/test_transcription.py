@@ -0,0 +1,118 @@
+"""Testy podziału nagrań na segmenty, sklejania transkrypcji i transkrypcji równoległej."""
+
+import threading
+
+import pytest
+from pydub import AudioSegment
+from pydub.generators import Sine
+
+import app
+
+
+def tone(duration_ms: int) -> AudioSegment:
+    return Sine(440).to_audio_segment(duration=duration_ms, volume=-10).set_frame_rate(8000)
+
+
+def speech_with_pauses(total_ms: int, speech_ms: int = 9000, pause_ms: int = 1000) -> AudioSegment:
+    """Nagranie "mowy" (ton) przerywanej regularnymi pauzami."""
+    audio = AudioSegment.empty()
+    while len(audio) < total_ms:
+        audio += tone(speech_ms) + AudioSegment.silent(duration=pause_ms, frame_rate=8000)
+    return audio[:total_ms]
+
+
+class TestSplitAudioOnSilence:
+    def test_short_recording_is_one_segment(self):
+        audio = tone(3000)
+        assert app.split_audio_on_silence(audio, segment_ms=10_000) == [(0, 3000)]
+
+    def test_cuts_inside_pauses_with_overlap(self):
+        audio = speech_with_pauses(60_000)
+        ranges = app.split_audio_on_silence(audio, segment_ms=20_000, overlap_ms=500)
+
+        assert ranges[0][0] == 0
+        assert ranges[-1][1] == len(audio)
+        assert len(ranges) >= 3
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            cut = end - 500
+            # Cięcie wypada w pauzie (dziewiąta-dziesiąta sekunda każdego cyklu)
+            assert 9000 <= cut % 10_000 <= 10_000
+            assert start == cut - 500
+        assert all(end - start <= 20_000 + 1000 for start, end in ranges)
+
+    def test_hard_cut_without_silence(self):
+        audio = tone(25_000)
+        ranges = app.split_audio_on_silence(audio, segment_ms=10_000, overlap_ms=1000)
+        assert ranges == [(0, 11_000), (9000, 21_000), (19_000, 25_000)]
+
+
+class TestStitchTranscripts:
+    def test_removes_overlap(self):
+        parts = ["Ala ma kota i psa.", "kota i psa. Pies ma kość"]
+        assert app.stitch_transcripts(parts) == "Ala ma kota i psa. Pies ma kość"
+
+    def test_removes_single_word_overlap(self):
+        assert app.stitch_transcripts(["spotkanie jutro", "jutro o dziesiątej"]) == "spotkanie jutro o dziesiątej"
+
+    def test_single_word_match_is_not_skewed(self):
+        # Pojedyncze słowo dalej w następnym fragmencie nie jest zakładką
+        assert app.stitch_transcripts(["ala ma kota", "pies i kota"]) == "ala ma kota pies i kota"
+
+    def test_overlap_with_skew_and_punctuation(self):
+        parts = ["raport kwartalny jest gotowy", "eee, Jest gotowy do wysyłki"]
+        assert app.stitch_transcripts(parts) == "raport kwartalny jest gotowy do wysyłki"
+
+    def test_without_overlap_and_empty_parts(self):
+        assert app.stitch_transcripts(["pierwszy", "", "drugi"]) == "pierwszy drugi"
+        assert app.stitch_transcripts([]) == ""
+
+
+class TestTranscribeAudioSegments:
+    @pytest.fixture(autouse=True)
+    def wav_export(self, monkeypatch):
+        # Segmenty eksportowane do WAV - testy nie wymagają ffmpeg
+        monkeypatch.setattr(app, "MISSING_DEPS", ["ffmpeg"])
+
+    def test_long_recording_is_transcribed_in_parallel_segments(self, monkeypatch):
+        audio = speech_with_pauses(11 * 60 * 1000)
+        monkeypatch.setattr(app.AudioSegment, "from_file", staticmethod(lambda source: audio))
+        calls, threads = [], set()
+        lock = threading.Lock()
+
+        def transcribe(segment_file):
+            with lock:
+                calls.append(segment_file.name)
+                threads.add(threading.get_ident())
+            index = int(segment_file.name.split("_")[1].split(".")[0])
+            return f"segment {index} koniec" if index == 0 else f"koniec segment {index}"
+
+        text, stats = app.transcribe_audio_segments(b"wav", transcribe_fn=transcribe, max_workers=3, preprocess=False)
+
+        assert stats["segments"] == 3
+        assert sorted(calls) == ["segment_0.wav", "segment_1.wav", "segment_2.wav"]
+        assert len(stats["segment_latencies"]) == 3
+        assert stats["bytes_in"] == 3 and stats["bytes_sent"] > 0
+        assert text == "segment 0 koniec segment 1 koniec segment 2"
+
+    def test_undecodable_audio_is_sent_whole(self, monkeypatch):
+        def undecodable(source):
+            raise app.CouldntDecodeError("zły format")
+
+        monkeypatch.setattr(app.AudioSegment, "from_file", staticmethod(undecodable))
+        received = []
+
+        def transcribe(segment_file):
+            received.append(segment_file.read())
+            return "cała notatka"
+
+        text, stats = app.transcribe_audio_segments(b"raw-bytes", transcribe_fn=transcribe)
+
+        assert text == "cała notatka"
+        assert received == [b"raw-bytes"]
+        assert stats["segments"] == 1
+
+    def test_default_backend_uses_openai_client(self, monkeypatch, openai_client):
+        monkeypatch.setattr(app.AudioSegment, "from_file", staticmethod(lambda source: tone(2000)))
+        text, stats = app.transcribe_audio_segments(b"x" * 10**6, preprocess=True)
+        assert text == "transkrypcja segment_0.wav"
+        assert stats["segments"] == 1
@@ -0,0 +1,50 @@
+"""Testy przyrostowej aktualizacji notatek (wektor przeliczany tylko po zmianie treści)."""
+
+import pytest
+
+import app
+
+
+def stored_payload(client, note_id) -> dict:
+    return client.retrieve(collection_name=app.QDRANT_COLLECTION_NAME, ids=[note_id])[0].payload
+
+
+class TestUpdateNote:
+    def test_missing_note(self, qdrant):
+        with pytest.raises(ValueError):
+            app.update_note("00000000-0000-0000-0000-000000000000", "treść")
+
+    def test_unchanged_text_makes_no_api_calls(self, qdrant, openai_client):
+        note_id = app.save_note("krótka notatka o ogrodzie", tags="dom")
+        openai_client.embedding_requests.clear()
+        openai_client.title_requests.clear()
+
+        result = app.update_note(note_id, "krótka  notatka o ogrodzie", tags=["Dom", "ogród"])
+
+        assert result == {"payload": ["tags", "text"], "vector": False}
+        assert openai_client.embedding_requests == [] and openai_client.title_requests == []
+        assert stored_payload(qdrant, note_id)["tags"] == ["dom", "ogród"]
+
+    def test_changed_text_recomputes_vector_and_title(self, qdrant, openai_client):
+        note_id = app.save_note("plan spotkania zespołu w poniedziałek")
+        created_at = stored_payload(qdrant, note_id)["created_at"]
+
+        result = app.update_note(note_id, "lista zakupów na weekend i obiad", audio_md5="abc")
+
+        assert result["vector"] is True
+        assert {"text", "title", "content_hash", "word_count", "audio_md5"} <= set(result["payload"])
+        payload = stored_payload(qdrant, note_id)
+        assert payload["title"] == "Lista zakupów na"
+        assert payload["created_at"] == created_at
+        assert payload["audio_md5"] == ["abc"]
+        assert [note["id"] for note in app.get_keyword_index().search("weekend")] == [note_id]
+        assert app.get_keyword_index().search("poniedziałek") == []
+
+    def test_user_title_is_kept(self, qdrant, openai_client):
+        note_id = app.save_note("notatka o wakacjach nad morzem")
+        openai_client.title_requests.clear()
+
+        app.update_note(note_id, "notatka o wakacjach w górach", title="Urlop")
+
+        assert stored_payload(qdrant, note_id)["title"] == "Urlop"
+        assert openai_client.title_requests == []